@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Streaming Alert Engine
+Evaluates threshold and anomaly rules on every reading as the bridge
+receives it and publishes alerts over MQTT, so detection takes no
+InfluxDB queries and no Grafana polling interval
+
+Per series, every reading updates rolling statistics in O(1):
+
+    value        the reading itself
+    ewma         exponentially weighted moving average (ALERT_EWMA_ALPHA)
+    min / max    over the last ALERT_WINDOW readings (monotonic deques,
+                 amortized O(1) per reading)
+    rate         change per second since the previous reading
+    zscore       distance of the reading from the EWMA in exponentially
+                 weighted standard deviations, measured before the reading
+                 is folded in; None until ALERT_MIN_SAMPLES readings
+    abs_zscore   |zscore|, for spikes in either direction
+
+Rules come from a JSON file (ALERT_RULES or the bridge's --alert-rules),
+a list of:
+
+    {"name": "lab-hot", "measurement": "temperature", "tags": {"location": "lab"},
+     "stat": "max", "op": ">", "threshold": 30, "for": 3, "clear": 28,
+     "severity": "critical"}
+
+    name         unique, part of the alert topic
+    measurement  required; field and tags (all must match) narrow it down
+    stat         one of the statistics above (default: value)
+    op           >, >=, < or <=
+    threshold    the rule fires once the condition holds for `for`
+                 consecutive readings (default: 1)
+    clear        it resolves when op(stat, clear) no longer holds
+                 (default: threshold), so a value hovering at the
+                 threshold does not flap
+    severity     copied into the alert (default: warning)
+
+Firing and resolving publish one JSON message each, QoS 1, to
+<ALERT_TOPIC>/<measurement>/<rule>:
+
+    {"rule":"lab-hot","state":"firing","severity":"critical","measurement":"temperature",
+     "field":"temperature","tags":{"location":"lab"},"stat":"max","observed":30.4,
+     "op":">","threshold":30,"value":30.4,"time":"...","time_ns":...,"detected_ns":...}
+
+Series without a matching rule cost one dict lookup per reading.
+
+    ALERT_RULES        rules file (default: none, no alerts)
+    ALERT_TOPIC        topic prefix (default: alerts)
+    ALERT_EWMA_ALPHA   weight of the newest reading (default: 0.1)
+    ALERT_WINDOW       readings of the min/max window (default: 60)
+    ALERT_MIN_SAMPLES  readings before zscore is computed (default: 30)
+
+mosquitto_sub -h localhost -t 'alerts/#' -v
+"""
+
+import json
+import logging
+import math
+import operator
+import os
+import time
+from collections import Counter, deque
+
+from readings import ns_to_datetime
+
+ALERT_RULES = os.getenv("ALERT_RULES")
+ALERT_TOPIC = os.getenv("ALERT_TOPIC", "alerts")
+ALERT_EWMA_ALPHA = float(os.getenv("ALERT_EWMA_ALPHA", "0.1"))
+ALERT_WINDOW = int(os.getenv("ALERT_WINDOW", "60"))
+ALERT_MIN_SAMPLES = int(os.getenv("ALERT_MIN_SAMPLES", "30"))
+
+STATS = ("value", "ewma", "min", "max", "rate", "zscore", "abs_zscore")
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+SEVERITIES = ("info", "warning", "critical")
+
+logger = logging.getLogger("alerts")
+
+
+class RollingStats:
+    """Statistics of one series, updated in constant time per reading"""
+
+    __slots__ = ("alpha", "window", "min_samples", "count", "value", "ewma", "variance",
+                 "zscore", "rate", "last_ns", "lows", "highs")
+
+    def __init__(self, alpha=ALERT_EWMA_ALPHA, window=ALERT_WINDOW,
+                 min_samples=ALERT_MIN_SAMPLES):
+        self.alpha = alpha
+        self.window = window
+        self.min_samples = min_samples
+        self.count = 0
+        self.value = self.ewma = self.zscore = self.rate = None
+        self.variance = 0.0
+        self.last_ns = None
+        # (index, value) pairs, increasing in lows and decreasing in highs
+        self.lows = deque()
+        self.highs = deque()
+
+    def update(self, time_ns, value):
+        index = self.count
+        if index:
+            deviation = value - self.ewma
+            deviation_sd = math.sqrt(self.variance)
+            self.zscore = deviation / deviation_sd \
+                if index >= self.min_samples and deviation_sd > 0 else None
+            elapsed = (time_ns - self.last_ns) / 1e9
+            self.rate = (value - self.value) / elapsed if elapsed > 0 else None
+            increment = self.alpha * deviation
+            self.ewma += increment
+            self.variance = (1 - self.alpha) * (self.variance + deviation * increment)
+        else:
+            self.ewma = value
+        self.value = value
+        self.last_ns = time_ns
+        self.count = index + 1
+
+        lows, highs = self.lows, self.highs
+        while lows and lows[-1][1] >= value:
+            lows.pop()
+        lows.append((index, value))
+        if lows[0][0] <= index - self.window:
+            lows.popleft()
+        while highs and highs[-1][1] <= value:
+            highs.pop()
+        highs.append((index, value))
+        if highs[0][0] <= index - self.window:
+            highs.popleft()
+
+    @property
+    def min(self):
+        return self.lows[0][1] if self.lows else None
+
+    @property
+    def max(self):
+        return self.highs[0][1] if self.highs else None
+
+    @property
+    def abs_zscore(self):
+        return abs(self.zscore) if self.zscore is not None else None
+
+
+class Rule:
+    __slots__ = ("name", "measurement", "field", "tags", "stat", "op", "compare",
+                 "threshold", "clear", "count", "severity")
+
+    def __init__(self, name, measurement, threshold, op=">", stat="value", field=None,
+                 tags=None, count=1, clear=None, severity="warning"):
+        if stat not in STATS:
+            raise ValueError(f"Unknown stat {stat!r} in rule {name!r}: use {', '.join(STATS)}")
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown op {op!r} in rule {name!r}: use {', '.join(OPERATORS)}")
+        if severity not in SEVERITIES:
+            raise ValueError(f"Unknown severity {severity!r} in rule {name!r}: "
+                             f"use {', '.join(SEVERITIES)}")
+        if count < 1:
+            raise ValueError(f'"for" must be at least 1 in rule {name!r}')
+        self.name = name
+        self.measurement = measurement
+        self.field = field
+        self.tags = dict(tags or {})
+        self.stat = stat
+        self.op = op
+        self.compare = OPERATORS[op]
+        self.threshold = threshold
+        self.clear = threshold if clear is None else clear
+        self.count = count
+        self.severity = severity
+
+    def matches(self, series):
+        return (series.measurement == self.measurement
+                and (self.field is None or series.field == self.field)
+                and all(series.tag_dict.get(key) == value for key, value in self.tags.items()))
+
+    def __repr__(self):
+        return f"Rule({self.name!r}: {self.measurement} {self.stat} {self.op} {self.threshold})"
+
+
+def parse_rule(spec):
+    """Rule from one entry of a rules file; ValueError if it is invalid"""
+    if not isinstance(spec, dict):
+        raise ValueError(f"A rule must be a JSON object, not {spec!r}")
+    missing = [key for key in ("name", "measurement", "threshold") if key not in spec]
+    if missing:
+        raise ValueError(f"Rule {spec.get('name', spec)!r} is missing {', '.join(missing)}")
+    options = dict(spec)
+    if "for" in options:
+        options["count"] = options.pop("for")
+    try:
+        return Rule(**options)
+    except TypeError as e:
+        raise ValueError(f"Invalid rule {spec['name']!r}: {e}") from e
+
+
+def load_rules(path):
+    """Rules of a JSON file holding a list of rule objects"""
+    with open(path) as f:
+        try:
+            specs = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path} is not valid JSON: {e}") from e
+    if not isinstance(specs, list):
+        raise ValueError(f"{path} must hold a JSON list of rules")
+    rules = [parse_rule(spec) for spec in specs]
+    names = Counter(rule.name for rule in rules)
+    duplicates = [name for name, count in names.items() if count > 1]
+    if duplicates:
+        raise ValueError(f"Duplicate rule names in {path}: {', '.join(duplicates)}")
+    return rules
+
+
+class _Check:
+    """State of one rule on one series"""
+
+    __slots__ = ("rule", "streak", "firing", "since_ns", "observed")
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.streak = 0
+        self.firing = False
+        self.since_ns = None
+        self.observed = None
+
+
+class AlertEngine:
+    """Rolling statistics per series and rule evaluation on every reading"""
+
+    def __init__(self, rules, client=None, topic_prefix=ALERT_TOPIC, qos=1,
+                 alpha=ALERT_EWMA_ALPHA, window=ALERT_WINDOW, min_samples=ALERT_MIN_SAMPLES):
+        self.rules = list(rules)
+        self.client = client
+        self.topic_prefix = topic_prefix
+        self.qos = qos
+        self.alpha = alpha
+        self.window = window
+        self.min_samples = min_samples
+        # Series -> (RollingStats, [_Check]), or None if no rule matches
+        self.series = {}
+        self.fired = Counter()
+        self.resolved = Counter()
+        self.failures = 0
+
+    def _track(self, series):
+        checks = [_Check(rule) for rule in self.rules if rule.matches(series)]
+        state = (RollingStats(self.alpha, self.window, self.min_samples), checks) \
+            if checks else None
+        self.series[series] = state
+        return state
+
+    def observe(self, reading):
+        """Update the reading's series and evaluate its rules; alerts published"""
+        series = reading.series
+        state = self.series.get(series)
+        if state is None:
+            if series in self.series:
+                return 0
+            state = self._track(series)
+            if state is None:
+                return 0
+
+        stats, checks = state
+        stats.update(reading.time_ns, reading.value)
+        published = 0
+        for check in checks:
+            rule = check.rule
+            observed = getattr(stats, rule.stat)
+            if observed is None:
+                continue
+            check.observed = observed
+            if check.firing:
+                if not rule.compare(observed, rule.clear):
+                    check.firing = False
+                    check.streak = 0
+                    self.resolved[rule.name] += 1
+                    self._publish("resolved", check, reading)
+                    published += 1
+            elif rule.compare(observed, rule.threshold):
+                check.streak += 1
+                if check.streak >= rule.count:
+                    check.firing = True
+                    check.since_ns = reading.time_ns
+                    self.fired[rule.name] += 1
+                    self._publish("firing", check, reading)
+                    published += 1
+            else:
+                check.streak = 0
+        return published
+
+    def _alert(self, state, check, series):
+        rule = check.rule
+        return {
+            "rule": rule.name,
+            "state": state,
+            "severity": rule.severity,
+            "measurement": series.measurement,
+            "field": series.field,
+            "tags": series.tag_dict,
+            "stat": rule.stat,
+            "observed": check.observed,
+            "op": rule.op,
+            "threshold": rule.threshold if state == "firing" else rule.clear,
+        }
+
+    def _publish(self, state, check, reading):
+        """Log and publish one transition; never raises"""
+        alert = self._alert(state, check, reading.series)
+        alert.update(value=reading.value, time=reading.datetime.isoformat(),
+                     time_ns=reading.time_ns, detected_ns=time.time_ns())
+        if state == "firing":
+            logger.warning("🚨 %s %s: %s %s = %.4g %s %s", alert["severity"].upper(),
+                           check.rule.name, reading.series, alert["stat"], alert["observed"],
+                           alert["op"], alert["threshold"])
+        else:
+            logger.info("✅ Resolved %s: %s %s = %.4g", check.rule.name, reading.series,
+                        alert["stat"], alert["observed"])
+        if not self.client:
+            return
+        try:
+            self.client.publish(
+                f"{self.topic_prefix}/{reading.series.measurement}/{check.rule.name}",
+                json.dumps(alert, separators=(",", ":"), ensure_ascii=False), qos=self.qos)
+        except Exception as e:
+            self.failures += 1
+            logger.error("❌ Could not publish alert %s: %s", check.rule.name, e)
+
+    def active(self):
+        """Alerts currently firing, with the time they started"""
+        active = []
+        for series, state in list(self.series.items()):
+            if state is None:
+                continue
+            for check in state[1]:
+                if check.firing:
+                    alert = self._alert("firing", check, series)
+                    alert["since"] = ns_to_datetime(check.since_ns).isoformat()
+                    active.append(alert)
+        return active
+
+    def summary(self):
+        """'rule fired N/resolved N' per rule that fired"""
+        return ", ".join(f"{name} fired {count}/resolved {self.resolved[name]}"
+                         for name, count in self.fired.most_common())
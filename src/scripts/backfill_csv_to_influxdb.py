@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+CSV to InfluxDB Backfill Tool
+Reloads readings saved by temperature_data_collector.py (or any CSV with a
+timestamp column) into InfluxDB without replaying them through MQTT.
+
+CSV files are streamed in chunks, converted to line protocol in vectorized
+form and written in large batches over a small pool of connections. Progress
+is checkpointed after every chunk so an interrupted run can be resumed.
+
+pipenv run python src/scripts/backfill_csv_to_influxdb.py temperature_data.csv
+pipenv run python src/scripts/backfill_csv_to_influxdb.py data/*.csv --workers 4 --max-rate 200000
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from influxdb_client.client.influxdb_client import InfluxDBClient
+from influxdb_client.client.write_api import SYNCHRONOUS
+
+from line_protocol import frame_to_lines
+
+# InfluxDB Configuration
+INFLUXDB_URL = os.getenv("INFLUXDB_URL", "http://localhost:8086")
+INFLUXDB_ORG = os.getenv("INFLUXDB_ORG", "myorg")
+INFLUXDB_BUCKET = os.getenv("INFLUXDB_BUCKET", "weather_data")
+INFLUXDB_TOKEN = os.getenv("INFLUXDB_TOKEN")
+
+# Backfill defaults
+CSV_FILENAME = "temperature_data.csv"
+CHECKPOINT_FILENAME = ".backfill_checkpoint.json"
+CHUNK_SIZE = 100_000
+BATCH_SIZE = 10_000
+WORKERS = 4
+MAX_RETRIES = 5
+
+
+class RateLimiter:
+    """Token bucket limiting the number of points written per second"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = float(rate)
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount):
+        """Block until `amount` points may be written"""
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.rate, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                # Batches larger than the bucket are let through once full
+                if self.tokens >= min(amount, self.rate):
+                    self.tokens -= amount
+                    return
+                wait = (min(amount, self.rate) - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Checkpoint:
+    """Per-file record of how many data rows have been written"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.state = {}
+        if os.path.exists(filename):
+            with open(filename, 'r') as f:
+                self.state = json.load(f)
+
+    def rows_done(self, path):
+        """Rows already written for `path`, or 0 if the file changed"""
+        entry = self.state.get(os.path.abspath(path))
+        if not entry:
+            return 0
+        # A file that shrank was rotated or rewritten; start it over
+        if os.path.getsize(path) < entry.get("size", 0):
+            return 0
+        return entry["rows"]
+
+    def update(self, path, rows):
+        """Record progress and persist it atomically"""
+        self.state[os.path.abspath(path)] = {
+            "rows": rows,
+            "size": os.path.getsize(path),
+            "updated": time.time(),
+        }
+        tmp_filename = f"{self.filename}.tmp"
+        with open(tmp_filename, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_filename, self.filename)
+
+
+class Backfiller:
+    def __init__(self, args):
+        self.args = args
+        self.client = InfluxDBClient(
+            url=INFLUXDB_URL,
+            token=INFLUXDB_TOKEN,  # type: ignore
+            org=INFLUXDB_ORG,
+            enable_gzip=True,
+            connection_pool_maxsize=args.workers,
+            timeout=60_000
+        )
+        self.write_api = self.client.write_api(write_options=SYNCHRONOUS)
+        self.executor = ThreadPoolExecutor(max_workers=args.workers)
+        self.rate_limiter = RateLimiter(args.max_rate)
+        self.checkpoint = Checkpoint(args.checkpoint)
+
+        # Statistics
+        self.points_written = 0
+        self.rows_skipped = 0
+
+    def write_batch(self, lines):
+        """Write one batch of lines, retrying with exponential backoff"""
+        self.rate_limiter.acquire(len(lines))
+        body = "\n".join(lines)
+        for attempt in range(1, MAX_RETRIES + 1):
+            try:
+                self.write_api.write(
+                    bucket=self.args.bucket,
+                    record=body,
+                    write_precision=self.args.precision  # type: ignore
+                )
+                return len(lines)
+            except Exception as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                delay = min(2 ** attempt, 30)
+                print(
+                    f"⚠️  Write failed ({e}), retrying in {delay}s ({attempt}/{MAX_RETRIES})")
+                time.sleep(delay)
+
+    def backfill_file(self, path):
+        """Stream one CSV file into InfluxDB"""
+        start_row = 0 if self.args.restart else self.checkpoint.rows_done(path)
+        if start_row:
+            print(f"⏩ Resuming {path} after {start_row} rows")
+        else:
+            print(f"📄 Loading {path}")
+
+        reader = pd.read_csv(
+            path,
+            chunksize=self.args.chunk_size,
+            skiprows=range(1, start_row + 1),
+            dtype=str,
+            keep_default_na=True
+        )
+
+        rows_done = start_row
+        for chunk in reader:
+            lines, skipped = frame_to_lines(
+                chunk,
+                measurement=self.args.measurement,
+                time_column=self.args.time_column,
+                field_columns=self.args.fields,
+                tags=self.args.tags,
+                precision=self.args.precision
+            )
+
+            # Write the chunk as concurrent batches, then checkpoint it
+            futures = [
+                self.executor.submit(
+                    self.write_batch, lines[i:i + self.args.batch_size])
+                for i in range(0, len(lines), self.args.batch_size)
+            ]
+            for future in futures:
+                self.points_written += future.result()
+
+            rows_done += len(chunk)
+            self.rows_skipped += skipped
+            self.checkpoint.update(path, rows_done)
+            print(
+                f"   ✅ {rows_done} rows | {self.points_written} points written | {self.rows_skipped} skipped")
+
+    def run(self):
+        """Backfill every file given on the command line"""
+        started = time.monotonic()
+        try:
+            for path in self.args.files:
+                self.backfill_file(path)
+        finally:
+            self.executor.shutdown(wait=True)
+            self.client.close()
+
+        elapsed = time.monotonic() - started
+        rate = self.points_written / elapsed if elapsed else 0
+        print(
+            f"\n🎉 Backfill complete: {self.points_written} points in {elapsed:.1f}s ({rate:,.0f} points/s)")
+
+
+def parse_tag(value):
+    """Parse one `key=value` --tag argument into a (key, value) pair"""
+    key, _, tag_value = value.partition("=")
+    if not key or not tag_value:
+        raise argparse.ArgumentTypeError(f"Invalid tag (expected key=value): {value}")
+    return key, tag_value
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Backfill CSV readings into InfluxDB')
+    parser.add_argument('files', nargs='*', default=[CSV_FILENAME],
+                        help=f'CSV files to load (default: {CSV_FILENAME})')
+    parser.add_argument('--bucket', default=INFLUXDB_BUCKET,
+                        help=f'Target bucket (default: {INFLUXDB_BUCKET})')
+    parser.add_argument('--measurement', default='temperature',
+                        help='Measurement name (default: temperature)')
+    parser.add_argument('--time-column', default='timestamp',
+                        help='Column holding ISO timestamps (default: timestamp)')
+    parser.add_argument('--fields', nargs='+', default=['temperature'],
+                        help='Columns to write as float fields (default: temperature)')
+    parser.add_argument('--tag', action='append', dest='tags', type=parse_tag,
+                        help='Static tag as key=value (repeatable)')
+    parser.add_argument('--precision', choices=['s', 'ms', 'us', 'ns'],
+                        default='ns', help='Write precision (default: ns)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help=f'CSV rows per chunk/checkpoint (default: {CHUNK_SIZE})')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help=f'Points per write request (default: {BATCH_SIZE})')
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help=f'Concurrent write connections (default: {WORKERS})')
+    parser.add_argument('--max-rate', type=int, default=0,
+                        help='Maximum points per second, 0 for unlimited')
+    parser.add_argument('--checkpoint', default=CHECKPOINT_FILENAME,
+                        help=f'Checkpoint file (default: {CHECKPOINT_FILENAME})')
+    parser.add_argument('--restart', action='store_true',
+                        help='Ignore checkpoints and load files from the start')
+
+    args = parser.parse_args()
+    args.tags = dict(args.tags or [])
+
+    if not INFLUXDB_TOKEN:
+        raise ValueError("INFLUXDB_TOKEN environment variable is required")
+
+    Backfiller(args).run()
+
+
+if __name__ == "__main__":
+    main()
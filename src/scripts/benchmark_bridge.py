@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Bridge Throughput Benchmark
+Runs mqtt_to_influxdb.py against the in-process MQTT broker and fake
+InfluxDB from the testsupport package, so no docker-compose stack or
+network services are needed
+
+Messages are shaped like publisher.create_temperature_data() and stamped
+with the publish time. Latency is measured from publish to the fake
+InfluxDB accepting the write.
+
+--restart-broker-at N restarts the broker after N messages. The report then
+shows how long the bridge needed to reconnect and how many messages were
+lost. --no-persistence makes the restart drop all sessions, like a broker
+without persistence.
+
+--reload-at N reconfigures the running bridge after N messages, as an edit
+of its --config file would: the topic moves to a new bucket, the default
+target switches to second precision (both new writers, while the old one
+is drained) and the humidity subscription is dropped.
+The report shows the messages lost and the longest pause between writes
+in the second after the reload.
+
+--routed publishes on data/site-a/temperature instead, which the bridge
+subscribes to through data/site-a/# and routes to site-a/raw@s; the run
+exits with status 1 unless every message was written to that bucket.
+
+--alert-at N publishes message N with a temperature over the bridge's
+alert rule and reports the detection latency: from the reading's payload
+timestamp to a subscriber receiving the alert.
+
+--protocol 5 runs publisher and bridge over MQTT v5 (topic aliases,
+content type, receive maximum; see mqtt_v5.py); --protocol both runs
+3.1.1 and then 5 and compares bytes on the wire per message and
+throughput. Bytes are counted by the broker per client.
+
+pipenv run python src/scripts/benchmark_bridge.py
+pipenv run python src/scripts/benchmark_bridge.py --messages 20000 --rate 2000 --influx-latency 5 --error-rate 0.01 --json bridge_bench.json
+pipenv run python src/scripts/benchmark_bridge.py --messages 5000 --rate 500 --restart-broker-at 2000 --broker-downtime 2
+pipenv run python src/scripts/benchmark_bridge.py --messages 20000 --rate 2000 --reload-at 10000
+pipenv run python src/scripts/benchmark_bridge.py --messages 2000 --rate 1000 --routed
+pipenv run python src/scripts/benchmark_bridge.py --messages 20000 --rate 2000 --alert-at 10000 --influx-latency 50
+pipenv run python src/scripts/benchmark_bridge.py --protocol both --max-inflight 100 --receive-maximum 200
+pipenv run python src/scripts/benchmark_bridge.py --protocol both --content-type ""
+"""
+
+import argparse
+import importlib
+import json
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from alerts import ALERT_TOPIC, Rule
+from influx_targets import parse_routes
+from logging_setup import setup_logging
+from mqtt_v5 import (MQTT_CONTENT_TYPE, MQTT_MAX_INFLIGHT, MQTT_RECEIVE_MAXIMUM,
+                     PROTOCOLS, TopicAliasPublisher, connect_options, create_client)
+from profiling import add_profile_arguments, profiler_from_args
+from publisher import create_temperature_data
+from testsupport import FakeInfluxDB, MQTTBroker
+
+TOPIC = "data/temperature"
+RELOAD_ROUTE = f"{TOPIC}=myorg/reloaded"
+ROUTED_TOPIC = "data/site-a/temperature"
+ROUTED_FILTER = "data/site-a/#"
+ROUTED_ROUTE = f"{ROUTED_FILTER}=site-a/raw@s"
+ALERT_RULE = Rule("benchmark-high", "temperature", 60)
+SPIKE_TEMPERATURE = 65.0
+MESSAGES = 5000
+PUBLISHER_ID = "benchmark_publisher"
+IDLE_TIMEOUT = 5.0
+
+
+def load_bridge(influx, broker):
+    """Import the bridge configured for the in-process services"""
+    os.environ.update(
+        INFLUXDB_URL=influx.url,
+        INFLUXDB_TOKEN="benchmark",
+        MQTT_BROKER=broker.host,
+        MQTT_PORT=str(broker.port),
+    )
+    os.environ.pop("GRAFANA_LIVE_TOKEN", None)
+    import mqtt_to_influxdb
+    return importlib.reload(mqtt_to_influxdb)
+
+
+def wait_until(predicate, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def publish(count, rate, host, port, on_publish=None, protocol="3.1.1",
+            max_inflight=MQTT_MAX_INFLIGHT, content_type=MQTT_CONTENT_TYPE, spike_at=None,
+            topic=TOPIC):
+    """Publish `count` QoS 1 readings, paced to `rate` per second (0 = unpaced)
+
+    The publisher keeps a persistent session and reconnects on its own, so
+    readings published while the broker is down are sent after it returns.
+    """
+    client = create_client(PUBLISHER_ID, protocol, clean_session=False)
+    sender = TopicAliasPublisher(client, protocol, max_inflight, content_type)
+    client.on_connect = lambda client, userdata, flags, rc, properties=None: \
+        sender.connected(properties)
+    client.on_publish = lambda client, userdata, mid: sender.published(mid)
+    client.reconnect_delay_set(min_delay=0.1, max_delay=1)
+    client.max_queued_messages_set(0)
+    client.connect(host, port, 60, **connect_options(protocol, clean_session=False))
+    client.loop_start()
+
+    interval = 1.0 / rate if rate else 0.0
+    started = time.perf_counter()
+    outstanding = deque()
+    for index in range(count):
+        if on_publish:
+            on_publish(index)
+        if interval:
+            delay = started + index * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        data = create_temperature_data()
+        if index == spike_at:
+            data["temperature"] = SPIKE_TEMPERATURE
+        data["timestamp"] = datetime.now(timezone.utc).isoformat()
+        outstanding.append(sender.publish(topic, json.dumps(data), qos=1))
+
+    def acknowledged():
+        while outstanding and outstanding[0].is_published():
+            outstanding.popleft()
+        return not outstanding
+
+    # Wait for outstanding QoS 1 acknowledgements before disconnecting
+    wait_until(acknowledged, 60)
+    client.loop_stop()
+    client.disconnect()
+    return started
+
+
+def watch_alerts(host, port, protocol, alerts):
+    """Subscriber appending (receipt time_ns, alert) for every alert"""
+    client = create_client("benchmark_alerts", protocol, clean_session=True)
+    client.on_connect = lambda client, userdata, flags, rc, properties=None: \
+        client.subscribe(f"{ALERT_TOPIC}/#", qos=1)
+    client.on_message = lambda client, userdata, msg: \
+        alerts.append((time.time_ns(), json.loads(msg.payload)))
+    client.connect(host, port, 60, **connect_options(protocol, clean_session=True))
+    client.loop_start()
+    return client
+
+
+def write_gap(influx, around, span=1.0):
+    """Longest pause (s) between accepted writes in the `span` seconds after
+    `around`, which covers the swap and the drain of a reload"""
+    arrivals = sorted(request.arrival_ns / 1e9 for request in list(influx.requests))
+    arrivals = [t for t in arrivals if around <= t <= around + span]
+    return max((b - a for a, b in zip(arrivals, arrivals[1:])), default=None)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run(args, protocol):
+    """Benchmark one protocol against fresh in-process services"""
+    influx = FakeInfluxDB(
+        latency=args.influx_latency / 1000,
+        jitter=args.influx_jitter / 1000,
+        error_rate=args.error_rate
+    ).start()
+    broker = MQTTBroker().start()
+    bridge_module = load_bridge(influx, broker)
+
+    print(f"🚀 Benchmarking MQTT to InfluxDB bridge over MQTT {protocol}...")
+    print(f"   Broker: {broker.host}:{broker.port} | Fake InfluxDB: {influx.url}")
+
+    profiler = profiler_from_args(args, f"benchmark_bridge-v{protocol}")
+    bridge = bridge_module.MQTTToInfluxDB(
+        profiler=profiler, protocol=protocol, receive_maximum=args.receive_maximum,
+        alert_rules=[ALERT_RULE] if args.alert_at is not None else None,
+        **({"topics": {TOPIC: 1, ROUTED_FILTER: 1}, "routes": parse_routes([ROUTED_ROUTE])}
+           if args.routed else {}))
+    topic, subscription = (ROUTED_TOPIC, ROUTED_FILTER) if args.routed else (TOPIC, TOPIC)
+    # Fast backoff so recovery time reflects the bridge, not the ceiling
+    bridge.connection.backoff.maximum = 1.0
+
+    restart = {}
+    reload = {}
+    alerts = []
+    watcher = watch_alerts(broker.host, broker.port, protocol, alerts) \
+        if args.alert_at is not None else None
+
+    def reload_bridge():
+        reload["at"] = time.time()
+        bridge.reload(bridge.config._replace(
+            topics={TOPIC: 1}, routes=parse_routes([RELOAD_ROUTE]), precision="s"))
+        reload["took_s"] = time.time() - reload["at"]
+
+    def on_publish(index):
+        if index == args.restart_broker_at and not restart:
+            restart["at"] = time.perf_counter()
+            threading.Thread(target=broker.restart, kwargs={
+                "downtime": args.broker_downtime,
+                "keep_sessions": not args.no_persistence}, daemon=True).start()
+        if index == args.reload_at and not reload:
+            # Like the config watcher, the reload runs beside the MQTT loop
+            threading.Thread(target=reload_bridge, daemon=True).start()
+
+    try:
+        profiler.begin()
+        bridge.connection.start()
+        if not wait_until(lambda: any(
+                subscription in session.subscriptions
+                for session in list(broker.sessions.values())), 10):
+            raise SystemExit("❌ Bridge did not subscribe")
+
+        started = publish(args.messages, args.rate, broker.host, broker.port,
+                          on_publish=on_publish,
+                          protocol=protocol, max_inflight=args.max_inflight,
+                          content_type=args.content_type, spike_at=args.alert_at,
+                          topic=topic)
+        published = time.perf_counter()
+
+        # Wait until every message is written; failed writes are retried
+        last = -1
+        while influx.points < args.messages:
+            if not influx.wait_for_points(args.messages, IDLE_TIMEOUT) \
+                    and influx.points == last:
+                break
+            last = influx.points
+        finished = time.perf_counter()
+        if watcher:
+            wait_until(lambda: alerts, IDLE_TIMEOUT)
+    finally:
+        if watcher:
+            watcher.loop_stop()
+            watcher.disconnect()
+        bridge.cleanup()
+        broker.stop()
+        influx.stop()
+
+    publisher_in, _ = broker.traffic(PUBLISHER_ID)
+    _, bridge_out = broker.traffic(bridge_module.MQTT_CLIENT_ID)
+    latencies = influx.latencies()
+    gap = write_gap(influx, reload["at"]) if reload else None
+    elapsed = finished - started
+    results = {
+        "protocol": protocol,
+        "messages": args.messages,
+        "written": influx.points,
+        "write_errors": influx.errors_injected,
+        "publish_s": published - started,
+        "elapsed_s": elapsed,
+        "throughput_per_s": influx.points / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "p50": statistics.median(latencies) * 1000,
+            "p95": percentile(latencies, 0.95) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+            "max": max(latencies) * 1000,
+        } if latencies else {},
+        "wire_bytes": {
+            "publisher_to_broker": publisher_in,
+            "broker_to_bridge": bridge_out,
+            "publisher_per_message": publisher_in / args.messages,
+            "bridge_per_message": bridge_out / args.messages,
+        },
+        "lost": max(args.messages - influx.points, 0),
+        "reloaded_points": len(influx.lines(bucket="reloaded")) if reload else None,
+        "reload_s": reload.get("took_s"),
+        "reload_write_gap_ms": gap * 1000 if gap is not None else None,
+        "routed_points": len(influx.lines(bucket="raw")) if args.routed else None,
+        "alerts": len(alerts),
+        "alert_latency_ms": (alerts[0][0] - alerts[0][1]["time_ns"]) / 1e6 if alerts else None,
+        "reconnects": len(bridge.connection.outages),
+        "recovery_s": max(bridge.connection.outages) if bridge.connection.outages else None,
+        "config": {
+            "rate": args.rate,
+            "max_inflight": args.max_inflight,
+            "receive_maximum": args.receive_maximum,
+            "content_type": args.content_type,
+            "restart_broker_at": args.restart_broker_at,
+            "broker_downtime_s": args.broker_downtime if args.restart_broker_at else None,
+            "persistence": not args.no_persistence,
+            "reload_at": args.reload_at,
+            "alert_at": args.alert_at,
+            "routed": args.routed,
+            "influx_latency_ms": args.influx_latency,
+            "influx_jitter_ms": args.influx_jitter,
+            "error_rate": args.error_rate,
+        },
+    }
+
+    wire = results["wire_bytes"]
+    print(f"📨 Published: {args.messages} in {results['publish_s']:.2f}s")
+    print(f"💾 Written:   {influx.points} ({influx.errors_injected} injected failures, retried)")
+    print(f"⚡ Throughput: {results['throughput_per_s']:.0f} points/s over {elapsed:.2f}s")
+    print(
+        f"📦 Wire bytes: publisher {wire['publisher_per_message']:.1f} B/msg | "
+        f"bridge {wire['bridge_per_message']:.1f} B/msg")
+    if args.restart_broker_at:
+        recovery = results["recovery_s"]
+        print(
+            f"🔁 Broker restart: {args.broker_downtime:.1f}s down | bridge outage "
+            f"{f'{recovery:.2f}s' if recovery is not None else 'n/a'} | "
+            f"lost {results['lost']} messages")
+    if reload:
+        gap = results["reload_write_gap_ms"]
+        print(
+            f"🔄 Reload: {results['reload_s']:.2f}s incl. drain | "
+            f"{results['reloaded_points']} points to the new bucket | longest write gap "
+            f"{f'{gap:.1f}ms' if gap is not None else 'n/a'} | lost {results['lost']} messages")
+    if args.routed:
+        print(f"🔀 Routed: {results['routed_points']} of {args.messages} points "
+              f"written to site-a/raw via {ROUTED_FILTER}")
+    if watcher:
+        detected = results["alert_latency_ms"]
+        print(
+            f"🚨 Alert: {len(alerts)} received | detected "
+            f"{f'{detected:.2f}ms' if detected is not None else 'never'} after the reading")
+    if latencies:
+        latency = results["latency_ms"]
+        print(
+            f"⏱️  Latency:  p50 {latency['p50']:.2f}ms | p95 {latency['p95']:.2f}ms "
+            f"| p99 {latency['p99']:.2f}ms | max {latency['max']:.2f}ms")
+    return results
+
+
+def print_comparison(runs):
+    """Side-by-side table of bytes on the wire and throughput per protocol"""
+    print(f"\n{'protocol':<10} {'pub B/msg':>10} {'bridge B/msg':>13} {'points/s':>10} {'p95 ms':>8}")
+    print("-" * 55)
+    baseline = runs[0]
+    for run_results in runs:
+        wire = run_results["wire_bytes"]
+        change = ""
+        if run_results is not baseline:
+            saved = 1 - wire["publisher_per_message"] / baseline["wire_bytes"]["publisher_per_message"]
+            change = f"  ({saved:+.1%} publisher bytes saved)"
+        print(
+            f"{run_results['protocol']:<10} {wire['publisher_per_message']:>10.1f} "
+            f"{wire['bridge_per_message']:>13.1f} {run_results['throughput_per_s']:>10.0f} "
+            f"{run_results['latency_ms'].get('p95', 0):>8.2f}{change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the MQTT to InfluxDB bridge without external services')
+    parser.add_argument('--messages', type=int, default=MESSAGES,
+                        help=f'Messages to publish (default: {MESSAGES})')
+    parser.add_argument('--rate', type=float, default=0,
+                        help='Publish rate in messages/s (default: unpaced)')
+    parser.add_argument('--protocol', choices=list(PROTOCOLS) + ['both'], default='3.1.1',
+                        help='MQTT protocol version, or both to compare (default: 3.1.1)')
+    parser.add_argument('--max-inflight', type=int, default=MQTT_MAX_INFLIGHT,
+                        help=f'Publisher QoS 1 messages in flight (default: {MQTT_MAX_INFLIGHT})')
+    parser.add_argument('--receive-maximum', type=int, default=MQTT_RECEIVE_MAXIMUM,
+                        help=f'Bridge receive maximum, MQTT 5 only (default: {MQTT_RECEIVE_MAXIMUM})')
+    parser.add_argument('--content-type', default=MQTT_CONTENT_TYPE,
+                        help=f'ContentType of MQTT 5 messages, "" to leave it out '
+                             f'(default: {MQTT_CONTENT_TYPE})')
+    parser.add_argument('--influx-latency', type=float, default=0,
+                        help='Injected write latency in ms (default: 0)')
+    parser.add_argument('--influx-jitter', type=float, default=0,
+                        help='Extra random write latency up to this many ms (default: 0)')
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help='Fraction of writes answered with 503 (default: 0)')
+    parser.add_argument('--restart-broker-at', type=int, metavar='N',
+                        help='Restart the broker after N messages were published')
+    parser.add_argument('--broker-downtime', type=float, default=1.0,
+                        help='Seconds the broker stays down on restart (default: 1)')
+    parser.add_argument('--no-persistence', action='store_true',
+                        help='Drop all broker sessions on restart')
+    parser.add_argument('--reload-at', type=int, metavar='N',
+                        help='Move the topic to a new bucket after N messages were published')
+    parser.add_argument('--routed', action='store_true',
+                        help=f'Publish on {ROUTED_TOPIC} and check it is routed to site-a/raw')
+    parser.add_argument('--alert-at', type=int, metavar='N',
+                        help=f'Publish message N at {SPIKE_TEMPERATURE}°C and time the alert')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Show the bridge log (warnings and errors only by default)')
+    parser.add_argument('--json', help='Write results to this JSON file')
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+
+    setup_logging("INFO" if args.verbose else "WARNING")
+    protocols = list(PROTOCOLS) if args.protocol == 'both' else [args.protocol]
+    runs = []
+    for protocol in protocols:
+        if runs:
+            print()
+        runs.append(run(args, protocol))
+    if len(runs) > 1:
+        print_comparison(runs)
+
+    if args.routed and any(r["routed_points"] != args.messages for r in runs):
+        raise SystemExit("❌ Not every routed message reached site-a/raw")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(runs[0] if len(runs) == 1 else runs, f, indent=2)
+        print(f"\n📄 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
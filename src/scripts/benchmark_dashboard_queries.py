@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Dashboard Query Benchmark
+Compares the raw panel query with the multi-resolution aggregateWindow query
+that setup_grafana.py provisions, measuring latency and payload size
+
+Each range is queried the way Grafana does it: the window period is the
+range divided by the panel's max data points, and the response is the same
+annotated CSV the data source downloads.
+
+pipenv run python src/scripts/benchmark_dashboard_queries.py
+pipenv run python src/scripts/benchmark_dashboard_queries.py --ranges 1h 1d 30d --repeat 5 --json dashboard_bench.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from datetime import datetime, timezone
+
+from influxdb_client.client.influxdb_client import InfluxDBClient
+
+from export_influxdb import format_flux_time, parse_duration
+from setup_grafana import INFLUXDB_BUCKET, build_panel_query
+
+# InfluxDB Configuration (benchmarks run from the host, not inside Docker)
+INFLUXDB_URL = os.getenv("INFLUXDB_URL", "http://localhost:8086")
+INFLUXDB_ORG = os.getenv("INFLUXDB_ORG", "myorg")
+INFLUXDB_TOKEN = os.getenv("INFLUXDB_TOKEN")
+
+# Benchmark defaults
+RANGES = ["1h", "1d", "30d"]
+MEASUREMENTS = ["temperature", "humidity"]
+MAX_DATA_POINTS = 1000
+REPEAT = 3
+
+
+def window_period(span):
+    """Grafana-style window period: range / max data points, at least 1ms"""
+    return f"{max(1, int(span.total_seconds() * 1000 / MAX_DATA_POINTS))}ms"
+
+
+def build_raw_query(measurement, start, stop):
+    """The unaggregated query shape the dashboard used before"""
+    return f'''from(bucket: "{INFLUXDB_BUCKET}")
+  |> range(start: {start}, stop: {stop})
+  |> filter(fn: (r) => r["_measurement"] == "{measurement}" and r["_field"] == "{measurement}")'''
+
+
+def run_query(query_api, query):
+    """Run a query, streaming the response; returns (seconds, bytes, lines)"""
+    started = time.perf_counter()
+    response = query_api.query_raw(query)
+    size = 0
+    lines = 0
+    for block in response.stream(64 * 1024):
+        size += len(block)
+        lines += block.count(b"\n")
+    response.release_conn()
+    return time.perf_counter() - started, size, lines
+
+
+def benchmark(query_api, name, query, repeat):
+    """Run one query `repeat` times and summarize the median"""
+    runs = [run_query(query_api, query) for _ in range(repeat)]
+    return {
+        "query": name,
+        "latency_ms": statistics.median(run[0] for run in runs) * 1000,
+        "bytes": runs[-1][1],
+        "lines": runs[-1][2],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark raw vs multi-resolution dashboard queries')
+    parser.add_argument('--ranges', nargs='+', default=RANGES,
+                        help='Dashboard time ranges to test (default: 1h 1d 30d)')
+    parser.add_argument('--measurements', nargs='+', default=MEASUREMENTS,
+                        help='Panels to test (default: temperature humidity)')
+    parser.add_argument('--repeat', type=int, default=REPEAT,
+                        help=f'Runs per query, median reported (default: {REPEAT})')
+    parser.add_argument('--skip-raw', action='store_true',
+                        help='Only run the aggregated queries')
+    parser.add_argument('--json', help='Write results to this JSON file')
+
+    args = parser.parse_args()
+
+    if not INFLUXDB_TOKEN:
+        raise ValueError("INFLUXDB_TOKEN environment variable is required")
+
+    client = InfluxDBClient(
+        url=INFLUXDB_URL,
+        token=INFLUXDB_TOKEN,  # type: ignore
+        org=INFLUXDB_ORG,
+        timeout=600_000
+    )
+    query_api = client.query_api()
+
+    print("🚀 Benchmarking dashboard queries...")
+    print(f"{'range':>6} {'panel':<12} {'query':<11} {'latency':>10} {'payload':>12} {'lines':>10}")
+    print("-" * 66)
+
+    results = []
+    now = datetime.now(timezone.utc)
+    try:
+        for range_name in args.ranges:
+            span = parse_duration(range_name)
+            start = format_flux_time(now - span)
+            stop = format_flux_time(now)
+
+            for measurement in args.measurements:
+                queries = [("aggregated", build_panel_query(
+                    measurement, start=start, stop=stop, every=window_period(span)))]
+                if not args.skip_raw:
+                    queries.insert(0, ("raw", build_raw_query(
+                        measurement, start, stop)))
+
+                for name, query in queries:
+                    result = benchmark(query_api, name, query, args.repeat)
+                    result.update(range=range_name, measurement=measurement)
+                    results.append(result)
+                    print(
+                        f"{range_name:>6} {measurement:<12} {name:<11} "
+                        f"{result['latency_ms']:>8.1f}ms {result['bytes'] / 1024:>10.1f}KB {result['lines']:>10}")
+    finally:
+        client.close()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"timestamp": now.isoformat(), "results": results}, f, indent=2)
+        print(f"\n📄 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Ingest Hot Path Micro-Benchmarks
+Times each step a reading goes through between MQTT and storage on
+synthetic payloads shaped like publisher.create_temperature_data()
+
+    decode           json.loads of the raw payload
+    timestamp        ISO 8601 payload timestamp -> datetime
+    route            topic registry lookup
+    validate         compiled schema validator (see schemas.py)
+    parse_message    decode + route + validate + timestamp as used by the collectors
+    serialize_line   line protocol via line_protocol.format_line
+    serialize_reading  line protocol via Reading.to_line (cached series prefix)
+    serialize_point  line protocol via influxdb_client Point
+    csv_row          one CSV row as written by the CSV collectors
+    hot_cache_add    reading appended to the hot cache ring buffer
+    hot_cache_packed  the same with delta/XOR compressed blocks
+    hot_cache_latest  newest reading of a series from the hot cache
+    alerts           rolling statistics and four quiet rules evaluated per reading
+    batch_flush      500-reading ReadingBatch written to the in-process fake InfluxDB
+    sqlite_batch     the same batch inserted into a WAL-mode SQLiteStore
+
+Results can be saved as a JSON baseline and compared against later runs;
+--compare exits with status 1 when a benchmark is slower than the
+baseline by more than --threshold.
+
+--memory buffers readings the way a backed-up sink does. It compares
+the old per-message dicts with Reading objects and ReadingBatch columns,
+reporting bytes per buffered reading and garbage collector activity.
+
+--storage writes a stream of 1 Hz readings with millisecond jitter, like
+receipt times, at each write precision, with and without --quantize 1s. For
+each it reports line protocol bytes per point, gzip-compressed bytes per
+point (the write request body) and the bytes per point of the timestamps
+delta-of-delta encoded, which is how InfluxDB's storage engine compresses
+regular timestamps.
+
+pipenv run python src/scripts/benchmark_ingest.py --save benchmarks/ingest_baseline.json
+pipenv run python src/scripts/benchmark_ingest.py --compare benchmarks/ingest_baseline.json --threshold 0.15
+pipenv run python src/scripts/benchmark_ingest.py --memory 200000
+pipenv run python src/scripts/benchmark_ingest.py --only decode --storage 100000
+"""
+
+import argparse
+import csv
+import gc
+import gzip
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from influxdb_client.client.influxdb_client import InfluxDBClient
+from influxdb_client.client.write.point import Point
+from influxdb_client.client.write_api import SYNCHRONOUS
+
+from alerts import AlertEngine, Rule
+from hot_cache import HotCache, encode_block
+from ingest import decode_payload, parse_message, parse_timestamp, quantize
+from line_protocol import PRECISION_DIVISORS, datetime_to_ns, format_line
+from publisher import create_temperature_data
+from readings import Reading, ReadingBatch, get_series
+from schemas import validator_for
+from sqlite_store import SQLiteStore
+from testsupport import FakeInfluxDB
+from topic_registry import lookup
+
+TOPIC = "data/temperature"
+PAYLOADS = 1000
+BATCH_SIZE = 500
+REPEAT = 7
+THRESHOLD = 0.10
+
+
+def make_payloads(count, seed=42):
+    """Encoded payloads as published by publisher.py"""
+    random.seed(seed)
+    return [json.dumps(create_temperature_data()).encode() for _ in range(count)]
+
+
+def build_cases(payloads, influx_url):
+    """Benchmark name -> (function running one pass, operations per pass)"""
+    decoded = [decode_payload(payload) for payload in payloads]
+    timestamps = [data["timestamp"] for data in decoded]
+    readings = [parse_message(TOPIC, payload) for payload in payloads]
+    topics = [TOPIC] * len(payloads)
+
+    def decode():
+        for payload in payloads:
+            decode_payload(payload)
+
+    def timestamp():
+        for value in timestamps:
+            parse_timestamp(value)
+
+    def route():
+        for topic in topics:
+            lookup(topic)
+
+    validator = validator_for(TOPIC)
+
+    def validate():
+        for data in decoded:
+            validator(data)
+
+    def parse():
+        for payload in payloads:
+            parse_message(TOPIC, payload)
+
+    def serialize_line():
+        for r in readings:
+            format_line(r.measurement, {r.field: r.value}, r.time_ns, r.tags)
+
+    def serialize_reading():
+        for r in readings:
+            r.to_line()
+
+    def serialize_point():
+        for r in readings:
+            Point(r.measurement).field(r.field, r.value) \
+                .time(r.time_ns).to_line_protocol()
+
+    def csv_row():
+        writer = csv.writer(io.StringIO())
+        for r in readings:
+            writer.writerow([
+                r.timestamp,
+                r.value,
+                r.datetime.strftime('%Y-%m-%d %H:%M:%S')
+            ])
+
+    ring = HotCache()
+    packed = HotCache(compress=True)
+    for reading in readings:
+        ring.add(reading)
+    series = readings[0].series
+
+    def hot_cache_add():
+        for r in readings:
+            ring.add(r)
+
+    def hot_cache_packed():
+        for r in readings:
+            packed.add(r)
+
+    def hot_cache_latest():
+        for _ in readings:
+            ring.latest(series)
+
+    engine = AlertEngine([
+        Rule("high", "temperature", 35, clear=33, count=3),
+        Rule("spike", "temperature", 4, stat="abs_zscore"),
+        Rule("warm", "temperature", 35, stat="ewma"),
+        Rule("low", "temperature", 0, op="<", stat="min"),
+    ])
+
+    def alerts():
+        for r in readings:
+            engine.observe(r)
+
+    client = InfluxDBClient(url=influx_url, token="benchmark", org="myorg")
+    write_api = client.write_api(write_options=SYNCHRONOUS)
+    batch = ReadingBatch()
+    for reading in readings[:BATCH_SIZE]:
+        batch.append(reading)
+
+    def batch_flush():
+        write_api.write(bucket="benchmark", record=batch.to_lines())
+
+    store = SQLiteStore(os.path.join(tempfile.mkdtemp(), "benchmark.db"))
+
+    def sqlite_batch():
+        store.write_batch(batch)
+
+    cases = {
+        "decode": (decode, len(payloads)),
+        "timestamp": (timestamp, len(payloads)),
+        "route": (route, len(payloads)),
+        "validate": (validate, len(payloads)),
+        "parse_message": (parse, len(payloads)),
+        "serialize_line": (serialize_line, len(payloads)),
+        "serialize_reading": (serialize_reading, len(payloads)),
+        "serialize_point": (serialize_point, len(payloads)),
+        "csv_row": (csv_row, len(payloads)),
+        "hot_cache_add": (hot_cache_add, len(payloads)),
+        "hot_cache_packed": (hot_cache_packed, len(payloads)),
+        "hot_cache_latest": (hot_cache_latest, len(payloads)),
+        "alerts": (alerts, len(payloads)),
+        "batch_flush": (batch_flush, len(batch)),
+        "sqlite_batch": (sqlite_batch, len(batch)),
+    }
+    return cases, client
+
+
+def run_case(function, operations, repeat):
+    """Run one warm-up and `repeat` timed passes; returns ns per operation"""
+    function()
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        function()
+        runs.append((time.perf_counter_ns() - started) / operations)
+    return {
+        "ns_per_op": statistics.median(runs),
+        "ops_per_s": 1e9 / statistics.median(runs),
+        "stdev_ns": statistics.stdev(runs) if len(runs) > 1 else 0.0,
+    }
+
+
+def dict_reading(topic, payload):
+    """The per-message dict the collectors used before Reading"""
+    entry = lookup(topic)
+    data = decode_payload(payload)
+    dt = parse_timestamp(data.get('timestamp'))
+    return {
+        "measurement": entry["measurement"],
+        "field": entry["field"],
+        "value": float(data[entry["payload_key"]]),
+        "time_ns": datetime_to_ns(dt),
+        "timestamp": data.get('timestamp') or dt.isoformat(),
+        "datetime": dt,
+        "tags": {key: data[key] for key in entry["tag_keys"] if data.get(key)},
+    }
+
+
+def buffer_dicts(payloads, count):
+    return [dict_reading(TOPIC, payloads[i % len(payloads)]) for i in range(count)]
+
+
+def buffer_readings(payloads, count):
+    return [parse_message(TOPIC, payloads[i % len(payloads)]) for i in range(count)]
+
+
+def buffer_batch(payloads, count):
+    batch = ReadingBatch()
+    for i in range(count):
+        batch.append(parse_message(TOPIC, payloads[i % len(payloads)]))
+    return batch
+
+
+def measure_memory(payloads, count):
+    """Bytes per buffered reading and GC activity for each representation"""
+    collections = []
+    timings = {}
+
+    def on_gc(phase, info):
+        if phase == "start":
+            timings["started"] = time.perf_counter()
+        else:
+            collections.append((info["generation"], time.perf_counter() - timings["started"]))
+
+    results = {}
+    for name, build in [("dict", buffer_dicts), ("Reading", buffer_readings),
+                        ("ReadingBatch", buffer_batch)]:
+        gc.collect()
+        collections.clear()
+        gc.callbacks.append(on_gc)
+        tracemalloc.start()
+        started = time.perf_counter()
+        buffered = build(payloads, count)
+        elapsed = time.perf_counter() - started
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        gc.callbacks.remove(on_gc)
+
+        results[name] = {
+            "bytes_per_reading": size / count,
+            "build_s": elapsed,
+            "gc_collections": len(collections),
+            "gc_gen2_collections": sum(1 for generation, _ in collections if generation == 2),
+            "gc_pause_ms": sum(pause for _, pause in collections) * 1000,
+        }
+        del buffered
+    return results
+
+
+def measure_storage(count, seed=42):
+    """Bytes per point for each precision, with and without a 1s grid"""
+    random.seed(seed)
+    series = get_series("temperature", "temperature")
+    start = time.time_ns()
+    times = [start + i * 1_000_000_000 + int(random.gauss(0, 2_000_000)) for i in range(count)]
+    values = [round(random.uniform(15.0, 30.0), 2) for _ in range(count)]
+
+    results = {}
+    for grid in (None, 1_000_000_000):
+        stamps = [quantize(t, grid) for t in times] if grid else times
+        batch = ReadingBatch()
+        for time_ns, value in zip(stamps, values):
+            batch.append(Reading(series, value, time_ns))
+        for precision, divisor in PRECISION_DIVISORS.items():
+            body = "\n".join(batch.to_lines(precision)).encode()
+            encoded = sum(
+                len(encode_block([t // divisor for t in stamps[i:i + 1000]], []))
+                for i in range(0, count, 1000))
+            results[f"{precision}{' @1s' if grid else ''}"] = {
+                "line_bytes": len(body) / count,
+                "gzip_bytes": len(gzip.compress(body)) / count,
+                "timestamp_bytes": encoded / count,
+            }
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the change against a baseline; returns the regressed names"""
+    regressions = []
+    print(f"\n{'benchmark':<17} {'baseline':>12} {'current':>12} {'change':>9}")
+    print("-" * 54)
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            print(f"{name:<17} {'-':>12} {result['ns_per_op']:>10.0f}ns {'new':>9}")
+            continue
+        change = result["ns_per_op"] / previous["ns_per_op"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = " ❌"
+        print(
+            f"{name:<17} {previous['ns_per_op']:>10.0f}ns {result['ns_per_op']:>10.0f}ns "
+            f"{change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Micro-benchmark the ingest hot path')
+    parser.add_argument('--only', nargs='+',
+                        help='Run only these benchmarks')
+    parser.add_argument('--payloads', type=int, default=PAYLOADS,
+                        help=f'Synthetic payloads per pass (default: {PAYLOADS})')
+    parser.add_argument('--repeat', type=int, default=REPEAT,
+                        help=f'Timed passes per benchmark, median reported (default: {REPEAT})')
+    parser.add_argument('--save', help='Write results to this JSON baseline file')
+    parser.add_argument('--compare', help='Compare against this JSON baseline file')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help=f'Allowed slowdown before flagging a regression (default: {THRESHOLD})')
+    parser.add_argument('--memory', type=int, metavar='READINGS',
+                        help='Also measure memory and GC for this many buffered readings')
+    parser.add_argument('--storage', type=int, metavar='READINGS',
+                        help='Also measure bytes per point per write precision for this many readings')
+
+    args = parser.parse_args()
+
+    payloads = make_payloads(max(args.payloads, BATCH_SIZE))
+    influx = FakeInfluxDB().start()
+    cases, client = build_cases(payloads, influx.url)
+    if args.only:
+        unknown = set(args.only) - set(cases)
+        if unknown:
+            parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+        cases = {name: cases[name] for name in args.only}
+
+    print(f"🚀 Running {len(cases)} ingest benchmarks ({args.repeat} passes each)...")
+    print(f"{'benchmark':<17} {'per op':>12} {'ops/s':>12} {'stdev':>10}")
+    print("-" * 54)
+
+    results = {}
+    try:
+        for name, (function, operations) in cases.items():
+            result = run_case(function, operations, args.repeat)
+            results[name] = result
+            print(
+                f"{name:<17} {result['ns_per_op']:>10.0f}ns {result['ops_per_s']:>12.0f} "
+                f"{result['stdev_ns']:>8.0f}ns")
+    finally:
+        client.close()
+        influx.stop()
+
+    memory = None
+    if args.memory:
+        print(f"\n🧠 Buffering {args.memory} readings per representation...")
+        memory = measure_memory(payloads, args.memory)
+        print(f"{'representation':<15} {'bytes/reading':>14} {'build':>9} {'GCs':>6} {'gen2':>5} {'GC pause':>10}")
+        print("-" * 64)
+        for name, result in memory.items():
+            print(
+                f"{name:<15} {result['bytes_per_reading']:>14.1f} {result['build_s']:>8.2f}s "
+                f"{result['gc_collections']:>6} {result['gc_gen2_collections']:>5} "
+                f"{result['gc_pause_ms']:>8.1f}ms")
+
+    storage = None
+    if args.storage:
+        print(f"\n💽 Bytes per point over {args.storage} readings at 1 Hz...")
+        storage = measure_storage(args.storage)
+        print(f"{'precision':<10} {'line':>8} {'gzip':>8} {'timestamps':>11}")
+        print("-" * 40)
+        for name, result in storage.items():
+            print(
+                f"{name:<10} {result['line_bytes']:>8.1f} {result['gzip_bytes']:>8.2f} "
+                f"{result['timestamp_bytes']:>11.2f}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump({
+                "timestamp": datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "payloads": len(payloads),
+                "results": results,
+                "memory": memory,
+                "storage": storage,
+            }, f, indent=2)
+        print(f"\n📄 Baseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"\n❌ Regressions beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Bridge Configuration Reload
+Lets mqtt_to_influxdb.py pick up new subscriptions, routes and write
+settings from a JSON file while it runs, instead of being restarted
+
+    {
+      "topics": {"data/temperature": 1, "data/humidity": 1},
+      "routes": ["data/site-a/#=site-a/raw@s"],
+      "precision": "ns",
+      "batch_size": 500,
+      "timestamp_source": "payload",
+      "quantize": "0",
+      "rounding": "round"
+    }
+
+Keys left out keep the value of the command line or environment; "topics"
+may also be a list, subscribed with QoS 1. The file is read again when its
+modification time or size changes (checked every BRIDGE_CONFIG_POLL
+seconds) or when the bridge receives SIGHUP.
+
+A file that does not parse or validate is logged and ignored; the bridge
+keeps running with the configuration it has. See MQTTToInfluxDB.reload()
+for how a new configuration is swapped in.
+
+    BRIDGE_CONFIG        path of the file (default: none, no reloads)
+    BRIDGE_CONFIG_POLL   seconds between file checks (default: 2)
+
+kill -HUP $(pgrep -f mqtt_to_influxdb.py)
+"""
+
+import json
+import logging
+import os
+import signal
+import threading
+from collections import namedtuple
+
+from influx_targets import parse_routes
+from ingest import TimestampAssigner
+from line_protocol import PRECISION_DIVISORS
+
+BRIDGE_CONFIG = os.getenv("BRIDGE_CONFIG")
+BRIDGE_CONFIG_POLL = float(os.getenv("BRIDGE_CONFIG_POLL", "2"))
+
+KEYS = ("topics", "routes", "precision", "batch_size",
+        "timestamp_source", "quantize", "rounding")
+
+# Everything the bridge can change without a restart, already validated
+BridgeConfig = namedtuple("BridgeConfig", ["topics", "routes", "precision", "batch_size",
+                                           "timestamps"])
+
+logger = logging.getLogger("bridge_config")
+
+
+def parse_topics(topics):
+    """{topic: qos} from a dict or a list of topics (QoS 1)"""
+    if isinstance(topics, list):
+        topics = dict.fromkeys(topics, 1)
+    if not isinstance(topics, dict) or not all(
+            isinstance(topic, str) and qos in (0, 1, 2) for topic, qos in topics.items()):
+        raise ValueError('"topics" must be a list of topics or {"topic": qos}')
+    return dict(topics)
+
+
+def load_config(path, base):
+    """The BridgeConfig `base` with the file's keys applied; ValueError or
+    OSError if the file is unusable"""
+    with open(path) as f:
+        try:
+            overrides = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path} is not valid JSON: {e}") from e
+    if not isinstance(overrides, dict):
+        raise ValueError(f"{path} must hold a JSON object")
+    unknown = set(overrides) - set(KEYS)
+    if unknown:
+        raise ValueError(f"Unknown keys in {path}: {', '.join(sorted(unknown))}")
+
+    changes = {}
+    if "topics" in overrides:
+        changes["topics"] = parse_topics(overrides["topics"])
+    if "routes" in overrides:
+        changes["routes"] = parse_routes(overrides["routes"])
+    if "precision" in overrides:
+        if overrides["precision"] not in PRECISION_DIVISORS:
+            raise ValueError(f"Invalid precision {overrides['precision']!r}: "
+                             f"use {', '.join(PRECISION_DIVISORS)}")
+        changes["precision"] = overrides["precision"]
+    if "batch_size" in overrides:
+        batch_size = overrides["batch_size"]
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError('"batch_size" must be a positive integer')
+        changes["batch_size"] = batch_size
+    if {"timestamp_source", "quantize", "rounding"} & set(overrides):
+        timestamps = base.timestamps
+        changes["timestamps"] = TimestampAssigner(
+            overrides.get("timestamp_source", timestamps.source),
+            overrides.get("quantize", f"{timestamps.grid_ns}ns"),
+            overrides.get("rounding", timestamps.rounding),
+            timestamps.clock)
+    return base._replace(**changes)
+
+
+class ConfigWatcher:
+    """Calls on_change(config) from its own thread when the file changes or on SIGHUP"""
+
+    def __init__(self, path, base, on_change, interval=BRIDGE_CONFIG_POLL):
+        self.path = path
+        self.base = base
+        self.on_change = on_change
+        self.interval = interval
+        self.signature = self._signature()
+        self.requested = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.reloads = 0
+        self.failures = 0
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def request(self, *_):
+        """Reload on the next check; safe to call from a signal handler"""
+        self.requested.set()
+
+    def check(self):
+        """Reload if requested or the file changed; True if a config was applied"""
+        signature = self._signature()
+        if not self.requested.is_set() and signature == self.signature:
+            return False
+        self.requested.clear()
+        self.signature = signature
+        try:
+            config = load_config(self.path, self.base)
+        except (OSError, ValueError) as e:
+            self.failures += 1
+            logger.error("❌ Config %s not applied, keeping the current one: %s", self.path, e)
+            return False
+        self.on_change(config)
+        self.reloads += 1
+        return True
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.requested.wait(self.interval)
+            if self.stopped.is_set():
+                break
+            try:
+                self.check()
+            except Exception as e:
+                self.failures += 1
+                logger.error("❌ Config reload failed: %s", e)
+
+    def start(self):
+        # Signal handlers can only be installed from the main thread
+        if hasattr(signal, "SIGHUP") and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGHUP, self.request)
+        self.thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.requested.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=60)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Tag Cardinality Guard
+Bounds the number of series (distinct tag sets) the bridge creates per
+measurement, so a sensor sending a new location on every message cannot
+blow up InfluxDB's index
+
+    admitted tag sets   exact set per measurement, at most the limit; a
+                        reading of a known series costs one set lookup
+    HyperLogLog         1 KiB sketch per measurement estimating how many
+                        distinct tag sets were seen, including the ones
+                        over the limit (about 3% error)
+
+Once a measurement has `limit` series, readings with a new tag set are
+handled by the policy:
+
+    drop      the reading is not written
+    remap     every tag value becomes "_other", so all of them share one
+              overflow series
+    bucket    every tag value becomes one of N hash buckets ("_bucket7"),
+              keeping a coarse split at a bounded cost
+
+Configured through the environment or the bridge's --cardinality-* options;
+a registry entry's "max_series" overrides the limit for its measurement:
+
+    CARDINALITY_LIMIT     series per measurement (default: 1000)
+    CARDINALITY_POLICY    drop, remap or bucket (default: remap)
+    CARDINALITY_BUCKETS   buckets of the bucket policy (default: 16)
+"""
+
+import hashlib
+import logging
+import math
+import os
+import threading
+import zlib
+
+from topic_registry import TOPIC_REGISTRY
+
+CARDINALITY_LIMIT = int(os.getenv("CARDINALITY_LIMIT", "1000"))
+CARDINALITY_POLICY = os.getenv("CARDINALITY_POLICY", "remap")
+CARDINALITY_BUCKETS = int(os.getenv("CARDINALITY_BUCKETS", "16"))
+
+POLICIES = {"drop": "dropped", "remap": "remapped", "bucket": "bucketed"}
+OVERFLOW_VALUE = "_other"
+
+# Per-measurement limits from the registry
+REGISTRY_LIMITS = {entry["measurement"]: entry["max_series"]
+                   for entry in TOPIC_REGISTRY.values() if "max_series" in entry}
+
+logger = logging.getLogger("cardinality")
+
+
+class HyperLogLog:
+    """Distinct count estimate in 2**precision one-byte registers"""
+
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision=10):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        value = int.from_bytes(digest, "big")
+        bits = 64 - self.precision
+        index = value >> bits
+        # Position of the first 1 bit in the remaining bits
+        rank = bits - (value & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small sets
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+
+class _Measurement:
+    __slots__ = ("limit", "series", "sketch", "overflow", "warned")
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.series = set()
+        self.sketch = HyperLogLog()
+        self.overflow = 0
+        self.warned = False
+
+
+class CardinalityGuard:
+    """Admits, remaps or drops tag sets per measurement"""
+
+    def __init__(self, limit=CARDINALITY_LIMIT, policy=CARDINALITY_POLICY,
+                 buckets=CARDINALITY_BUCKETS, limits=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown cardinality policy {policy!r}: use {', '.join(POLICIES)}")
+        self.limit = limit
+        self.policy = policy
+        self.buckets = buckets
+        self.limits = REGISTRY_LIMITS if limits is None else limits
+        self.measurements = {}
+        self.lock = threading.Lock()
+
+    def admit(self, measurement, tags):
+        """Tag tuple to write the reading with, or None to drop it"""
+        state = self.measurements.get(measurement)
+        if state is not None and tags in state.series:
+            return tags
+
+        with self.lock:
+            if state is None:
+                state = self.measurements.setdefault(
+                    measurement, _Measurement(self.limits.get(measurement, self.limit)))
+            if tags in state.series:
+                return tags
+            state.sketch.add(repr(tags))
+            if len(state.series) < state.limit:
+                state.series.add(tags)
+                return tags
+
+            state.overflow += 1
+            if not state.warned:
+                state.warned = True
+                logger.warning("⚠️  %s reached %d series; new tag sets are %s",
+                               measurement, state.limit, POLICIES[self.policy])
+        if self.policy == "drop":
+            return None
+        if self.policy == "remap":
+            return tuple((key, OVERFLOW_VALUE) for key, _ in tags)
+        return tuple((key, f"_bucket{zlib.crc32(value.encode()) % self.buckets}")
+                     for key, value in tags)
+
+    def stats(self):
+        """{measurement: {series, limit, estimated, overflow}}"""
+        with self.lock:
+            return {
+                measurement: {
+                    "series": len(state.series),
+                    "limit": state.limit,
+                    "estimated": max(state.sketch.estimate(), len(state.series)),
+                    "overflow": state.overflow,
+                }
+                for measurement, state in self.measurements.items()
+            }
+
+    def summary(self):
+        """'measurement series/limit (~estimated seen, N over)' per measurement"""
+        return ", ".join(
+            f"{name} {s['series']}/{s['limit']} (~{s['estimated']} seen, {s['overflow']} over)"
+            for name, s in self.stats().items())
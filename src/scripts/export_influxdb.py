@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+InfluxDB Export Tool
+Exports a time range from InfluxDB to CSV or Parquet for offline analysis
+
+The range is split into chunks that are queried concurrently on a thread pool.
+Each chunk is streamed row by row from the HTTP response into a temporary
+file, and the chunks are appended to the output in time order, so memory use
+stays bounded no matter how large the range is.
+
+pipenv run python src/scripts/export_influxdb.py --start -7d --output last_week.csv
+pipenv run python src/scripts/export_influxdb.py --start 2024-01-01 --stop 2024-02-01 --chunk 1d --format parquet --output january.parquet
+pipenv run python src/scripts/export_influxdb.py --start -30d --engine flight --format parquet --output month.parquet
+pipenv run python src/scripts/export_influxdb.py --check
+"""
+
+import argparse
+import csv
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from influxdb_client.client.influxdb_client import InfluxDBClient
+from influxdb_client.domain.dialect import Dialect
+
+from influx_query_client import InfluxQueryClient
+
+# InfluxDB Configuration
+INFLUXDB_URL = os.getenv("INFLUXDB_URL", "http://localhost:8086")
+INFLUXDB_ORG = os.getenv("INFLUXDB_ORG", "myorg")
+INFLUXDB_BUCKET = os.getenv("INFLUXDB_BUCKET", "weather_data")
+INFLUXDB_TOKEN = os.getenv("INFLUXDB_TOKEN")
+
+# Export defaults
+MEASUREMENTS = ["temperature", "humidity"]
+CHUNK = "6h"
+WORKERS = 4
+OUTPUT_COLUMNS = ["time", "measurement", "field", "value"]
+SOURCE_COLUMNS = {f"_{name}": name for name in OUTPUT_COLUMNS}
+
+# Plain CSV rows without annotations; the header is repeated per chunk
+CSV_DIALECT = Dialect(header=True, delimiter=",", annotations=[],
+                      date_time_format="RFC3339Nano")
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_duration(value):
+    """Parse a duration such as 30s, 15m, 6h, 7d or 2w"""
+    match = re.fullmatch(r"(\d+)([smhdw])", value)
+    if not match:
+        raise argparse.ArgumentTypeError(f"Invalid duration: {value}")
+    return timedelta(seconds=int(match.group(1)) * DURATION_UNITS[match.group(2)])
+
+
+def parse_time(value, now):
+    """Parse `now`, a relative time such as -7d, or an ISO 8601 timestamp"""
+    if value == "now":
+        return now
+    if value.startswith("-"):
+        return now - parse_duration(value[1:])
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def split_range(start, stop, chunk):
+    """Split [start, stop) into consecutive chunk windows"""
+    windows = []
+    while start < stop:
+        windows.append((start, min(start + chunk, stop)))
+        start += chunk
+    return windows
+
+
+def format_flux_time(dt):
+    """Format a datetime as a Flux RFC3339 time literal"""
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def build_query(bucket, start, stop, measurements):
+    """Build the Flux query for one chunk window"""
+    predicate = " or ".join(
+        f'r["_measurement"] == "{name}"' for name in measurements)
+    return f'''
+    from(bucket: "{bucket}")
+      |> range(start: {format_flux_time(start)}, stop: {format_flux_time(stop)})
+      |> filter(fn: (r) => {predicate})
+      |> keep(columns: ["_time", "_measurement", "_field", "_value"])
+      |> group()
+      |> sort(columns: ["_time"])
+    '''
+
+
+def build_sql(start, stop, measurements):
+    """Build the Flight SQL query for one chunk window
+
+    Each measurement is a table whose value lives in the column of the same
+    name, as written by the bridge and Telegraf.
+    """
+    time_filter = (f"time >= '{format_flux_time(start)}' "
+                   f"AND time < '{format_flux_time(stop)}'")
+    selects = [
+        f"SELECT time AS _time, '{name}' AS _measurement, '{name}' AS _field, "
+        f'"{name}" AS _value FROM "{name}" WHERE {time_filter}'
+        for name in measurements
+    ]
+    return " UNION ALL ".join(selects) + " ORDER BY _time"
+
+
+def write_batches_csv(path, batches):
+    """Write projected record batches to a chunk file; the number of rows"""
+    import pyarrow.csv as pa_csv
+
+    write_options = pa_csv.WriteOptions(
+        include_header=False, quoting_style="needed")
+    rows = 0
+    with open(path, 'wb') as f:
+        f.write((",".join(OUTPUT_COLUMNS) + "\n").encode())
+        for batch in batches:
+            pa_csv.write_csv(batch, f, write_options)
+            rows += batch.num_rows
+    return rows
+
+
+class ParquetChunkWriter:
+    """Appends CSV chunk files to a single Parquet file batch by batch"""
+
+    def __init__(self, filename):
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pa_csv
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit(
+                "❌ Parquet export requires pyarrow: pipenv install pyarrow")
+
+        self.pa_csv = pa_csv
+        self.schema = pa.schema([
+            ("time", pa.timestamp("ns", tz="UTC")),
+            ("measurement", pa.string()),
+            ("field", pa.string()),
+            ("value", pa.float64()),
+        ])
+        self.convert_options = pa_csv.ConvertOptions(
+            column_types=self.schema)
+        self.writer = pq.ParquetWriter(filename, self.schema)
+
+    def append(self, path):
+        """Stream one chunk file into the Parquet writer"""
+        reader = self.pa_csv.open_csv(
+            path, convert_options=self.convert_options)
+        for batch in reader:
+            self.writer.write_batch(batch)
+
+    def close(self):
+        self.writer.close()
+
+
+def check_formats():
+    """Run a Flight-style batch (zone-less times) through the CSV and Parquet
+    writers; True if both keep the time in UTC"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from influx_query_client import project
+
+    time_ns = 1_700_000_000_123_456_789
+    batch = pa.RecordBatch.from_arrays(
+        [pa.array([time_ns], pa.timestamp("ns")), pa.array(["temperature"]),
+         pa.array(["temperature"]), pa.array([21.5])],
+        names=["_time", "_measurement", "_field", "_value"])
+
+    tmp_dir = tempfile.mkdtemp(prefix="influx_export_check_")
+    try:
+        path = os.path.join(tmp_dir, "chunk.csv")
+        write_batches_csv(path, [project(batch, SOURCE_COLUMNS)])
+        with open(path) as f:
+            f.readline()
+            csv_time = next(csv.reader(f))[0]
+
+        parquet_path = os.path.join(tmp_dir, "check.parquet")
+        writer = ParquetChunkWriter(parquet_path)
+        try:
+            writer.append(path)
+        finally:
+            writer.close()
+        table = pq.read_table(parquet_path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    times = table.column("time")
+    ok = (csv_time.endswith("Z") and times.type == pa.timestamp("ns", tz="UTC")
+          and times[0].value == time_ns)
+    print(f"{'✅' if ok else '❌'} CSV time {csv_time} | Parquet {times.type} {times[0]}")
+    return ok
+
+
+class Exporter:
+    def __init__(self, args):
+        self.args = args
+        self.client = InfluxDBClient(
+            url=INFLUXDB_URL,
+            token=INFLUXDB_TOKEN,  # type: ignore
+            org=INFLUXDB_ORG,
+            connection_pool_maxsize=args.workers,
+            timeout=300_000
+        )
+        self.query_api = self.client.query_api()
+        self.columnar_client = None
+        if args.engine != "flux":
+            self.columnar_client = InfluxQueryClient(
+                engine=args.engine, bucket=args.bucket)
+        self.tmp_dir = tempfile.mkdtemp(prefix="influx_export_")
+
+    def export_chunk(self, index, start, stop):
+        """Stream one chunk window into a temporary CSV file"""
+        query = build_query(self.args.bucket, start, stop,
+                            self.args.measurements)
+        path = os.path.join(self.tmp_dir, f"chunk_{index:06d}.csv")
+        if self.columnar_client:
+            return self.export_chunk_batches(path, query, start, stop)
+
+        rows = 0
+        columns = None
+
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(OUTPUT_COLUMNS)
+            for row in self.query_api.query_csv(query, dialect=CSV_DIALECT):
+                if not row:
+                    continue
+                if columns is None or row[0] == "" and row[1] == "result":
+                    # Header row: locate our columns once per table
+                    columns = [row.index(f"_{name}") for name in OUTPUT_COLUMNS]
+                    continue
+                writer.writerow([row[i] for i in columns])
+                rows += 1
+
+        return path, rows
+
+    def export_chunk_batches(self, path, query, start, stop):
+        """Write one chunk window from Arrow record batches"""
+        sql = build_sql(start, stop, self.args.measurements)
+        # Flux returns _time,_value,_field,_measurement: select by name
+        return path, write_batches_csv(
+            path, self.columnar_client.iter_batches(sql, query, columns=SOURCE_COLUMNS))
+
+    def append_csv(self, output, path):
+        """Append a chunk file to the CSV output, skipping its header"""
+        with open(path, 'r', newline='') as f:
+            f.readline()
+            shutil.copyfileobj(f, output)
+
+    def run(self):
+        """Export every chunk in order while keeping a bounded window in flight"""
+        now = datetime.now(timezone.utc)
+        start = parse_time(self.args.start, now)
+        stop = parse_time(self.args.stop, now)
+        windows = split_range(start, stop, self.args.chunk)
+
+        print(
+            f"📦 Exporting {format_flux_time(start)} → {format_flux_time(stop)} in {len(windows)} chunks")
+
+        parquet_writer = None
+        started = time.monotonic()
+        total_rows = 0
+
+        try:
+            if self.args.format == "parquet":
+                parquet_writer = ParquetChunkWriter(self.args.output)
+                output = None
+            else:
+                output = open(self.args.output, 'w', newline='')
+                csv.writer(output).writerow(OUTPUT_COLUMNS)
+
+            max_in_flight = self.args.workers * 2
+            with ThreadPoolExecutor(max_workers=self.args.workers) as executor:
+                pending = deque()
+                next_window = 0
+
+                while next_window < len(windows) or pending:
+                    # Keep the pool busy without queueing the whole range
+                    while next_window < len(windows) and len(pending) < max_in_flight:
+                        window_start, window_stop = windows[next_window]
+                        pending.append(executor.submit(
+                            self.export_chunk, next_window, window_start, window_stop))
+                        next_window += 1
+
+                    # Consume the oldest chunk so the output stays ordered
+                    path, rows = pending.popleft().result()
+                    if parquet_writer:
+                        parquet_writer.append(path)
+                    else:
+                        self.append_csv(output, path)
+                    os.remove(path)
+
+                    total_rows += rows
+                    done = next_window - len(pending)
+                    print(
+                        f"   ✅ Chunk {done}/{len(windows)} | {rows} rows | {total_rows} total")
+
+            if output:
+                output.close()
+        finally:
+            if parquet_writer:
+                parquet_writer.close()
+            shutil.rmtree(self.tmp_dir, ignore_errors=True)
+            if self.columnar_client:
+                self.columnar_client.close()
+            self.client.close()
+
+        elapsed = time.monotonic() - started
+        print(
+            f"\n🎉 Exported {total_rows} rows to {self.args.output} in {elapsed:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Export InfluxDB data to CSV or Parquet')
+    parser.add_argument('--start', default='-1d',
+                        help='Range start: ISO time or relative like -7d (default: -1d)')
+    parser.add_argument('--stop', default='now',
+                        help='Range stop: ISO time, relative, or now (default: now)')
+    parser.add_argument('--chunk', type=parse_duration, default=parse_duration(CHUNK),
+                        help=f'Time span per query (default: {CHUNK})')
+    parser.add_argument('--bucket', default=INFLUXDB_BUCKET,
+                        help=f'Source bucket (default: {INFLUXDB_BUCKET})')
+    parser.add_argument('--measurements', nargs='+', default=MEASUREMENTS,
+                        help='Measurements to export (default: temperature humidity)')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                        help='Output format (default: csv)')
+    parser.add_argument('--output', help='Output file (required unless --check)')
+    parser.add_argument('--engine', choices=['flux', 'flight', 'auto'], default='flux',
+                        help='flux streams CSV rows; flight/auto read Arrow batches over Flight SQL (default: flux)')
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help=f'Concurrent queries (default: {WORKERS})')
+    parser.add_argument('--check', action='store_true',
+                        help='Write a Flight-style batch through the CSV and Parquet writers '
+                             'without a server; exit 1 if the times are not kept in UTC')
+
+    args = parser.parse_args()
+
+    if args.check:
+        raise SystemExit(0 if check_formats() else 1)
+    if not args.output:
+        parser.error('--output is required')
+
+    if not INFLUXDB_TOKEN:
+        raise ValueError("INFLUXDB_TOKEN environment variable is required")
+
+    Exporter(args).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Telegraf Configuration Generator
+Renders telegraf/telegraf.conf from topic_registry.py, the registry the
+Python bridge and collectors use, so both ingest paths store a topic under
+the same measurement, field and tags
+
+All registered topics share one inputs.mqtt_consumer (a single broker
+connection with a persistent QoS 1 session). topic_parsing names each
+topic's measurement after a topic segment, and processors cover the
+registry entries a topic segment or payload key cannot express.
+
+Batch and buffer sizes follow the expected message rate:
+
+    metric_batch_size           readings arriving in one flush interval,
+                                rounded up to a multiple of 100
+    metric_buffer_limit         readings arriving in --buffer-seconds, so an
+                                InfluxDB outage that long loses nothing
+                                (at most 1,000,000 to bound Telegraf's memory)
+    max_undelivered_messages    two batches, so the next batch fills while
+                                one is being written
+
+pipenv run python src/scripts/generate_telegraf_config.py
+pipenv run python src/scripts/generate_telegraf_config.py --rate 500 --flush-interval 5
+pipenv run python src/scripts/generate_telegraf_config.py --check
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+
+from topic_registry import TOPIC_REGISTRY
+
+OUTPUT = os.path.join(os.path.dirname(__file__), "..", "..", "telegraf", "telegraf.conf")
+
+MQTT_SERVER = "tcp://mosquitto:1883"
+INFLUXDB_URL = "http://influxdb:8086"
+INFLUXDB_ORG = os.getenv("INFLUXDB_ORG", "myorg")
+INFLUXDB_BUCKET = os.getenv("INFLUXDB_BUCKET", "weather_data")
+CLIENT_ID = "telegraf"
+
+# The publisher sends one reading per registered topic every second
+EXPECTED_RATE = float(len(TOPIC_REGISTRY))
+FLUSH_INTERVAL = 10
+BUFFER_SECONDS = 3600
+
+MIN_BATCH_SIZE = 100
+MAX_BATCH_SIZE = 10_000
+MAX_BUFFER_LIMIT = 1_000_000
+
+HEADER = '''# Telegraf Configuration for MQTT to InfluxDB
+#
+# Generated by src/scripts/generate_telegraf_config.py from topic_registry.py;
+# change the registry and regenerate instead of editing this file.
+# Sized for {rate:g} messages/s: {batch} per batch, {buffer} buffered (up to {buffer_seconds}s).
+
+# Global agent configuration
+[agent]
+  interval = "1s"
+  round_interval = true
+  metric_batch_size = {batch}
+  metric_buffer_limit = {buffer}
+  collection_jitter = "0s"
+  flush_interval = "{flush_interval}s"
+  flush_jitter = "0s"
+  precision = ""
+  hostname = ""
+  omit_hostname = false
+
+# Configuration for InfluxDB v2 output plugin
+[[outputs.influxdb_v2]]
+  urls = [{influxdb_url}]
+  token = "${{INFLUXDB_TOKEN}}"
+  organization = {org}
+  bucket = {bucket}
+
+# Configuration for MQTT Consumer input plugin - all registered topics
+[[inputs.mqtt_consumer]]
+  servers = [{server}]
+  topics = [
+{topics}
+  ]
+  qos = 1
+  persistent_session = true
+  client_id = {client_id}
+  max_undelivered_messages = {undelivered}
+  data_format = "json"
+  json_time_key = "timestamp"
+  json_time_format = "2006-01-02T15:04:05.999999"
+  json_timezone = "UTC"
+  tag_keys = [{tag_keys}]
+  username = ""
+  password = ""
+'''
+
+TOPIC_PARSING = '''
+  [[inputs.mqtt_consumer.topic_parsing]]
+    topic = {topic}
+    measurement = {pattern}
+'''
+
+# Measurement that is not one of the topic's segments
+OVERRIDE = '''
+# {topic} -> {measurement}
+[[processors.override]]
+  order = 1
+  name_override = {measurement}
+  [processors.override.tagpass]
+    topic = [{topic}]
+'''
+
+# Field stored under another name than its payload key
+RENAME = '''
+# {measurement}: payload key {payload_key} -> field {field}
+[[processors.rename]]
+  order = 2
+  namepass = [{measurement}]
+  [[processors.rename.replace]]
+    field = {payload_key}
+    dest = {field}
+'''
+
+FOOTER = '''
+# Optional: Add logging for debugging (commented out to ensure data goes to InfluxDB)
+# [[outputs.file]]
+#   files = ["stdout"]
+#   data_format = "json"
+'''
+
+
+def quote(value):
+    """TOML basic string"""
+    return json.dumps(value)
+
+
+def size_buffers(rate, flush_interval, buffer_seconds):
+    """(metric_batch_size, metric_buffer_limit, max_undelivered_messages)"""
+    batch = math.ceil(rate * flush_interval / MIN_BATCH_SIZE) * MIN_BATCH_SIZE
+    batch = min(max(batch, MIN_BATCH_SIZE), MAX_BATCH_SIZE)
+    buffer = max(math.ceil(rate * buffer_seconds / batch) * batch, 10 * batch)
+    buffer = min(buffer, max(MAX_BUFFER_LIMIT // batch, 1) * batch)
+    return batch, buffer, 2 * batch
+
+
+def measurement_pattern(topic, measurement):
+    """topic_parsing pattern naming the measurement after a topic segment,
+    or None if no segment equals it"""
+    segments = topic.split("/")
+    if measurement not in segments:
+        return None
+    index = segments.index(measurement)
+    return quote("/".join("measurement" if i == index else "_" for i in range(len(segments))))
+
+
+def render(registry=TOPIC_REGISTRY, rate=EXPECTED_RATE, flush_interval=FLUSH_INTERVAL,
+           buffer_seconds=BUFFER_SECONDS, server=MQTT_SERVER, influxdb_url=INFLUXDB_URL,
+           org=INFLUXDB_ORG, bucket=INFLUXDB_BUCKET, client_id=CLIENT_ID):
+    """Telegraf configuration text for the registry"""
+    batch, buffer, undelivered = size_buffers(rate, flush_interval, buffer_seconds)
+    tag_keys = sorted({key for entry in registry.values() for key in entry["tag_keys"]})
+
+    parts = [HEADER.format(
+        rate=rate, batch=batch, buffer=buffer, buffer_seconds=buffer_seconds,
+        flush_interval=flush_interval, undelivered=undelivered,
+        influxdb_url=quote(influxdb_url), org=quote(org), bucket=quote(bucket),
+        server=quote(server), client_id=quote(client_id),
+        topics=",\n".join(f"    {quote(topic)}" for topic in registry),
+        tag_keys=", ".join(quote(key) for key in tag_keys))]
+
+    processors = []
+    for topic, entry in registry.items():
+        measurement = entry["measurement"]
+        pattern = measurement_pattern(topic, measurement)
+        if pattern:
+            parts.append(TOPIC_PARSING.format(topic=quote(topic), pattern=pattern))
+        else:
+            processors.append(OVERRIDE.format(
+                topic=quote(topic), measurement=quote(measurement)))
+        if entry["field"] != entry["payload_key"]:
+            processors.append(RENAME.format(
+                measurement=quote(measurement), payload_key=quote(entry["payload_key"]),
+                field=quote(entry["field"])))
+
+    return "".join(parts + processors) + FOOTER
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate telegraf.conf from the topic registry')
+    parser.add_argument('--rate', type=float, default=EXPECTED_RATE,
+                        help=f'Expected messages/s over all topics (default: {EXPECTED_RATE:g})')
+    parser.add_argument('--flush-interval', type=int, default=FLUSH_INTERVAL,
+                        help=f'Seconds between writes to InfluxDB (default: {FLUSH_INTERVAL})')
+    parser.add_argument('--buffer-seconds', type=int, default=BUFFER_SECONDS,
+                        help=f'InfluxDB outage to buffer without losing readings (default: {BUFFER_SECONDS})')
+    parser.add_argument('--server', default=MQTT_SERVER,
+                        help=f'MQTT broker URL (default: {MQTT_SERVER})')
+    parser.add_argument('--influxdb-url', default=INFLUXDB_URL,
+                        help=f'InfluxDB URL (default: {INFLUXDB_URL})')
+    parser.add_argument('--output', default=os.path.normpath(OUTPUT),
+                        help='File to write, - for stdout (default: telegraf/telegraf.conf)')
+    parser.add_argument('--check', action='store_true',
+                        help='Exit with status 1 if --output differs from the generated config')
+
+    args = parser.parse_args()
+
+    config = render(rate=args.rate, flush_interval=args.flush_interval,
+                    buffer_seconds=args.buffer_seconds, server=args.server,
+                    influxdb_url=args.influxdb_url)
+
+    if args.check:
+        with open(args.output) as f:
+            if f.read() != config:
+                print(f"❌ {args.output} is out of date; run generate_telegraf_config.py")
+                sys.exit(1)
+        print(f"✅ {args.output} matches the topic registry")
+    elif args.output == "-":
+        sys.stdout.write(config)
+    else:
+        with open(args.output, "w") as f:
+            f.write(config)
+        print(f"📄 Telegraf config for {len(TOPIC_REGISTRY)} topics written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
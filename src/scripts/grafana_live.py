@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Grafana Live Pusher
+Pushes readings to Grafana Live's HTTP push endpoint so streaming panels
+update in under a second without querying InfluxDB
+
+Lines are pushed to /api/live/push/<stream id>. Grafana publishes each
+measurement on the channel stream/<stream id>/<measurement>, which is what
+the streaming panels created by setup_grafana.py subscribe to.
+"""
+
+import os
+import queue
+import threading
+import time
+
+import requests
+
+# Grafana Live Configuration
+GRAFANA_URL = os.getenv("GRAFANA_URL", "http://localhost:3000")
+GRAFANA_LIVE_TOKEN = os.getenv("GRAFANA_LIVE_TOKEN")
+GRAFANA_LIVE_STREAM = os.getenv("GRAFANA_LIVE_STREAM", "mqtt2grafna")
+
+FLUSH_INTERVAL = 0.1
+MAX_BATCH = 500
+MAX_QUEUE = 10_000
+
+
+def live_channel(measurement, stream_id=GRAFANA_LIVE_STREAM):
+    """Grafana Live channel a measurement is published on"""
+    return f"stream/{stream_id}/{measurement}"
+
+
+class GrafanaLivePusher:
+    """Batches line protocol and pushes it to Grafana Live in the background
+
+    push() never blocks the caller: lines are queued and a worker thread
+    sends them every FLUSH_INTERVAL seconds. When Grafana is slow or down the
+    queue fills up and new lines are dropped instead of stalling ingestion.
+    """
+
+    def __init__(self, url=GRAFANA_URL, token=GRAFANA_LIVE_TOKEN,
+                 stream_id=GRAFANA_LIVE_STREAM, flush_interval=FLUSH_INTERVAL,
+                 max_batch=MAX_BATCH):
+        self.push_url = f"{url}/api/live/push/{stream_id}"
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {token}"
+
+        self.queue = queue.Queue(maxsize=MAX_QUEUE)
+        self.stopped = threading.Event()
+
+        # Statistics
+        self.pushed = 0
+        self.dropped = 0
+        self.errors = 0
+
+        self.thread = threading.Thread(
+            target=self._run, name="grafana-live", daemon=True)
+        self.thread.start()
+
+    def push(self, line):
+        """Queue one line protocol string for pushing"""
+        try:
+            self.queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self):
+        """Collect up to max_batch queued lines"""
+        lines = []
+        while len(lines) < self.max_batch:
+            try:
+                lines.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return lines
+
+    def _send(self, lines):
+        try:
+            response = self.session.post(
+                self.push_url, data="\n".join(lines).encode(), timeout=5)
+            if response.status_code >= 300:
+                self.errors += 1
+                if self.errors == 1 or self.errors % 100 == 0:
+                    print(
+                        f"⚠️  Grafana Live push failed ({response.status_code}): {response.text[:200]}")
+                return
+            self.pushed += len(lines)
+        except requests.exceptions.RequestException as e:
+            self.errors += 1
+            if self.errors == 1 or self.errors % 100 == 0:
+                print(f"⚠️  Grafana Live push error: {e}")
+
+    def _run(self):
+        while not self.stopped.is_set():
+            started = time.monotonic()
+            lines = self._drain()
+            if lines:
+                self._send(lines)
+            # Send right away while there is a backlog
+            if self.queue.qsize() < self.max_batch:
+                elapsed = time.monotonic() - started
+                self.stopped.wait(max(0.0, self.flush_interval - elapsed))
+
+        # Flush whatever is left on shutdown
+        lines = self._drain()
+        while lines:
+            self._send(lines)
+            lines = self._drain()
+
+    def close(self):
+        """Stop the worker after pushing the remaining lines"""
+        self.stopped.set()
+        self.thread.join(timeout=5)
+        self.session.close()
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Hot Cache
+Keeps the most recent readings of every series in memory and serves them
+over a small local HTTP API, so "current value" and "last few minutes"
+questions never reach InfluxDB
+
+    SeriesRing        fixed-size ring of (time, value) in array('q') /
+                      array('d'): 16 bytes per reading, no per-reading objects
+    CompressedSeries  readings packed into blocks of BLOCK_SIZE with
+                      delta-of-delta timestamps and XOR'd float values
+                      (Gorilla-style, byte aligned); the newest block stays
+                      uncompressed so appends and latest() cost the same
+    HotCache          series -> buffer, guarded by one lock
+    HotCacheServer    GET API on a ThreadingHTTPServer
+
+Windows are measured back from the newest reading of each series rather
+than from the wall clock, since payload timestamps come from the
+publisher's clock.
+
+    GET /latest                  newest reading of every series
+    GET /window?seconds=300      readings of the last 300s, as columns
+    GET /aggregate?seconds=300   count, min, max, mean, first and last
+    GET /stats                   series, readings held and bytes used
+
+HotCacheServer(endpoints={"/path": callable}) serves further JSON metrics
+next to the cache, such as the bridge's /cardinality.
+
+Every endpoint except /stats takes measurement= and field= filters; any
+other parameter filters on a tag (location=lab). Times are nanoseconds.
+
+Configured through the environment or the bridge's --hot-cache-* options:
+
+    HOT_CACHE_SIZE        readings kept per series (default: 3600)
+    HOT_CACHE_COMPRESS    1 to compress the buffers (default: 0)
+    HOT_CACHE_HOST        address the API listens on (default: 127.0.0.1)
+    HOT_CACHE_PORT        API port, 0 disables the API (default: 8099)
+
+curl -s localhost:8099/latest
+curl -s 'localhost:8099/aggregate?measurement=temperature&seconds=300'
+"""
+
+import json
+import logging
+import os
+import threading
+from array import array
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+HOT_CACHE_SIZE = int(os.getenv("HOT_CACHE_SIZE", "3600"))
+HOT_CACHE_COMPRESS = os.getenv("HOT_CACHE_COMPRESS", "0") == "1"
+HOT_CACHE_HOST = os.getenv("HOT_CACHE_HOST", "127.0.0.1")
+HOT_CACHE_PORT = int(os.getenv("HOT_CACHE_PORT", "8099"))
+
+# Readings per compressed block
+BLOCK_SIZE = 128
+
+DEFAULT_WINDOW = 300
+
+logger = logging.getLogger("hot_cache")
+
+
+# Encoding -------------------------------------------------------------
+
+def _put_varint(out, n):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(data, offset):
+    n = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        n |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return n, offset
+        shift += 7
+
+
+def encode_block(times, values):
+    """Pack readings into bytes: zigzag varint delta-of-delta times, then
+    values XOR'd with their predecessor as (header byte, middle bytes)"""
+    out = bytearray()
+    previous = delta = 0
+    for time_ns in times:
+        dod = (time_ns - previous) - delta
+        delta = time_ns - previous
+        previous = time_ns
+        _put_varint(out, dod << 1 if dod >= 0 else (-dod << 1) - 1)
+
+    bits = array('Q')
+    bits.frombytes(array('d', values).tobytes())
+    previous = 0
+    for word in bits:
+        xor = word ^ previous
+        previous = word
+        if not xor:
+            out.append(0)
+            continue
+        # Only the bytes between the leading and trailing zero bytes are kept
+        lead = (64 - xor.bit_length()) // 8
+        trail = ((xor & -xor).bit_length() - 1) // 8
+        size = 8 - lead - trail
+        out.append((lead << 3 | trail) + 1)
+        out += (xor >> (8 * trail)).to_bytes(size, "little")
+    return bytes(out)
+
+
+def decode_block(data, count):
+    """(times, values) arrays of an encoded block"""
+    times = array('q')
+    offset = previous = delta = 0
+    for _ in range(count):
+        n, offset = _get_varint(data, offset)
+        delta += n >> 1 if not n & 1 else -((n + 1) >> 1)
+        previous += delta
+        times.append(previous)
+
+    bits = array('Q')
+    word = 0
+    for _ in range(count):
+        header = data[offset]
+        offset += 1
+        if header:
+            header -= 1
+            lead, trail = header >> 3, header & 7
+            end = offset + 8 - lead - trail
+            word ^= int.from_bytes(data[offset:end], "little") << (8 * trail)
+            offset = end
+        bits.append(word)
+    values = array('d')
+    values.frombytes(bits.tobytes())
+    return times, values
+
+
+# Buffers --------------------------------------------------------------
+
+class SeriesRing:
+    """The last `capacity` readings of one series"""
+
+    __slots__ = ("times", "values", "capacity", "head", "size")
+
+    def __init__(self, capacity=HOT_CACHE_SIZE):
+        self.capacity = capacity
+        self.times = array('q', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self.head = 0
+        self.size = 0
+
+    def append(self, time_ns, value):
+        head = self.head
+        self.times[head] = time_ns
+        self.values[head] = value
+        self.head = (head + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def __len__(self):
+        return self.size
+
+    def latest(self):
+        """(time_ns, value) of the newest reading, or None"""
+        if not self.size:
+            return None
+        index = self.head - 1
+        return self.times[index], self.values[index]
+
+    def window(self, since_ns):
+        """(times, values) of the readings at or after since_ns, oldest first"""
+        start = self.head - self.size
+        times = self.times[start:] + self.times[:self.head] if start < 0 \
+            else self.times[start:self.head]
+        values = self.values[start:] + self.values[:self.head] if start < 0 \
+            else self.values[start:self.head]
+        first = len(times)
+        while first and times[first - 1] >= since_ns:
+            first -= 1
+        return times[first:], values[first:]
+
+    def nbytes(self):
+        return (self.times.itemsize + self.values.itemsize) * self.capacity
+
+
+class _Block:
+    __slots__ = ("first", "last", "count", "data")
+
+    def __init__(self, times, values):
+        self.first = times[0]
+        self.last = times[-1]
+        self.count = len(times)
+        self.data = encode_block(times, values)
+
+
+class CompressedSeries:
+    """At least the last `capacity` readings of one series, compressed in
+    blocks; whole blocks are dropped once the rest still holds `capacity`"""
+
+    __slots__ = ("capacity", "blocks", "times", "values", "size")
+
+    def __init__(self, capacity=HOT_CACHE_SIZE):
+        self.capacity = capacity
+        self.blocks = deque()
+        self.times = array('q')
+        self.values = array('d')
+        self.size = 0
+
+    def append(self, time_ns, value):
+        if len(self.times) == BLOCK_SIZE:
+            # Compress before appending, so the newest reading is never in a block
+            self.blocks.append(_Block(self.times, self.values))
+            self.times = array('q')
+            self.values = array('d')
+            while self.blocks and self.size - self.blocks[0].count >= self.capacity:
+                self.size -= self.blocks.popleft().count
+        self.times.append(time_ns)
+        self.values.append(value)
+        self.size += 1
+
+    def __len__(self):
+        return self.size
+
+    def latest(self):
+        if not self.times:
+            return None
+        return self.times[-1], self.values[-1]
+
+    def window(self, since_ns):
+        times = array('q')
+        values = array('d')
+        # Only blocks reaching into the window are decoded
+        for block in self.blocks:
+            if block.last >= since_ns:
+                block_times, block_values = decode_block(block.data, block.count)
+                times += block_times
+                values += block_values
+        times += self.times
+        values += self.values
+        first = 0
+        while first < len(times) and times[first] < since_ns:
+            first += 1
+        return times[first:], values[first:]
+
+    def nbytes(self):
+        return (sum(len(block.data) for block in self.blocks)
+                + (self.times.itemsize + self.values.itemsize) * len(self.times))
+
+
+class HotCache:
+    """Recent readings of every series; safe to read while the bridge appends"""
+
+    def __init__(self, capacity=HOT_CACHE_SIZE, compress=HOT_CACHE_COMPRESS):
+        self.capacity = capacity
+        self.compress = compress
+        self.buffer_type = CompressedSeries if compress else SeriesRing
+        self.buffers = {}
+        self.lock = threading.Lock()
+
+    def add(self, reading):
+        """Keep a readings.Reading"""
+        with self.lock:
+            buffer = self.buffers.get(reading.series)
+            if buffer is None:
+                buffer = self.buffers[reading.series] = self.buffer_type(self.capacity)
+            buffer.append(reading.time_ns, reading.value)
+
+    def select(self, measurement=None, field=None, tags=None):
+        """Series matching the filters; tags must all be present"""
+        with self.lock:
+            series = list(self.buffers)
+        tags = tags or {}
+        return [s for s in series
+                if (measurement is None or s.measurement == measurement)
+                and (field is None or s.field == field)
+                and all(s.tag_dict.get(key) == value for key, value in tags.items())]
+
+    def latest(self, series):
+        with self.lock:
+            return self.buffers[series].latest()
+
+    def window(self, series, seconds=DEFAULT_WINDOW):
+        """(times, values) of the `seconds` up to the series' newest reading"""
+        with self.lock:
+            buffer = self.buffers[series]
+            newest = buffer.latest()
+            if newest is None:
+                return array('q'), array('d')
+            return buffer.window(newest[0] - int(seconds * 1e9))
+
+    def aggregate(self, series, seconds=DEFAULT_WINDOW):
+        times, values = self.window(series, seconds)
+        if not values:
+            return {"count": 0}
+        return {
+            "count": len(values),
+            "min": min(values),
+            "max": max(values),
+            "mean": sum(values) / len(values),
+            "first": values[0],
+            "last": values[-1],
+            "from": times[0],
+            "to": times[-1],
+        }
+
+    def stats(self):
+        with self.lock:
+            buffers = list(self.buffers.values())
+            return {
+                "series": len(buffers),
+                "readings": sum(len(buffer) for buffer in buffers),
+                "bytes": sum(buffer.nbytes() for buffer in buffers),
+                "capacity": self.capacity,
+                "compress": self.compress,
+            }
+
+
+# HTTP API -------------------------------------------------------------
+
+def describe(series):
+    return {"measurement": series.measurement, "field": series.field, "tags": series.tag_dict}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body, separators=(",", ":")).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        cache = self.server.cache
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            seconds = float(params.pop("seconds", DEFAULT_WINDOW))
+        except ValueError:
+            self._reply(400, {"error": "seconds must be a number"})
+            return
+
+        if url.path == "/stats":
+            self._reply(200, cache.stats())
+            return
+        if url.path in self.server.endpoints:
+            self._reply(200, self.server.endpoints[url.path]())
+            return
+        if url.path not in ("/latest", "/window", "/aggregate"):
+            self._reply(404, {"error": "use /latest, /window, /aggregate or /stats"})
+            return
+
+        results = []
+        for series in cache.select(params.pop("measurement", None),
+                                   params.pop("field", None), params):
+            result = describe(series)
+            if url.path == "/latest":
+                latest = cache.latest(series)
+                if latest is None:
+                    continue
+                result["time"], result["value"] = latest
+            elif url.path == "/window":
+                times, values = cache.window(series, seconds)
+                result["times"], result["values"] = times.tolist(), values.tolist()
+            else:
+                result.update(cache.aggregate(series, seconds))
+            results.append(result)
+        self._reply(200, results)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class HotCacheServer:
+    def __init__(self, cache, host=HOT_CACHE_HOST, port=HOT_CACHE_PORT, endpoints=None):
+        self.server = _Server((host, port), _Handler)
+        self.server.cache = cache
+        self.server.endpoints = endpoints or {}
+        self.host, self.port = self.server.server_address[:2]
+        self.url = f"http://{self.host}:{self.port}"
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name="hot-cache-api", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+InfluxDB Query Client
+Columnar query path for bulk reads: Arrow Flight SQL with a Flux fallback
+
+Results are fetched as Arrow record batches over Flight SQL (port 8087, see
+docs/sql-setup-guide.md). When Flight is unavailable - pyarrow missing, an
+InfluxDB 2.x server without Flight SQL, or a connection error - the same read
+goes through Flux, and the annotated-CSV response is parsed column-wise by
+pyarrow (or pandas) instead of being turned into one FluxRecord per row.
+
+Flux queries passed to this client should end in a single table, e.g. with
+`|> group()` or a pivot, so the CSV response has one header.
+"""
+
+import json
+import os
+
+import pandas as pd
+from influxdb_client.client.influxdb_client import InfluxDBClient
+from influxdb_client.domain.dialect import Dialect
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.flight as flight
+
+    UTC_TIMESTAMP = pa.timestamp("ns", tz="UTC")
+except ImportError:
+    pa = None
+
+# InfluxDB Configuration
+INFLUXDB_URL = os.getenv("INFLUXDB_URL", "http://localhost:8086")
+INFLUXDB_FLIGHT_URL = os.getenv(
+    "INFLUXDB_FLIGHT_URL", "grpc+tcp://localhost:8087")
+INFLUXDB_ORG = os.getenv("INFLUXDB_ORG", "myorg")
+INFLUXDB_BUCKET = os.getenv("INFLUXDB_BUCKET", "weather_data")
+INFLUXDB_TOKEN = os.getenv("INFLUXDB_TOKEN")
+
+ENGINES = ["auto", "flight", "flux"]
+
+# Plain CSV rows without annotations
+CSV_DIALECT = Dialect(header=True, delimiter=",", annotations=[],
+                      date_time_format="RFC3339Nano")
+
+# Columns Flux adds to every CSV response that carry no data
+FLUX_META_COLUMNS = ["", "result", "table"]
+
+
+def utc_times(column):
+    """Timestamps as timestamp[ns, tz=UTC]; other columns unchanged
+
+    Flight SQL returns InfluxDB 3 `time` without a zone and Flux CSV parses
+    as UTC, so both backends are normalized to the Flux type.
+    """
+    if pa.types.is_timestamp(column.type) and column.type != UTC_TIMESTAMP:
+        return column.cast(UTC_TIMESTAMP)
+    return column
+
+
+def project(batch, columns):
+    """Record batch of the `columns` ({source name: output name}), in that
+    order, with UTC timestamps"""
+    names = batch.schema.names
+    missing = [name for name in columns if name not in names]
+    if missing:
+        raise KeyError(f"Query result has no column {', '.join(missing)} (got {', '.join(names)})")
+    return pa.RecordBatch.from_arrays(
+        [utc_times(batch.column(names.index(name))) for name in columns],
+        names=list(columns.values()))
+
+
+class InfluxQueryClient:
+    def __init__(self, engine="auto", bucket=INFLUXDB_BUCKET,
+                 url=INFLUXDB_URL, flight_url=INFLUXDB_FLIGHT_URL,
+                 token=INFLUXDB_TOKEN, org=INFLUXDB_ORG):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown query engine: {engine}")
+        if engine == "flight" and pa is None:
+            raise ImportError(
+                "Flight SQL requires pyarrow: pipenv install pyarrow")
+
+        self.bucket = bucket
+        self.influx_client = InfluxDBClient(
+            url=url,
+            token=token,  # type: ignore
+            org=org
+        )
+        self.query_api = self.influx_client.query_api()
+
+        self.flight_client = None
+        self.requested_engine = engine
+        self.engine = engine
+        if engine != "flux" and pa is not None:
+            self.flight_client = flight.FlightClient(flight_url)
+            self.call_options = flight.FlightCallOptions(
+                headers=[(b"authorization", f"Bearer {token}".encode())])
+        elif engine == "auto":
+            self.engine = "flux"
+
+    def _flight_reader(self, sql):
+        """Open a Flight stream for a SQL query against the bucket"""
+        ticket = flight.Ticket(json.dumps({
+            "database": self.bucket,
+            "sql_query": sql,
+            "query_type": "sql",
+        }).encode())
+        return self.flight_client.do_get(ticket, self.call_options)
+
+    def _fall_back(self, error):
+        """Switch an auto client to Flux after a Flight failure"""
+        if self.requested_engine != "auto":
+            raise error
+        if self.engine == "flux":
+            return
+        print(
+            f"⚠️  Flight SQL unavailable ({type(error).__name__}), falling back to Flux")
+        self.engine = "flux"
+
+    def iter_batches(self, sql, flux, columns=None):
+        """Yield the result as Arrow record batches (requires pyarrow)
+
+        `sql` is used over Flight SQL, `flux` when falling back to Flux. Both
+        should return the same columns, e.g. alias SQL `time` as `_time`.
+        `columns` ({source name: output name}) selects and renames columns
+        by name, so both backends yield the same schema whatever order the
+        query returns them in.
+        """
+        if pa is None:
+            raise ImportError(
+                "Record batches require pyarrow: pipenv install pyarrow")
+
+        if self.engine != "flux":
+            try:
+                reader = self._flight_reader(sql)
+            except (pa.ArrowException, OSError) as e:
+                self._fall_back(e)
+            else:
+                for chunk in reader:
+                    yield project(chunk.data, columns) if columns else chunk.data
+                return
+
+        response = self.query_api.query_raw(flux, dialect=CSV_DIALECT)
+        try:
+            reader = pa_csv.open_csv(response)
+        except pa.ArrowInvalid as e:
+            # An empty response means the query matched no data
+            if "Empty CSV" in str(e):
+                return
+            raise
+        for batch in reader:
+            if columns:
+                yield project(batch, columns)
+                continue
+            keep = [i for i, name in enumerate(batch.schema.names)
+                    if name not in FLUX_META_COLUMNS]
+            yield batch.select(keep)
+
+    def query_frame(self, sql, flux):
+        """Return the whole result as a pandas DataFrame"""
+        if pa is not None:
+            batches = list(self.iter_batches(sql, flux))
+            if not batches:
+                return pd.DataFrame()
+            return pa.Table.from_batches(batches).to_pandas()
+
+        # Without pyarrow, parse the Flux CSV with pandas' C parser
+        response = self.query_api.query_raw(flux, dialect=CSV_DIALECT)
+        try:
+            df = pd.read_csv(response)
+        except pd.errors.EmptyDataError:
+            return pd.DataFrame()
+        df = df.drop(columns=[c for c in df.columns
+                              if c.startswith("Unnamed") or c in FLUX_META_COLUMNS])
+        if "_time" in df.columns:
+            df["_time"] = pd.to_datetime(df["_time"], format="ISO8601")
+        return df
+
+    def close(self):
+        if self.flight_client is not None:
+            self.flight_client.close()
+        self.influx_client.close()
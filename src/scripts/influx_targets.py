@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+InfluxDB Write Targets
+Routes readings by topic to (org, bucket, precision) targets, each written
+by its own batching writer, so sites can live in separate buckets and orgs
+with their own retention
+
+Routes are "FILTER=ORG/BUCKET[@PRECISION]", matched in order with MQTT
+wildcards; topics matching none go to INFLUXDB_ORG/INFLUXDB_BUCKET:
+
+    INFLUXDB_ROUTES="data/site-a/#=site-a/raw@s,data/site-b/#=site-b/raw"
+
+Every target has its own queue, thread, retry queue and counters:
+
+    queue       readings waiting for the writer; full means new readings
+                for that target are dropped, never that the MQTT loop waits
+    batching    the writer takes whatever is queued (up to --batch-size),
+                so batches grow with the load and a reading waits at most
+                one write when traffic is light
+    retry       failed batches are kept (up to INFLUXDB_RETRY_READINGS per
+                target, oldest dropped first) and retried with jittered
+                exponential backoff before any newer batch is written
+
+With --profile, each writer records its own "serialize:<target>" and
+"write:<target>" stages (line protocol and the HTTP write of a batch).
+
+A slow or failing target only fills its own queues. Each org's token is
+read from INFLUXDB_TOKEN_<ORG> (upper case, non-alphanumerics as _) and
+falls back to INFLUXDB_TOKEN.
+"""
+
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque, namedtuple
+
+import paho.mqtt.client as mqtt
+from influxdb_client.client.influxdb_client import InfluxDBClient
+from influxdb_client.client.write_api import SYNCHRONOUS
+
+from line_protocol import PRECISION_DIVISORS
+from logging_setup import SampledLogger
+from mqtt_resilience import Backoff
+from profiling import NULL_PROFILER
+from readings import ReadingBatch
+
+INFLUXDB_URL = os.getenv("INFLUXDB_URL", "http://localhost:8086")
+INFLUXDB_ORG = os.getenv("INFLUXDB_ORG", "myorg")
+INFLUXDB_BUCKET = os.getenv("INFLUXDB_BUCKET", "weather_data")
+INFLUXDB_ROUTES = os.getenv("INFLUXDB_ROUTES", "")
+INFLUXDB_BATCH_SIZE = int(os.getenv("INFLUXDB_BATCH_SIZE", "500"))
+INFLUXDB_RETRY_READINGS = int(os.getenv("INFLUXDB_RETRY_READINGS", "100000"))
+
+# Readings queued per target before new ones are dropped
+MAX_QUEUE = 10_000
+
+# Topics whose target is cached; others are matched on every message
+MAX_CACHED_TOPICS = 10_000
+
+Target = namedtuple("Target", ["org", "bucket", "precision"])
+
+DEFAULT_TARGET = Target(INFLUXDB_ORG, INFLUXDB_BUCKET, "ns")
+
+logger = logging.getLogger("influx_targets")
+
+
+def parse_route(spec):
+    """'FILTER=ORG/BUCKET[@PRECISION]' -> (filter, Target)"""
+    topic_filter, _, destination = spec.partition("=")
+    destination, _, precision = destination.partition("@")
+    org, _, bucket = destination.partition("/")
+    precision = precision or "ns"
+    if not (topic_filter and org and bucket):
+        raise ValueError(f"Invalid route {spec!r}: use FILTER=ORG/BUCKET[@PRECISION]")
+    if precision not in PRECISION_DIVISORS:
+        raise ValueError(
+            f"Invalid precision {precision!r} in {spec!r}: use {', '.join(PRECISION_DIVISORS)}")
+    return topic_filter, Target(org, bucket, precision)
+
+
+def parse_routes(specs=INFLUXDB_ROUTES):
+    """Routes from a comma separated string or a list of specs"""
+    if isinstance(specs, str):
+        specs = specs.split(",")
+    return [parse_route(spec.strip()) for spec in specs if spec.strip()]
+
+
+def token_for(org):
+    """INFLUXDB_TOKEN_<ORG>, or INFLUXDB_TOKEN"""
+    name = "INFLUXDB_TOKEN_" + re.sub(r"[^A-Za-z0-9]", "_", org).upper()
+    return os.getenv(name) or os.getenv("INFLUXDB_TOKEN")
+
+
+class TargetWriter:
+    """Writes the readings of one target on its own thread"""
+
+    def __init__(self, target, url=INFLUXDB_URL, token=None, batch_size=INFLUXDB_BATCH_SIZE,
+                 max_queue=MAX_QUEUE, max_retry=INFLUXDB_RETRY_READINGS, reporter=None,
+                 backoff=None, profiler=NULL_PROFILER):
+        self.target = target
+        self.name = f"{target.org}/{target.bucket}@{target.precision}"
+        self.profiler = profiler
+        self.batch_size = batch_size
+        self.max_retry = max_retry
+        self.reporter = reporter
+        self.backoff = backoff or Backoff()
+
+        self.client = InfluxDBClient(url=url, token=token or token_for(target.org), org=target.org)
+        self.write_api = self.client.write_api(write_options=SYNCHRONOUS)
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.retry = deque()
+        self.retry_readings = 0
+        self.retry_at = 0.0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self._run, name=f"writer-{self.name}", daemon=True)
+        self.error_log = SampledLogger(logger, 1)
+
+        # Statistics
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.retried = 0
+        self.batches = 0
+
+    def start(self):
+        if self.thread.ident is None:
+            self.thread.start()
+        return self
+
+    def submit(self, reading):
+        """Queue a reading without blocking; False if the queue is full"""
+        try:
+            self.queue.put_nowait(reading)
+            return True
+        except queue.Full:
+            self._count("dropped", 1)
+            return False
+
+    def _count(self, name, amount):
+        setattr(self, name, getattr(self, name) + amount)
+        if self.reporter:
+            self.reporter.count(name, amount)
+
+    def _next_batch(self, timeout):
+        """Whatever is queued, up to batch_size; waits up to timeout for the first"""
+        batch = ReadingBatch()
+        try:
+            batch.append(self.queue.get(timeout=timeout))
+        except queue.Empty:
+            return batch
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self.stopped.is_set():
+            wait = max(self.retry_at - time.monotonic(), 0) if self.retry else 0.5
+            self._flush(self._next_batch(min(wait, 0.5) or 0.001))
+
+        # Write whatever is still queued on shutdown
+        while True:
+            batch = self._next_batch(0)
+            if not batch:
+                break
+            self._flush(batch)
+
+    def _write(self, batch):
+        target = self.target
+        profiler = self.profiler
+        started = profiler.start()
+        lines = batch.to_lines(target.precision)
+        started = profiler.lap(f"serialize:{self.name}", started)
+        self.write_api.write(bucket=target.bucket, org=target.org, record=lines,
+                             write_precision=target.precision)
+        profiler.lap(f"write:{self.name}", started)
+        self.batches += 1
+        self._count("written", len(batch))
+
+    def _flush(self, batch):
+        """Retry due batches first, then write this one or keep it for later"""
+        if self.retry and time.monotonic() >= self.retry_at:
+            self._retry()
+        if not batch:
+            return
+        if self.retry:
+            # Still failing: keep the order and do not hammer the target
+            self._keep(batch)
+            return
+        try:
+            self._write(batch)
+        except Exception as e:
+            self._failed(e)
+            self._keep(batch)
+
+    def _retry(self):
+        while self.retry:
+            batch = self.retry[0]
+            try:
+                self._write(batch)
+            except Exception as e:
+                self._failed(e)
+                return
+            self.retry.popleft()
+            self.retry_readings -= len(batch)
+            self.retried += len(batch)
+            self.backoff.reset()
+
+    def _keep(self, batch):
+        # Small batches are merged, so a recovering target gets few large writes
+        if self.retry and len(self.retry[-1]) + len(batch) <= self.batch_size:
+            self.retry[-1].extend(batch)
+        else:
+            self.retry.append(batch)
+        self.retry_readings += len(batch)
+        while self.retry_readings > self.max_retry and len(self.retry) > 1:
+            oldest = self.retry.popleft()
+            self.retry_readings -= len(oldest)
+            self._count("dropped", len(oldest))
+
+    def _failed(self, error):
+        delay = self.backoff.next_delay()
+        self.retry_at = time.monotonic() + delay
+        self._count("errors", 1)
+        self.error_log.error("❌ Write to %s failed, retrying in %.1fs: %s", self.name, delay, error)
+
+    def close(self, timeout=30):
+        """Stop the writer, flush the queue, try the retry queue once more"""
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout=timeout)
+        if self.retry:
+            self._retry()
+        if self.retry_readings:
+            logger.warning("⚠️  %s: %d readings could not be written", self.name, self.retry_readings)
+        self.client.close()
+
+    def stats(self):
+        return {
+            "org": self.target.org,
+            "bucket": self.target.bucket,
+            "precision": self.target.precision,
+            "written": self.written,
+            "batches": self.batches,
+            "queued": self.queue.qsize(),
+            "retry_queued": self.retry_readings,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+
+class InfluxRouter:
+    """Topic -> target table with one TargetWriter per distinct target
+
+    Writers of a previous router passed as `writers` are taken over for the
+    targets that are still routed to, queues and retry queues included.
+    """
+
+    def __init__(self, routes=(), default=DEFAULT_TARGET, writers=None, **writer_options):
+        self.routes = list(routes)
+        self.default = default
+        self.cache = {}
+        self.writers = {}
+        writers = writers or {}
+        for target in dict.fromkeys([target for _, target in self.routes] + [default]):
+            writer = writers.get(target)
+            if writer is None:
+                writer = TargetWriter(target, **writer_options)
+            elif "batch_size" in writer_options:
+                writer.batch_size = writer_options["batch_size"]
+            self.writers[target] = writer
+
+    def target_for(self, topic):
+        target = self.cache.get(topic)
+        if target is None:
+            target = next((target for topic_filter, target in self.routes
+                           if mqtt.topic_matches_sub(topic_filter, topic)), self.default)
+            if len(self.cache) < MAX_CACHED_TOPICS:
+                self.cache[topic] = target
+        return target
+
+    def submit(self, topic, reading):
+        """Queue a reading for its topic's target; False if it was dropped"""
+        return self.writers[self.target_for(topic)].submit(reading)
+
+    def start(self):
+        for writer in self.writers.values():
+            writer.start()
+        return self
+
+    def retired(self, successor):
+        """Writers of this router that the successor router does not use"""
+        return [writer for target, writer in self.writers.items()
+                if successor.writers.get(target) is not writer]
+
+    def close(self, writers=None):
+        for writer in self.writers.values() if writers is None else writers:
+            try:
+                writer.close()
+            except Exception as e:
+                logger.error("❌ Error closing writer %s: %s", writer.name, e)
+
+    def stats(self):
+        return {writer.name: writer.stats() for writer in self.writers.values()}
+
+    def describe(self):
+        """One 'filter -> org/bucket@precision' line per route and the default"""
+        return [f"{topic_filter} -> {self.writers[target].name}"
+                for topic_filter, target in self.routes + [("*", self.default)]]
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Ingest Helpers
+Payload decoding, timestamp parsing and topic routing shared by the
+collectors, so each MQTT message is parsed exactly once
+
+Readings without a payload timestamp get their receipt time from
+RECEIPT_CLOCK, a wall clock anchored once at startup and advanced with
+time.monotonic_ns(): receipt times never jump when NTP steps the system
+clock. TimestampAssigner can also ignore payload timestamps and quantize
+times to a grid (1s, 100ms, ...), so readings of different series line up.
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+from line_protocol import PRECISION_DIVISORS, datetime_to_ns
+from profiling import NULL_PROFILER
+from readings import Reading, get_series, ns_to_datetime
+from schemas import InvalidPayload, validator_for
+from topic_registry import lookup
+
+TIMESTAMP_SOURCE = os.getenv("TIMESTAMP_SOURCE", "payload")
+TIMESTAMP_GRID = os.getenv("TIMESTAMP_GRID", "0")
+TIMESTAMP_ROUNDING = os.getenv("TIMESTAMP_ROUNDING", "round")
+
+TIMESTAMP_SOURCES = ["payload", "receipt"]
+ROUNDING_MODES = ["round", "floor"]
+
+DURATION_UNITS = dict(PRECISION_DIVISORS, m=60 * 10**9, h=3600 * 10**9)
+
+
+class MonotonicClock:
+    """Wall clock nanoseconds that only ever move forward at the monotonic rate"""
+
+    def __init__(self):
+        self.anchor_ns = time.time_ns()
+        self.started_ns = time.monotonic_ns()
+
+    def now_ns(self):
+        return self.anchor_ns + time.monotonic_ns() - self.started_ns
+
+
+RECEIPT_CLOCK = MonotonicClock()
+
+
+def parse_duration(value):
+    """Nanoseconds of '250ms', '1s', '5m', ... ('0' or '' is 0)"""
+    value = str(value).strip()
+    if value in ("", "0"):
+        return 0
+    for unit in sorted(DURATION_UNITS, key=len, reverse=True):
+        if value.endswith(unit):
+            number = value[:-len(unit)]
+            try:
+                return round(float(number) * DURATION_UNITS[unit])
+            except ValueError:
+                break
+    raise ValueError(f"Invalid duration {value!r}: use a number with {', '.join(DURATION_UNITS)}")
+
+
+def quantize(time_ns, grid_ns, mode="round"):
+    """Snap a time to the nearest (round) or preceding (floor) grid point"""
+    if mode == "floor":
+        return time_ns - time_ns % grid_ns
+    return (time_ns + grid_ns // 2) // grid_ns * grid_ns
+
+
+def decode_payload(payload):
+    """Decode a JSON payload (bytes) into a dict"""
+    return json.loads(payload)
+
+
+def parse_timestamp(value):
+    """Parse an ISO 8601 payload timestamp; fall back to the receive time"""
+    if value:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return ns_to_datetime(RECEIPT_CLOCK.now_ns())
+
+
+class TimestampAssigner:
+    """Nanosecond time of a reading from its payload timestamp or receipt time"""
+
+    def __init__(self, source=TIMESTAMP_SOURCE, grid=TIMESTAMP_GRID,
+                 rounding=TIMESTAMP_ROUNDING, clock=RECEIPT_CLOCK):
+        if source not in TIMESTAMP_SOURCES:
+            raise ValueError(f"Unknown timestamp source {source!r}: use {', '.join(TIMESTAMP_SOURCES)}")
+        if rounding not in ROUNDING_MODES:
+            raise ValueError(f"Unknown rounding {rounding!r}: use {', '.join(ROUNDING_MODES)}")
+        self.source = source
+        self.grid_ns = parse_duration(grid)
+        self.rounding = rounding
+        self.clock = clock
+
+    def assign(self, value):
+        """Raises ValueError for an unparseable payload timestamp"""
+        if value and self.source == "payload":
+            time_ns = datetime_to_ns(parse_timestamp(value))
+        else:
+            time_ns = self.clock.now_ns()
+        if self.grid_ns:
+            time_ns = quantize(time_ns, self.grid_ns, self.rounding)
+        return time_ns
+
+
+def parse_message(topic, payload, profiler=NULL_PROFILER):
+    """Turn one MQTT message into a Reading, or None if it has no value
+
+    Raises json.JSONDecodeError / ValueError for malformed payloads and
+    schemas.InvalidPayload (a ValueError with a reason code) for payloads
+    that fail the topic's schema. The route, decode, validate and timestamp
+    stages are timed on `profiler`.
+    """
+    started = profiler.start()
+    entry = lookup(topic)
+    started = profiler.lap("route", started)
+    if entry is None:
+        return None
+
+    data = decode_payload(payload)
+    started = profiler.lap("decode", started)
+    reason = validator_for(topic)(data)
+    started = profiler.lap("validate", started)
+    if reason:
+        raise InvalidPayload(reason)
+    value = data.get(entry["payload_key"])
+    if value is None:
+        return None
+
+    timestamp = data.get('timestamp')
+    dt = parse_timestamp(timestamp)
+    profiler.lap("timestamp", started)
+    tags = tuple(sorted(
+        (key, str(data[key])) for key in entry["tag_keys"] if data.get(key)))
+
+    return Reading(
+        get_series(entry["measurement"], entry["field"], tags),
+        float(value),
+        datetime_to_ns(dt),
+        timestamp or dt.isoformat()
+    )
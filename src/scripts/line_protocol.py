@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+InfluxDB Line Protocol Helpers
+Shared escaping and serialization used by the backfill tool and the bridge
+
+Line protocol reference:
+https://docs.influxdata.com/influxdb/v2/reference/syntax/line-protocol/
+"""
+
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Divisors to convert nanosecond timestamps to each write precision
+PRECISION_DIVISORS = {
+    "ns": 1,
+    "us": 1_000,
+    "ms": 1_000_000,
+    "s": 1_000_000_000,
+}
+
+
+def escape_measurement(name):
+    """Escape a measurement name (commas and spaces)"""
+    return name.replace(",", r"\,").replace(" ", r"\ ")
+
+
+def escape_key(key):
+    """Escape a tag key, tag value or field key (commas, equals, spaces)"""
+    return key.replace(",", r"\,").replace("=", r"\=").replace(" ", r"\ ")
+
+
+def datetime_to_ns(dt):
+    """Convert a datetime to integer nanoseconds (naive values are UTC)"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    delta = dt - EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000_000 \
+        + delta.microseconds * 1_000
+
+
+def series_key(measurement, tags=None):
+    """Build the `measurement,tag=value` prefix of a line (tags sorted by key)"""
+    key = escape_measurement(measurement)
+    if tags:
+        for tag_key in sorted(tags):
+            tag_value = tags[tag_key]
+            if tag_value is None or tag_value == "":
+                continue
+            key += f",{escape_key(tag_key)}={escape_key(str(tag_value))}"
+    return key
+
+
+def format_line(measurement, fields, timestamp_ns, tags=None, precision="ns"):
+    """Serialize a single float-field point to a line protocol string"""
+    field_set = ",".join(
+        f"{escape_key(name)}={float(value)!r}" for name, value in fields.items())
+    timestamp = timestamp_ns // PRECISION_DIVISORS[precision]
+    return f"{series_key(measurement, tags)} {field_set} {timestamp}"
+
+
+def frame_to_lines(df, measurement, time_column, field_columns, tags=None,
+                   precision="ns"):
+    """Convert a DataFrame chunk to line protocol in vectorized form
+
+    Fields that are not finite numbers (inf, -inf or unparseable) are left
+out, since line protocol has no literal for them. Rows with an unparseable
+timestamp or with no field left are dropped.
+    Returns a tuple of (list of lines, number of dropped rows).
+    """
+    times = pd.to_datetime(df[time_column], utc=True,
+                           format="ISO8601", errors="coerce")
+    values = df[field_columns].apply(pd.to_numeric, errors="coerce")
+    values = values.where(np.isfinite(values))
+    valid = times.notna() & values.notna().any(axis=1)
+
+    times = times[valid]
+    values = values[valid]
+    if times.empty:
+        return [], int(len(df))
+
+    timestamps = times.dt.as_unit("ns").astype("int64") \
+        // PRECISION_DIVISORS[precision]
+
+    # Build the field set column by column; missing fields are omitted
+    field_set = None
+    for column in field_columns:
+        column_values = values[column]
+        present = column_values.notna()
+        part = (escape_key(column) + "=" + column_values.astype(str)) \
+            .where(present, "")
+        if field_set is None:
+            field_set = part
+        else:
+            separator = pd.Series(",", index=part.index) \
+                .where((field_set != "") & (part != ""), "")
+            field_set = field_set + separator + part
+
+    lines = series_key(measurement, tags) + " " + field_set + " " \
+        + timestamps.astype(str)
+    return lines.tolist(), int((~valid).sum())
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Logging Setup
+Asynchronous, rate-limited logging for the MQTT scripts
+
+    setup_logging()       routes all records through a QueueHandler, so
+                          callers never block on stdout; a QueueListener
+                          thread formats and writes them (text or JSON)
+    SampledLogger         per-message lines limited to N per second, with
+                          a count of the suppressed lines
+    ThroughputReporter    periodic summary line (msgs/s, counters, errors)
+
+Configured through the environment or the matching --log-* options:
+
+    LOG_LEVEL             DEBUG, INFO, WARNING, ... (default: INFO)
+    LOG_FORMAT            text or json (default: text)
+    LOG_SAMPLE_RATE       per-message lines per second, 0 disables (default: 1)
+    LOG_SUMMARY_INTERVAL  seconds between summary lines, 0 disables (default: 10)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1"))
+LOG_SUMMARY_INTERVAL = float(os.getenv("LOG_SUMMARY_INTERVAL", "10"))
+
+LOG_FORMATS = ["text", "json"]
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) \
+    | {"message", "asctime", "taskName"}
+
+_listener = None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, including any `extra` fields"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def setup_logging(level=LOG_LEVEL, fmt=LOG_FORMAT):
+    """Send every log record through a queue to a background writer thread"""
+    global _listener
+    if _listener:
+        _listener.stop()
+
+    handler = logging.StreamHandler(sys.stdout)
+    if fmt == "json":
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)-7s %(message)s", datefmt="%H:%M:%S"))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    _listener = logging.handlers.QueueListener(log_queue, handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+def add_logging_arguments(parser):
+    """Add the shared --log-* options to an argparse parser"""
+    group = parser.add_argument_group('logging')
+    group.add_argument('--log-level', default=LOG_LEVEL,
+                       help=f'Log level (default: {LOG_LEVEL})')
+    group.add_argument('--log-format', choices=LOG_FORMATS, default=LOG_FORMAT,
+                       help=f'Log output format (default: {LOG_FORMAT})')
+    group.add_argument('--log-sample-rate', type=float, default=LOG_SAMPLE_RATE,
+                       help=f'Per-message log lines per second, 0 disables (default: {LOG_SAMPLE_RATE:g})')
+    group.add_argument('--log-summary-interval', type=float, default=LOG_SUMMARY_INTERVAL,
+                       help=f'Seconds between summary lines, 0 disables (default: {LOG_SUMMARY_INTERVAL:g})')
+
+
+class SampledLogger:
+    """Emits at most `rate` records per second; the rest are counted"""
+
+    def __init__(self, logger, rate=LOG_SAMPLE_RATE):
+        self.logger = logger
+        self.interval = 1.0 / rate if rate > 0 else None
+        self.next_allowed = 0.0
+        self.suppressed = 0
+
+    def log(self, level, msg, *args, **kwargs):
+        if self.interval is None or not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        if now < self.next_allowed:
+            self.suppressed += 1
+            return
+        self.next_allowed = now + self.interval
+        if self.suppressed:
+            msg = f"{msg} (+{self.suppressed} suppressed)"
+            self.suppressed = 0
+        self.logger.log(level, msg, *args, **kwargs)
+
+    def debug(self, msg, *args, **kwargs):
+        self.log(logging.DEBUG, msg, *args, **kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        self.log(logging.INFO, msg, *args, **kwargs)
+
+    def warning(self, msg, *args, **kwargs):
+        self.log(logging.WARNING, msg, *args, **kwargs)
+
+    def error(self, msg, *args, **kwargs):
+        self.log(logging.ERROR, msg, *args, **kwargs)
+
+
+class ThroughputReporter:
+    """Counts events and logs a rate summary every `interval` seconds
+
+    `count()` is a plain Counter increment, cheap enough for every message.
+    The first counter name is the one the msgs/s rate is computed from.
+    """
+
+    def __init__(self, logger, counters, interval=LOG_SUMMARY_INTERVAL):
+        self.logger = logger
+        self.counters = counters
+        self.interval = interval
+        self.counts = Counter()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.started_at = time.monotonic()
+        self.last_total = 0
+        self.last_time = self.started_at
+
+    def count(self, name, amount=1):
+        self.counts[name] += amount
+
+    def start(self):
+        if self.interval > 0:
+            self.thread = threading.Thread(
+                target=self._run, name="throughput-reporter", daemon=True)
+            self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.report()
+
+    def report(self, final=False):
+        now = time.monotonic()
+        total = self.counts[self.counters[0]]
+        if final:
+            rate = total / max(now - self.started_at, 1e-9)
+        else:
+            rate = (total - self.last_total) / max(now - self.last_time, 1e-9)
+        self.last_total, self.last_time = total, now
+
+        summary = {name: self.counts[name] for name in self.counters}
+        self.logger.info(
+            "📊 %s%.1f msg/s | %s", "Total: " if final else "",
+            rate, " | ".join(f"{name} {value}" for name, value in summary.items()),
+            extra={"summary": summary, "rate": round(rate, 2)})
+
+    def stop(self):
+        """Stop the periodic summaries and log the final totals"""
+        self.stopped.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        self.report(final=True)
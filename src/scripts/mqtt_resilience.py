@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+MQTT Resilience
+Reconnect handling shared by the bridge and benchmarks
+
+    stable_client_id()      client id that survives restarts (MQTT_CLIENT_ID
+                            or <prefix>-<hostname>), required for the broker
+                            to keep a persistent session
+    parse_brokers()         failover list from MQTT_BROKERS ("host:port,...")
+                            or MQTT_BROKER / MQTT_PORT
+    Backoff                 exponential backoff with full jitter
+    ResilientMQTTClient     paho client with clean_session=False, its own
+                            connect/loop cycle with jittered backoff, broker
+                            failover and resubscription when the broker did
+                            not keep the session
+
+subscribe() and unsubscribe() may be called at any time. A change stays
+pending until the broker acknowledges it. Pending changes are re-sent on
+every reconnect, including one that resumes the session, so a change made
+while disconnected is not lost.
+
+Pass protocol="5" for MQTT v5: the session then outlives the connection
+through SessionExpiryInterval and the client advertises a ReceiveMaximum,
+so the broker never has more than that many unacknowledged QoS 1/2
+messages in flight to us (see mqtt_v5.py).
+
+With a persistent session and QoS 1 subscriptions, the broker queues
+messages while the client is away and delivers them after the reconnect
+instead of dropping them.
+"""
+
+import logging
+import os
+import random
+import socket
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+from mqtt_v5 import (MQTT_PROTOCOL, MQTT_RECEIVE_MAXIMUM, MQTT_SESSION_EXPIRY,
+                     connect_options, create_client)
+
+MQTT_BROKER = os.getenv("MQTT_BROKER", "localhost")
+MQTT_PORT = int(os.getenv("MQTT_PORT", "1883"))
+MQTT_BROKERS = os.getenv("MQTT_BROKERS", "")
+MQTT_KEEPALIVE = int(os.getenv("MQTT_KEEPALIVE", "30"))
+
+# Backoff between connection attempts (seconds)
+BACKOFF_INITIAL = 0.5
+BACKOFF_MAX = 30.0
+
+logger = logging.getLogger("mqtt_resilience")
+
+
+def stable_client_id(prefix):
+    """MQTT_CLIENT_ID if set, otherwise <prefix>-<hostname>"""
+    return os.getenv("MQTT_CLIENT_ID") or f"{prefix}-{socket.gethostname()}"
+
+
+def parse_brokers(value=MQTT_BROKERS):
+    """Parse "host[:port],host[:port]" into [(host, port)]"""
+    brokers = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.rpartition(":") if ":" in item else (item, "", "")
+        brokers.append((host, int(port) if port else 1883))
+    return brokers or [(MQTT_BROKER, MQTT_PORT)]
+
+
+class Backoff:
+    """Exponential backoff with full jitter: uniform(0, min(max, initial * 2^n))"""
+
+    def __init__(self, initial=BACKOFF_INITIAL, maximum=BACKOFF_MAX):
+        self.initial = initial
+        self.maximum = maximum
+        self.attempts = 0
+
+    def next_delay(self):
+        ceiling = min(self.maximum, self.initial * (2 ** self.attempts))
+        self.attempts += 1
+        return random.uniform(0, ceiling)
+
+    def reset(self):
+        self.attempts = 0
+
+
+class ResilientMQTTClient:
+    def __init__(self, client_id, subscriptions, on_message, brokers=None,
+                 clean_session=False, keepalive=MQTT_KEEPALIVE, on_connected=None,
+                 backoff=None, protocol=MQTT_PROTOCOL,
+                 receive_maximum=MQTT_RECEIVE_MAXIMUM, session_expiry=MQTT_SESSION_EXPIRY):
+        self.client_id = client_id
+        self.protocol = protocol
+        self.subscriptions = dict(subscriptions)
+        self.brokers = brokers or parse_brokers()
+        self.keepalive = keepalive
+        self.on_connected = on_connected
+        self.backoff = backoff or Backoff()
+
+        self.client = create_client(client_id, protocol, clean_session)
+        self.connect_options = connect_options(
+            protocol, clean_session, receive_maximum, session_expiry)
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_subscribe = self._on_acknowledged
+        self.client.on_unsubscribe = self._on_acknowledged
+        self.client.on_message = on_message
+
+        # topic -> qos to subscribe or None to unsubscribe, until acknowledged
+        self.pending = {}
+        # mid of a sent SUBSCRIBE/UNSUBSCRIBE -> (topic, qos or None)
+        self.inflight = {}
+        self.subscription_lock = threading.Lock()
+
+        self.broker_index = 0
+        self.connected = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+        # CONNACK properties of the current v5 connection
+        self.server_properties = None
+
+        # Statistics
+        self.connects = 0
+        self.disconnects = 0
+        self.connect_failures = 0
+        self.session_resumed = 0
+        self.disconnected_at = None
+        self.last_outage = None
+        self.outages = []
+
+    @property
+    def broker(self):
+        return self.brokers[self.broker_index]
+
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
+        if rc != 0:
+            logger.error("❌ %s:%s refused the connection, return code: %s", *self.broker, rc)
+            return
+
+        self.connects += 1
+        self.backoff.reset()
+        self.server_properties = properties
+        outage = ""
+        if self.disconnected_at is not None:
+            self.last_outage = time.monotonic() - self.disconnected_at
+            self.outages.append(self.last_outage)
+            self.disconnected_at = None
+            outage = f", outage {self.last_outage:.2f}s"
+
+        session_present = bool(flags.get("session present"))
+        with self.subscription_lock:
+            self.inflight.clear()
+            if session_present:
+                self.session_resumed += 1
+            else:
+                # New session: the broker has no subscriptions for us
+                self.pending = dict(self.subscriptions)
+            for topic, qos in list(self.pending.items()):
+                self._send(topic, qos)
+        self.connected.set()
+
+        logger.info(
+            "✅ Connected to MQTT broker at %s:%s as %s (MQTT %s, session %s%s)", *self.broker,
+            self.client_id, self.protocol, "resumed" if session_present else "new", outage)
+        if self.on_connected:
+            self.on_connected(session_present)
+
+    def _on_disconnect(self, client, userdata, rc, properties=None):
+        self.connected.clear()
+        if self.stopped.is_set():
+            return
+        self.disconnects += 1
+        if self.disconnected_at is None:
+            self.disconnected_at = time.monotonic()
+        logger.warning("⚠️  Disconnected from %s:%s, return code: %s", *self.broker, rc)
+
+    def _failover(self):
+        if len(self.brokers) > 1:
+            self.broker_index = (self.broker_index + 1) % len(self.brokers)
+            logger.info("🔀 Failing over to %s:%s", *self.broker)
+
+    def _send(self, topic, qos):
+        """SUBSCRIBE (or UNSUBSCRIBE for qos None); the change stays pending
+        until acknowledged. Called with subscription_lock held."""
+        if qos is None:
+            rc, mid = self.client.unsubscribe(topic)
+        else:
+            rc, mid = self.client.subscribe(topic, qos=qos)
+        if rc == mqtt.MQTT_ERR_SUCCESS:
+            self.inflight[mid] = (topic, qos)
+
+    def _on_acknowledged(self, client, userdata, mid, *args):
+        with self.subscription_lock:
+            topic, qos = self.inflight.pop(mid, (None, None))
+            if topic is not None and topic in self.pending and self.pending[topic] == qos:
+                del self.pending[topic]
+
+    def _change(self, topic, qos):
+        with self.subscription_lock:
+            self.pending[topic] = qos
+            if self.connected.is_set():
+                self._send(topic, qos)
+            else:
+                logger.info("📝 %s %s queued until the broker is reachable",
+                            "Unsubscribe from" if qos is None else "Subscription to", topic)
+
+    def subscribe(self, topic, qos=1):
+        """Add a subscription; it is restored on every new session"""
+        self.subscriptions[topic] = qos
+        self._change(topic, qos)
+
+    def unsubscribe(self, topic):
+        self.subscriptions.pop(topic, None)
+        self._change(topic, None)
+
+    def run_forever(self):
+        """Connect and process network traffic until stop() is called"""
+        while not self.stopped.is_set():
+            host, port = self.broker
+            connects = self.connects
+            try:
+                self.client.connect(host, port, self.keepalive, **self.connect_options)
+            except OSError as e:
+                self.connect_failures += 1
+                if self.disconnected_at is None:
+                    self.disconnected_at = time.monotonic()
+                logger.warning("⚠️  Cannot reach %s:%s: %s", host, port, e)
+                self._failover()
+                self.stopped.wait(self.backoff.next_delay())
+                continue
+
+            rc = mqtt.MQTT_ERR_SUCCESS
+            while rc == mqtt.MQTT_ERR_SUCCESS and not self.stopped.is_set():
+                rc = self.client.loop(timeout=1.0)
+
+            if self.stopped.is_set():
+                break
+            if self.connects == connects:
+                # No successful CONNACK from this broker: try the next one
+                self.connect_failures += 1
+                if self.disconnected_at is None:
+                    self.disconnected_at = time.monotonic()
+                self._failover()
+            # After a dropped connection the same broker is retried first
+            self.stopped.wait(self.backoff.next_delay())
+
+    def start(self):
+        """Run the connect/loop cycle on a background thread"""
+        self.thread = threading.Thread(
+            target=self.run_forever, name="mqtt-resilient", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        try:
+            self.client.disconnect()
+        except Exception:
+            pass
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
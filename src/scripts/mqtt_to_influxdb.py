@@ -3,23 +3,72 @@
 MQTT to InfluxDB Direct Writer
 Subscribes to MQTT topics and writes directly to InfluxDB
 
+Each message is decoded, validated against its topic's schema, timestamped,
+tagged, checked against the alert rules and queued on the batching writer
+of its InfluxDB target:
+
+    schemas.py          validation and dead letters
+    ingest.py           payload decoding and timestamps
+    cardinality.py      tag set limits
+    alerts.py           threshold and anomaly rules
+    influx_targets.py   routing and batching writers with retry queues
+    hot_cache.py        latest readings over HTTP
+    mqtt_resilience.py  reconnects, failover and persistent subscriptions
+    bridge_config.py    reloading topics, routes and write settings
+
+Set GRAFANA_LIVE_TOKEN to also push every reading to Grafana Live. See the
+README for the options of each feature.
+
 # WORKING CODE!
 
 pipenv run python src/scripts/mqtt_to_influxdb.py
+pipenv run python src/scripts/mqtt_to_influxdb.py --profile --sampling --tracemalloc
+pipenv run python src/scripts/mqtt_to_influxdb.py --log-format json --log-sample-rate 0
+pipenv run python src/scripts/mqtt_to_influxdb.py --protocol 5 --receive-maximum 50
+pipenv run python src/scripts/mqtt_to_influxdb.py --dead-letter file --dead-letter-file rejected.jsonl
+pipenv run python src/scripts/mqtt_to_influxdb.py --hot-cache-size 86400 --hot-cache-compress
+pipenv run python src/scripts/mqtt_to_influxdb.py --route 'data/site-a/#=site-a/raw@s'
+pipenv run python src/scripts/mqtt_to_influxdb.py --precision s --timestamp-source receipt --quantize 1s
+pipenv run python src/scripts/mqtt_to_influxdb.py --config config/bridge.example.json
+pipenv run python src/scripts/mqtt_to_influxdb.py --alert-rules config/alert_rules.example.json
 """
 
+import argparse
 import json
-import paho.mqtt.client as mqtt
-from influxdb_client.client.influxdb_client import InfluxDBClient
-from influxdb_client.client.write.point import Point
-from influxdb_client.client.write_api import SYNCHRONOUS
-from datetime import datetime
+import logging
+import threading
 import time
 import os
 
+from alerts import ALERT_RULES, ALERT_TOPIC, AlertEngine, load_rules
+from bridge_config import BRIDGE_CONFIG, BridgeConfig, ConfigWatcher, load_config
+from cardinality import (CARDINALITY_BUCKETS, CARDINALITY_LIMIT, CARDINALITY_POLICY,
+                         POLICIES, CardinalityGuard)
+from grafana_live import GRAFANA_LIVE_TOKEN, GrafanaLivePusher
+from hot_cache import (HOT_CACHE_COMPRESS, HOT_CACHE_HOST, HOT_CACHE_PORT, HOT_CACHE_SIZE,
+                       HotCache, HotCacheServer)
+from influx_targets import (INFLUXDB_BATCH_SIZE, INFLUXDB_ROUTES, InfluxRouter, Target,
+                            parse_routes)
+from ingest import (ROUNDING_MODES, TIMESTAMP_GRID, TIMESTAMP_ROUNDING, TIMESTAMP_SOURCE,
+                    TIMESTAMP_SOURCES, TimestampAssigner, decode_payload)
+from line_protocol import PRECISION_DIVISORS
+from logging_setup import (LOG_SAMPLE_RATE, LOG_SUMMARY_INTERVAL, SampledLogger,
+                           ThroughputReporter, add_logging_arguments,
+                           setup_logging)
+from mqtt_resilience import ResilientMQTTClient, parse_brokers, stable_client_id
+from mqtt_v5 import (MQTT_PROTOCOL, MQTT_RECEIVE_MAXIMUM, PROTOCOLS, content_type,
+                     is_json)
+from profiling import NULL_PROFILER, add_profile_arguments, profiler_from_args
+from readings import Reading, get_series
+from schemas import (BAD_TIMESTAMP, DEAD_LETTER_TOPIC, INVALID_JSON, UNKNOWN_TOPIC,
+                     DeadLetterQueue, validator_for)
+from topic_registry import lookup
+
 # MQTT Configuration
 MQTT_BROKER = os.getenv("MQTT_BROKER", "localhost")
 MQTT_PORT = int(os.getenv("MQTT_PORT", "1883"))
+MQTT_BROKERS = parse_brokers(os.getenv("MQTT_BROKERS") or f"{MQTT_BROKER}:{MQTT_PORT}")
+MQTT_CLIENT_ID = stable_client_id("mqtt2grafna-bridge")
 TEMPERATURE_TOPIC = "data/temperature"
 HUMIDITY_TOPIC = "data/humidity"
 
@@ -27,121 +76,441 @@ HUMIDITY_TOPIC = "data/humidity"
 INFLUXDB_URL = os.getenv("INFLUXDB_URL", "http://localhost:8086")
 INFLUXDB_ORG = os.getenv("INFLUXDB_ORG", "myorg")
 INFLUXDB_BUCKET = os.getenv("INFLUXDB_BUCKET", "weather_data")
+INFLUXDB_PRECISION = os.getenv("INFLUXDB_PRECISION", "ns")
 INFLUXDB_TOKEN = os.getenv("INFLUXDB_TOKEN")
 
 if not INFLUXDB_TOKEN:
     raise ValueError("INFLUXDB_TOKEN environment variable is required")
 
 
+# Seconds a replaced router stays open for messages already being routed
+RETIRE_GRACE = 1.0
+
+# Console prefix per measurement
+ICONS = {"temperature": "🌡️ ", "humidity": "💧"}
+
+logger = logging.getLogger("mqtt_to_influxdb")
+
+
 class MQTTToInfluxDB:
-    def __init__(self):
-        # Initialize MQTT client
-        self.mqtt_client = mqtt.Client()
-        self.mqtt_client.on_connect = self.on_connect
-        self.mqtt_client.on_message = self.on_message
-
-        # Initialize InfluxDB client
-        self.influx_client = InfluxDBClient(
-            url=INFLUXDB_URL,
-            token=INFLUXDB_TOKEN,  # type: ignore
-            org=INFLUXDB_ORG
+    def __init__(self, profiler=NULL_PROFILER, log_sample_rate=LOG_SAMPLE_RATE,
+                 summary_interval=LOG_SUMMARY_INTERVAL, clean_session=False,
+                 protocol=MQTT_PROTOCOL, receive_maximum=MQTT_RECEIVE_MAXIMUM,
+                 dead_letter="mqtt", dead_letter_file=None, hot_cache_size=HOT_CACHE_SIZE,
+                 hot_cache_compress=HOT_CACHE_COMPRESS, hot_cache_port=HOT_CACHE_PORT,
+                 cardinality=None, routes=None, batch_size=INFLUXDB_BATCH_SIZE,
+                 precision=INFLUXDB_PRECISION, timestamps=None, topics=None,
+                 config_file=BRIDGE_CONFIG, alert_rules=None):
+        self.profiler = profiler
+
+        # Settings that reload() can change while the bridge runs
+        self.config = BridgeConfig(
+            topics=dict(topics or {TEMPERATURE_TOPIC: 1, HUMIDITY_TOPIC: 1}),
+            routes=routes if routes is not None else parse_routes(INFLUXDB_ROUTES),
+            precision=precision,
+            batch_size=batch_size,
+            timestamps=timestamps or TimestampAssigner())
+        self.config_file = config_file
+        self.watcher = None
+        if config_file:
+            # Reloads start from the command line values, so keys removed
+            # from the file fall back to them
+            base = self.config
+            if os.path.exists(config_file):
+                self.config = load_config(config_file, base)
+            else:
+                logger.warning("⚠️  Config %s not found; it is applied once it exists", config_file)
+            self.watcher = ConfigWatcher(config_file, base, self.reload)
+        self.reload_lock = threading.Lock()
+
+        # Initialize MQTT client (reconnects and resubscribes on its own)
+        self.connection = ResilientMQTTClient(
+            client_id=MQTT_CLIENT_ID,
+            subscriptions=dict(self.config.topics),
+            on_message=self.on_message,
+            brokers=MQTT_BROKERS,
+            clean_session=clean_session,
+            protocol=protocol,
+            receive_maximum=receive_maximum
         )
-        self.write_api = self.influx_client.write_api(
-            write_options=SYNCHRONOUS)
-
-        # Statistics
-        self.temp_count = 0
-        self.humidity_count = 0
-
-    def on_connect(self, client, userdata, flags, rc):
-        """Callback when connected to MQTT broker"""
-        if rc == 0:
-            print(f"✅ Connected to MQTT broker at {MQTT_BROKER}:{MQTT_PORT}")
-            client.subscribe(TEMPERATURE_TOPIC)
-            client.subscribe(HUMIDITY_TOPIC)
-            print(f"📡 Subscribed to: {TEMPERATURE_TOPIC}")
-            print(f"📡 Subscribed to: {HUMIDITY_TOPIC}")
-        else:
-            print(f"❌ Failed to connect to MQTT broker, return code: {rc}")
+        self.mqtt_client = self.connection.client
+
+        # Statistics and rate-limited logging
+        self.counts = {"temperature": 0, "humidity": 0}
+        self.message_log = SampledLogger(logger, log_sample_rate)
+        self.error_log = SampledLogger(logger, log_sample_rate)
+        self.reporter = ThroughputReporter(
+            logger, ["received", "written", "rejected", "overflow", "alerts", "dropped",
+                     "errors"],
+            summary_interval)
+
+        # One batching writer per (org, bucket, precision) target
+        self.router = self.build_router(self.config)
+
+        # Optional Grafana Live push for streaming panels
+        self.live_pusher = GrafanaLivePusher() if GRAFANA_LIVE_TOKEN else None
+
+        # Payload timestamp or monotonic receipt time, optionally quantized
+        self.timestamps = self.config.timestamps
+
+        # Bounds the series created per measurement from payload tags
+        self.cardinality = cardinality or CardinalityGuard()
+
+        # Threshold and anomaly rules, published on the bridge's connection
+        self.alerts = AlertEngine(alert_rules, client=self.mqtt_client) if alert_rules else None
+
+        # Recent readings per series, served on hot_cache_port (0: no API)
+        self.hot_cache = HotCache(hot_cache_size, hot_cache_compress) if hot_cache_size else None
+        self.hot_cache_port = hot_cache_port
+        self.hot_cache_server = None
+
+        # Payloads failing their schema go to deadletter/<topic> and/or a file
+        self.dead_letters = None
+        if dead_letter in ("mqtt", "file"):
+            self.dead_letters = DeadLetterQueue(
+                client=self.mqtt_client if dead_letter == "mqtt" else None,
+                path=dead_letter_file)
 
     def on_message(self, client, userdata, msg):
         """Callback when message is received"""
+        profiler = self.profiler
+        started = profiler.start()
+        self.reporter.count("received")
         try:
+            payload = msg.payload
+            started = profiler.lap("receive", started)
+
+            if not is_json(msg):
+                self.reporter.count("errors")
+                self.error_log.warning(
+                    "⚠️  Skipping %s message on %s", content_type(msg), msg.topic)
+                return
+
             # Parse JSON message
-            data = json.loads(msg.payload.decode())
-
-            # Convert timestamp to datetime
-            timestamp_str = data.get('timestamp')
-            if timestamp_str:
-                # Remove 'Z' and parse
-                dt = datetime.fromisoformat(
-                    timestamp_str.replace('Z', '+00:00'))
-            else:
-                dt = datetime.utcnow()
-
-            # Create InfluxDB point based on topic
-            if msg.topic == TEMPERATURE_TOPIC:
-                temperature = data.get('temperature')
-                if temperature is not None:
-                    point = Point("temperature") \
-                        .field("temperature", float(temperature)) \
-                        .time(dt)
-
-                    self.write_api.write(bucket=INFLUXDB_BUCKET, record=point)
-                    self.temp_count += 1
-                    print(
-                        f"🌡️  Temperature: {temperature}°C | Time: {dt.strftime('%H:%M:%S')} | Count: {self.temp_count}")
-
-            elif msg.topic == HUMIDITY_TOPIC:
-                humidity = data.get('humidity')
-                if humidity is not None:
-                    point = Point("humidity") \
-                        .field("humidity", float(humidity)) \
-                        .time(dt)
-
-                    self.write_api.write(bucket=INFLUXDB_BUCKET, record=point)
-                    self.humidity_count += 1
-                    print(
-                        f"💧 Humidity: {humidity}% | Time: {dt.strftime('%H:%M:%S')} | Count: {self.humidity_count}")
-
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON decode error: {e}")
+            try:
+                data = decode_payload(payload)
+            except json.JSONDecodeError as e:
+                self.reject(msg, INVALID_JSON, e)
+                return
+            started = profiler.lap("decode", started)
+
+            # Look up measurement and field for the topic
+            entry = lookup(msg.topic)
+            started = profiler.lap("route", started)
+            if not entry:
+                # Subscribed, but no registry entry for its measurement segment
+                self.reject(msg, UNKNOWN_TOPIC)
+                return
+
+            # Check the payload against the topic's compiled schema
+            reason = validator_for(msg.topic)(data)
+            started = profiler.lap("validate", started)
+            if reason:
+                self.reject(msg, reason)
+                return
+            value = data.get(entry["payload_key"])
+            if value is None:
+                return
+
+            # Payload or receipt time, optionally snapped to a grid
+            timestamp = data.get('timestamp')
+            try:
+                time_ns = self.timestamps.assign(timestamp)
+            except ValueError as e:
+                self.reject(msg, BAD_TIMESTAMP, e)
+                return
+            started = profiler.lap("timestamp", started)
+
+            # Tag with the registry's tag keys, within the series limit
+            measurement = entry["measurement"]
+            tags = tuple(sorted(
+                (key, str(data[key])) for key in entry["tag_keys"] if data.get(key)))
+            admitted = self.cardinality.admit(measurement, tags)
+            started = profiler.lap("tags", started)
+            if admitted is not tags:
+                self.reporter.count("overflow")
+                if admitted is None:
+                    return
+
+            reading = Reading(
+                get_series(measurement, entry["field"], admitted),
+                float(value),
+                time_ns,
+                timestamp
+            )
+            # Cached before the write, so it stays current while InfluxDB is down
+            if self.hot_cache:
+                self.hot_cache.add(reading)
+
+            # Rules see the reading before it is queued, so InfluxDB never delays them
+            if self.alerts:
+                published = self.alerts.observe(reading)
+                started = profiler.lap("alerts", started)
+                if published:
+                    self.reporter.count("alerts", published)
+
+            # The target's writer batches, writes and retries on its own thread
+            queued = self.router.submit(msg.topic, reading)
+            started = profiler.lap("enqueue", started)
+            if not queued:
+                return
+
+            if self.live_pusher:
+                self.push_live(reading.to_line())
+            count = self.counts[measurement] = self.counts.get(measurement, 0) + 1
+            self.message_log.info(
+                "%s %s: %s%s | Time: %s | Count: %d", ICONS.get(measurement, "📈"),
+                measurement, value, entry["unit"], reading.datetime, count)
+
         except Exception as e:
-            print(f"❌ Error processing message: {e}")
+            self.reporter.count("errors")
+            self.error_log.error("❌ Error processing message on %s: %s", msg.topic, e)
+
+    def reject(self, msg, reason, error=None):
+        """Count a payload that failed validation and dead-letter it"""
+        self.reporter.count("rejected")
+        self.error_log.warning("🚫 Rejected payload on %s: %s%s", msg.topic, reason,
+                               f" ({error})" if error else "")
+        if self.dead_letters:
+            self.dead_letters.reject(msg.topic, msg.payload, reason)
+
+    def build_router(self, config, writers=None):
+        """Started router for a config, taking over the given writers"""
+        return InfluxRouter(
+            config.routes, default=Target(INFLUXDB_ORG, INFLUXDB_BUCKET, config.precision),
+            writers=writers, url=INFLUXDB_URL, batch_size=config.batch_size,
+            reporter=self.reporter, profiler=self.profiler).start()
+
+    def reload(self, config):
+        """Apply a new BridgeConfig without stopping the message flow
+
+        The new router (and any new writers) is ready before it replaces
+        the old one in a single assignment, so on_message sees either the
+        old or the new routing table, never a partial one. Writers of
+        targets that are still routed to are carried over with their
+        queues; the rest are drained after RETIRE_GRACE. New subscriptions
+        are made before old ones are dropped, and unchanged ones are left
+        alone.
+        """
+        with self.reload_lock:
+            previous, old_router = self.config, self.router
+            router = self.build_router(config, writers=old_router.writers)
+            self.timestamps = config.timestamps
+            self.router = router
+            self.config = config
+
+            added = {topic: qos for topic, qos in config.topics.items()
+                     if previous.topics.get(topic) != qos}
+            removed = previous.topics.keys() - config.topics.keys()
+            for topic, qos in added.items():
+                self.connection.subscribe(topic, qos)
+            for topic in removed:
+                self.connection.unsubscribe(topic)
+
+            retired = old_router.retired(router)
+            logger.info("🔄 Config reloaded: %d routes | %d writers (%d new, %d retired) | "
+                        "+%d -%d subscriptions", len(config.routes), len(router.writers),
+                        len(router.writers) - len(old_router.writers) + len(retired),
+                        len(retired), len(added), len(removed))
+            for route in router.describe():
+                logger.info("📊 InfluxDB %s", route)
+            if retired:
+                # on_message may still hold the old router for a message
+                time.sleep(RETIRE_GRACE)
+                old_router.close(retired)
+                for writer in retired:
+                    stats = writer.stats()
+                    logger.info("💾 %s retired: written %d | dropped %d",
+                                writer.name, stats["written"], stats["dropped"])
+
+    def start_hot_cache_server(self):
+        """Serve the hot cache locally; the bridge keeps running without it"""
+        if not (self.hot_cache and self.hot_cache_port):
+            return
+        try:
+            self.hot_cache_server = HotCacheServer(
+                self.hot_cache, HOT_CACHE_HOST, self.hot_cache_port,
+                endpoints={"/cardinality": self.cardinality.stats,
+                           "/targets": lambda: self.router.stats(),
+                           "/alerts": self.alerts.active if self.alerts else list}).start()
+            logger.info("🔥 Hot cache API: %s (%d readings per series%s)",
+                        self.hot_cache_server.url, self.hot_cache.capacity,
+                        ", compressed" if self.hot_cache.compress else "")
+        except OSError as e:
+            logger.warning("⚠️  Hot cache API not started on port %d: %s",
+                           self.hot_cache_port, e)
+
+    def push_live(self, line):
+        """Push a line protocol reading to Grafana Live if enabled"""
+        if self.live_pusher:
+            self.live_pusher.push(line)
 
     def start(self):
         """Start the MQTT to InfluxDB bridge"""
-        print("🚀 Starting MQTT to InfluxDB Bridge...")
-        print(f"📊 InfluxDB Bucket: {INFLUXDB_BUCKET}")
-        print("Press Ctrl+C to stop...")
+        logger.info("🚀 Starting MQTT to InfluxDB Bridge...")
+        for route in self.router.describe():
+            logger.info("📊 InfluxDB %s", route)
+        logger.info("📡 Topics: %s", ", ".join(self.config.topics))
+        if self.alerts:
+            logger.info("🚨 %d alert rules, publishing to %s/<measurement>/<rule>",
+                        len(self.alerts.rules), self.alerts.topic_prefix)
+        if self.watcher:
+            logger.info("🔄 Reloading %s when it changes or on SIGHUP", self.config_file)
+            self.watcher.start()
+        logger.info("🔗 MQTT %s brokers: %s (client id %s)", self.connection.protocol,
+                    ", ".join(f"{host}:{port}" for host, port in MQTT_BROKERS), MQTT_CLIENT_ID)
+        if self.live_pusher:
+            logger.info("📺 Grafana Live push: %s", self.live_pusher.push_url)
+        if self.profiler.enabled:
+            logger.info("⏱️  Profiling enabled: %s/", self.profiler.profile_dir)
+        self.start_hot_cache_server()
+        logger.info("Press Ctrl+C to stop...")
 
         try:
-            # Connect to MQTT broker
-            self.mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
+            self.profiler.begin()
+            self.reporter.start()
 
-            # Start the loop
-            self.mqtt_client.loop_forever()
+            # Connect, reconnect and fail over until stopped
+            self.connection.run_forever()
 
         except KeyboardInterrupt:
-            print("\n⏹️  Stopping MQTT to InfluxDB bridge...")
+            logger.info("⏹️  Stopping MQTT to InfluxDB bridge...")
         except Exception as e:
-            print(f"❌ Error: {e}")
+            logger.error("❌ Error: %s", e)
         finally:
             self.cleanup()
 
     def cleanup(self):
         """Clean up resources"""
         try:
-            self.mqtt_client.disconnect()
-            self.influx_client.close()
-            print(
-                f"✅ Cleanup completed. Total written: {self.temp_count} temp, {self.humidity_count} humidity")
+            # Waits for a reload in progress, including its drain
+            if self.watcher:
+                self.watcher.stop()
+            self.connection.stop()
+            if self.hot_cache_server:
+                self.hot_cache_server.stop()
+            if self.live_pusher:
+                self.live_pusher.close()
+            self.router.close()
+            self.reporter.stop()
+            # self.counts is what was queued; the writers' counters (retired
+            # writers included) hold what actually reached InfluxDB
+            totals = self.reporter.counts
+            logger.info(
+                "✅ Cleanup completed. Queued: %s | written %d | dropped %d",
+                ", ".join(f"{count} {measurement}" for measurement, count in self.counts.items()),
+                totals["written"], totals["dropped"])
+            for name, stats in self.router.stats().items():
+                logger.info(
+                    "💾 %s: written %d in %d batches | retried %d | dropped %d | errors %d",
+                    name, stats["written"], stats["batches"], stats["retried"],
+                    stats["dropped"], stats["errors"])
+            logger.info("🏷️  Series: %s", self.cardinality.summary() or "none")
+            if self.alerts:
+                logger.info("🚨 Alerts: %s", self.alerts.summary() or "none fired")
+            if self.dead_letters:
+                if self.dead_letters.total:
+                    logger.info("🚫 Rejected: %s", self.dead_letters.summary())
+                self.dead_letters.close()
+            if self.connection.outages:
+                logger.info(
+                    "🔁 Reconnects: %d | longest outage %.2fs",
+                    len(self.connection.outages), max(self.connection.outages))
+            self.profiler.finish()
         except Exception as e:
-            print(f"❌ Error during cleanup: {e}")
+            logger.error("❌ Error during cleanup: %s", e)
 
 
 def main():
-    bridge = MQTTToInfluxDB()
+    parser = argparse.ArgumentParser(
+        description='Bridge MQTT readings into InfluxDB')
+    parser.add_argument('--clean-session', action='store_true',
+                        help='Start a fresh MQTT session instead of resuming the persistent one')
+    parser.add_argument('--protocol', choices=list(PROTOCOLS), default=MQTT_PROTOCOL,
+                        help=f'MQTT protocol version (default: {MQTT_PROTOCOL})')
+    parser.add_argument('--receive-maximum', type=int, default=MQTT_RECEIVE_MAXIMUM,
+                        help=f'Unacknowledged QoS 1 messages the broker may send ahead, '
+                             f'MQTT 5 only (default: {MQTT_RECEIVE_MAXIMUM})')
+    parser.add_argument('--dead-letter', choices=['mqtt', 'file', 'off'], default='mqtt',
+                        help=f'Where payloads failing their schema go: {DEAD_LETTER_TOPIC}/<topic>, '
+                             f'--dead-letter-file, or nowhere (default: mqtt)')
+    parser.add_argument('--dead-letter-file', default=None,
+                        help='JSON lines file for rejected payloads; with --dead-letter mqtt '
+                             'they are written here as well')
+    parser.add_argument('--hot-cache-size', type=int, default=HOT_CACHE_SIZE,
+                        help=f'Recent readings kept in memory per series, 0 disables the '
+                             f'hot cache (default: {HOT_CACHE_SIZE})')
+    parser.add_argument('--hot-cache-compress', action='store_true', default=HOT_CACHE_COMPRESS,
+                        help='Delta/XOR compress the hot cache')
+    parser.add_argument('--hot-cache-port', type=int, default=HOT_CACHE_PORT,
+                        help=f'Port of the local hot cache API, 0 disables it '
+                             f'(default: {HOT_CACHE_PORT})')
+    parser.add_argument('--cardinality-limit', type=int, default=CARDINALITY_LIMIT,
+                        help=f'Series (tag sets) per measurement (default: {CARDINALITY_LIMIT})')
+    parser.add_argument('--cardinality-policy', choices=list(POLICIES), default=CARDINALITY_POLICY,
+                        help=f'What happens to new tag sets over the limit (default: {CARDINALITY_POLICY})')
+    parser.add_argument('--cardinality-buckets', type=int, default=CARDINALITY_BUCKETS,
+                        help=f'Tag value buckets of the bucket policy (default: {CARDINALITY_BUCKETS})')
+    parser.add_argument('--route', action='append', metavar='FILTER=ORG/BUCKET[@PRECISION]',
+                        help='Write topics matching FILTER to another org and bucket '
+                             '(repeatable, first match wins; default: INFLUXDB_ROUTES)')
+    parser.add_argument('--batch-size', type=int, default=INFLUXDB_BATCH_SIZE,
+                        help=f'Largest batch a target writer sends (default: {INFLUXDB_BATCH_SIZE})')
+    parser.add_argument('--precision', choices=list(PRECISION_DIVISORS), default=INFLUXDB_PRECISION,
+                        help=f'Write precision of the default target; routes set their own '
+                             f'with @PRECISION (default: {INFLUXDB_PRECISION})')
+    parser.add_argument('--timestamp-source', choices=TIMESTAMP_SOURCES, default=TIMESTAMP_SOURCE,
+                        help='Use the payload timestamp (receipt time if it has none) or always '
+                             f'the receipt time (default: {TIMESTAMP_SOURCE})')
+    parser.add_argument('--quantize', default=TIMESTAMP_GRID, metavar='DURATION',
+                        help=f'Snap timestamps to a grid such as 1s or 100ms, 0 to keep them '
+                             f'(default: {TIMESTAMP_GRID})')
+    parser.add_argument('--rounding', choices=ROUNDING_MODES, default=TIMESTAMP_ROUNDING,
+                        help=f'Snap to the nearest or the preceding grid point (default: {TIMESTAMP_ROUNDING})')
+    parser.add_argument('--alert-rules', default=ALERT_RULES, metavar='FILE',
+                        help=f'JSON file of threshold and anomaly rules; alerts are published '
+                             f'to {ALERT_TOPIC}/<measurement>/<rule> (default: ALERT_RULES)')
+    parser.add_argument('--config', default=BRIDGE_CONFIG, metavar='FILE',
+                        help='JSON file of topics, routes and write settings, re-read when it '
+                             'changes or on SIGHUP (default: BRIDGE_CONFIG)')
+    add_profile_arguments(parser)
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    if args.dead_letter == 'file' and not args.dead_letter_file:
+        parser.error('--dead-letter file requires --dead-letter-file')
+    try:
+        routes = parse_routes(args.route) if args.route else None
+        timestamps = TimestampAssigner(args.timestamp_source, args.quantize, args.rounding)
+        alert_rules = load_rules(args.alert_rules) if args.alert_rules else None
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    setup_logging(args.log_level, args.log_format)
+    try:
+        # Reads --config, so a broken file stops the bridge before it connects
+        bridge = MQTTToInfluxDB(
+            profiler=profiler_from_args(args, "bridge"),
+            log_sample_rate=args.log_sample_rate,
+            summary_interval=args.log_summary_interval,
+            clean_session=args.clean_session,
+            protocol=args.protocol,
+            receive_maximum=args.receive_maximum,
+            dead_letter=args.dead_letter,
+            dead_letter_file=args.dead_letter_file,
+            hot_cache_size=args.hot_cache_size,
+            hot_cache_compress=args.hot_cache_compress,
+            hot_cache_port=args.hot_cache_port,
+            cardinality=CardinalityGuard(
+                args.cardinality_limit, args.cardinality_policy, args.cardinality_buckets),
+            routes=routes,
+            batch_size=args.batch_size,
+            precision=args.precision,
+            timestamps=timestamps,
+            config_file=args.config,
+            alert_rules=alert_rules
+        )
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
     bridge.start()
 
 
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+MQTT v5 Transport
+Opt-in MQTT v5 settings shared by the publisher, the bridge and the
+benchmarks; MQTT 3.1.1 stays the default
+
+    create_client()         paho client for "3.1.1" or "5"
+    connect_options()       extra connect() arguments: clean start, session
+                            expiry and the receive maximum we advertise
+    TopicAliasPublisher     publishes with a topic alias after the first
+                            message per topic, marks the payload as UTF-8
+                            JSON (ContentType / PayloadFormatIndicator) and
+                            republishes unacknowledged alias-only messages
+                            with their topic after a reconnect
+    content_type()          content type of a received message
+
+Configured through the environment:
+
+    MQTT_PROTOCOL           3.1.1 or 5 (default: 3.1.1)
+    MQTT_MAX_INFLIGHT       QoS 1/2 messages a publisher keeps in flight (default: 20)
+    MQTT_RECEIVE_MAXIMUM    QoS 1/2 messages the broker may send us before
+                            we acknowledge them, v5 only (default: 100)
+    MQTT_SESSION_EXPIRY     seconds a v5 persistent session outlives the
+                            connection (default: 3600)
+    MQTT_CONTENT_TYPE       ContentType sent with every v5 message, empty to
+                            leave it out (default: application/json)
+
+The ContentType property costs 19 bytes per message, more than a topic
+alias saves on short topics; receivers treat a message without one as
+JSON, so leaving it out is the smallest encoding on the wire.
+"""
+
+import logging
+import os
+import threading
+
+import paho.mqtt.client as mqtt
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+
+MQTT_PROTOCOL = os.getenv("MQTT_PROTOCOL", "3.1.1")
+MQTT_MAX_INFLIGHT = int(os.getenv("MQTT_MAX_INFLIGHT", "20"))
+MQTT_RECEIVE_MAXIMUM = int(os.getenv("MQTT_RECEIVE_MAXIMUM", "100"))
+MQTT_SESSION_EXPIRY = int(os.getenv("MQTT_SESSION_EXPIRY", "3600"))
+MQTT_CONTENT_TYPE = os.getenv("MQTT_CONTENT_TYPE", "application/json")
+
+PROTOCOLS = {"3.1.1": mqtt.MQTTv311, "5": mqtt.MQTTv5}
+
+# Payload encoding of every reading
+CONTENT_TYPE = "application/json"
+PAYLOAD_FORMAT_UTF8 = 1
+
+logger = logging.getLogger("mqtt_v5")
+
+
+def is_v5(protocol):
+    return PROTOCOLS[protocol] == mqtt.MQTTv5
+
+
+def create_client(client_id, protocol=MQTT_PROTOCOL, clean_session=True):
+    """paho client for the protocol; v5 sessions are set up by connect_options()"""
+    if is_v5(protocol):
+        return mqtt.Client(client_id=client_id, protocol=mqtt.MQTTv5)
+    return mqtt.Client(client_id=client_id, clean_session=clean_session,
+                       protocol=PROTOCOLS[protocol])
+
+
+def connect_options(protocol=MQTT_PROTOCOL, clean_session=True,
+                    receive_maximum=MQTT_RECEIVE_MAXIMUM, session_expiry=MQTT_SESSION_EXPIRY):
+    """Keyword arguments for client.connect(); empty for 3.1.1"""
+    if not is_v5(protocol):
+        return {}
+    properties = Properties(PacketTypes.CONNECT)
+    properties.ReceiveMaximum = receive_maximum
+    if not clean_session and session_expiry:
+        # Without an expiry interval a v5 session ends with the connection
+        properties.SessionExpiryInterval = session_expiry
+    return {"clean_start": clean_session, "properties": properties}
+
+
+def content_type(msg, default=CONTENT_TYPE):
+    """ContentType of a received message; 3.1.1 messages get the default"""
+    return getattr(msg.properties, "ContentType", default) if msg.properties else default
+
+
+def is_json(msg):
+    """True unless the message declares a content type other than JSON"""
+    return content_type(msg).split(";")[0].strip() == CONTENT_TYPE
+
+
+class TopicAliasPublisher:
+    """Publishes readings with the v5 properties; a plain publish on 3.1.1
+
+    Topic aliases only live as long as one connection, so connected() must
+    be called from on_connect and published() from on_publish. Messages sent
+    with an alias alone are tracked until they are acknowledged. On
+    reconnect, the oldest one per alias is published again with its full
+    topic, which sets the alias on the new connection before paho resends
+    the unacknowledged messages it still holds.
+    """
+
+    def __init__(self, client, protocol=MQTT_PROTOCOL, max_inflight=MQTT_MAX_INFLIGHT,
+                 content_type=MQTT_CONTENT_TYPE, user_properties=()):
+        self.client = client
+        self.v5 = is_v5(protocol)
+        self.max_inflight = max_inflight
+        self.content_type = content_type
+        self.user_properties = list(user_properties)
+        self.lock = threading.Lock()
+        self.alias_maximum = 0
+        # Topic -> alias, kept across connections; aliases set on this one
+        self.aliases = {}
+        self.established = set()
+        self.properties = {}
+        # Alias-only publishes by mid: (topic, payload, qos, retain)
+        self.unacked = {}
+        self.acknowledged_early = set()
+        self.unacked_lock = threading.Lock()
+        # paho only accepts this before connecting
+        client.max_inflight_messages_set(max_inflight)
+
+    def _properties(self, alias=None):
+        """Shared Properties per alias (None: no alias); paho only reads them"""
+        properties = self.properties.get(alias)
+        if properties is None:
+            properties = Properties(PacketTypes.PUBLISH)
+            if self.content_type:
+                properties.ContentType = self.content_type
+            properties.PayloadFormatIndicator = PAYLOAD_FORMAT_UTF8
+            if self.user_properties:
+                properties.UserProperty = self.user_properties
+            if alias is not None:
+                properties.TopicAlias = alias
+            self.properties[alias] = properties
+        return properties
+
+    def connected(self, properties=None):
+        """Apply the broker's CONNACK limits and set the topic aliases again"""
+        if not self.v5:
+            return
+        receive_maximum = getattr(properties, "ReceiveMaximum", 65535) if properties else 65535
+        if receive_maximum < self.max_inflight:
+            logger.warning("⚠️  The broker accepts %d messages in flight; set MQTT_MAX_INFLIGHT "
+                           "to at most that (now %d)", receive_maximum, self.max_inflight)
+        with self.lock:
+            self.alias_maximum = getattr(properties, "TopicAliasMaximum", 0) if properties else 0
+            self.aliases = {topic: alias for topic, alias in self.aliases.items()
+                            if alias <= self.alias_maximum}
+            self.established.clear()
+
+            with self.unacked_lock:
+                pending = list(self.unacked.values())
+            for topic, payload, qos, retain in pending:
+                alias = self.aliases.get(topic)
+                if alias is not None and alias not in self.established:
+                    self.established.add(alias)
+                    self.client.publish(topic, payload, qos=qos, retain=retain,
+                                        properties=self._properties(alias))
+
+    def published(self, mid):
+        """Forget an acknowledged message; call from on_publish"""
+        with self.unacked_lock:
+            if self.unacked.pop(mid, None) is None:
+                # Acknowledged before publish() recorded it
+                self.acknowledged_early.add(mid)
+
+    def publish(self, topic, payload, qos=1, retain=False):
+        if not self.v5:
+            return self.client.publish(topic, payload, qos=qos, retain=retain)
+
+        with self.lock:
+            alias = self.aliases.get(topic)
+            if alias is None and len(self.aliases) < self.alias_maximum:
+                alias = self.aliases[topic] = len(self.aliases) + 1
+            if alias is None:
+                return self.client.publish(
+                    topic, payload, qos=qos, retain=retain, properties=self._properties())
+
+            if alias not in self.established:
+                # First message on this connection sends the topic and sets the alias
+                self.established.add(alias)
+                return self.client.publish(
+                    topic, payload, qos=qos, retain=retain, properties=self._properties(alias))
+
+            # Known alias: the topic string is left out of the packet
+            info = self.client.publish(
+                "", payload, qos=qos, retain=retain, properties=self._properties(alias))
+            # Only a full queue drops it; paho keeps it while disconnected
+            if qos and info.rc != mqtt.MQTT_ERR_QUEUE_SIZE:
+                with self.unacked_lock:
+                    if info.mid in self.acknowledged_early:
+                        self.acknowledged_early.discard(info.mid)
+                    else:
+                        self.unacked[info.mid] = (topic, payload, qos, retain)
+            return info
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+MQTT Multi-Topic Subscriber
+Subscribes to any number of topic filters on a single connection and
+dispatches each message to the handlers registered for it
+
+Routes are given as FILTER[=HANDLER[,HANDLER...]] (default handler: print).
+A handler is one of the built-ins below or a plugin named "module:attr",
+where attr is a Handler subclass or a function called with the message:
+
+    print       reading with its unit from topic_registry.py
+    raw         topic and raw payload
+
+The dispatch table resolves each topic once against the filters and caches
+the result, so the per-message cost stays flat as filters are added.
+Handlers run on the MQTT thread unless --workers N is given: messages then
+go to N worker threads with bounded queues, and all messages of one topic
+go to the same worker so they are handled in order.
+
+pipenv run python src/scripts/multi_subscriber.py data/temperature data/humidity
+pipenv run python src/scripts/multi_subscriber.py 'data/#=raw' --workers 4
+pipenv run python src/scripts/multi_subscriber.py data/temperature=print,my_plugin:handle
+"""
+
+import argparse
+import importlib
+import logging
+import queue
+import threading
+
+import paho.mqtt.client as mqtt
+
+from ingest import decode_payload
+from logging_setup import (LOG_SAMPLE_RATE, LOG_SUMMARY_INTERVAL, SampledLogger,
+                           ThroughputReporter, add_logging_arguments,
+                           setup_logging)
+from mqtt_resilience import ResilientMQTTClient, parse_brokers
+from mqtt_v5 import MQTT_PROTOCOL, PROTOCOLS
+from topic_registry import lookup
+
+MQTT_CLIENT_ID = "python_subscriber"
+DEFAULT_HANDLER = "print"
+
+# Topics whose matching handlers are cached; unseen topics beyond this are
+# matched against the filters on every message
+MAX_CACHED_TOPICS = 10_000
+
+# Messages queued per worker before new ones are dropped
+MAX_QUEUE = 10_000
+
+logger = logging.getLogger("multi_subscriber")
+
+
+class Handler:
+    """Base class for message handlers; one instance serves every route it is on"""
+
+    name = "handler"
+
+    def handle(self, msg):
+        raise NotImplementedError
+
+    def close(self):
+        """Release resources when the subscriber stops"""
+
+
+class ReadingPrinter(Handler):
+    """Prints the reading of a registered topic with its unit"""
+
+    name = "print"
+
+    def handle(self, msg):
+        entry = lookup(msg.topic)
+        try:
+            data = decode_payload(msg.payload)
+        except ValueError:
+            print(f"\nRaw message received on {msg.topic}: {msg.payload.decode(errors='replace')}")
+            return
+        if not entry:
+            print(f"\nData received on {msg.topic}: {data}")
+            return
+
+        # One print per message, so lines from several workers never interleave
+        label = entry["measurement"].title()
+        print(f"\n{label} data received:\n"
+              f"   {label}: {data.get(entry['payload_key'], 'N/A')}{entry['unit']}\n"
+              f"   Timestamp: {data.get('timestamp', 'N/A')}")
+
+
+class RawPrinter(Handler):
+    """Prints the topic and the undecoded payload"""
+
+    name = "raw"
+
+    def handle(self, msg):
+        print(f"{msg.topic}: {msg.payload.decode(errors='replace')}")
+
+
+class FunctionHandler(Handler):
+    """Wraps a plain function taking the message"""
+
+    def __init__(self, function):
+        self.function = function
+        self.name = getattr(function, "__name__", repr(function))
+
+    def handle(self, msg):
+        self.function(msg)
+
+
+HANDLERS = {handler.name: handler for handler in (ReadingPrinter, RawPrinter)}
+
+
+def load_handler(spec):
+    """Handler for a built-in name or a "module:attr" plugin"""
+    if spec in HANDLERS:
+        return HANDLERS[spec]()
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(
+            f"Unknown handler {spec!r}: use {', '.join(HANDLERS)} or module:attr")
+    target = getattr(importlib.import_module(module_name), attr)
+    if isinstance(target, type):
+        target = target()
+    return target if isinstance(target, Handler) else FunctionHandler(target)
+
+
+def parse_routes(specs):
+    """Parse FILTER[=HANDLER,...] specs into {filter: [handlers]}
+
+    A handler named by several routes is loaded once and shared.
+    """
+    loaded = {}
+    routes = {}
+    for spec in specs:
+        topic_filter, _, names = spec.partition("=")
+        for name in (names or DEFAULT_HANDLER).split(","):
+            if name not in loaded:
+                loaded[name] = load_handler(name)
+            routes.setdefault(topic_filter, []).append(loaded[name])
+    return routes
+
+
+class Dispatcher:
+    """Topic filter -> handlers table with a per-topic match cache"""
+
+    def __init__(self, routes=None):
+        self.routes = {}
+        self.cache = {}
+        for topic_filter, handlers in (routes or {}).items():
+            for handler in handlers:
+                self.add(topic_filter, handler)
+
+    def add(self, topic_filter, handler):
+        self.routes.setdefault(topic_filter, []).append(handler)
+        self.cache.clear()
+
+    def remove(self, topic_filter):
+        self.routes.pop(topic_filter, None)
+        self.cache.clear()
+
+    def match(self, topic):
+        """Handlers of every filter matching the topic, each at most once"""
+        handlers = self.cache.get(topic)
+        if handlers is None:
+            handlers = tuple(dict.fromkeys(
+                handler
+                for topic_filter, route in self.routes.items()
+                if mqtt.topic_matches_sub(topic_filter, topic)
+                for handler in route))
+            if len(self.cache) < MAX_CACHED_TOPICS:
+                self.cache[topic] = handlers
+        return handlers
+
+    @property
+    def handlers(self):
+        return list(dict.fromkeys(
+            handler for route in self.routes.values() for handler in route))
+
+
+class WorkerPool:
+    """Worker threads with one bounded queue each, picked by topic"""
+
+    def __init__(self, workers, handle, max_queue=MAX_QUEUE):
+        self.handle = handle
+        self.queues = [queue.Queue(maxsize=max_queue) for _ in range(workers)]
+        self.threads = [
+            threading.Thread(target=self._run, args=(work,),
+                             name=f"subscriber-worker-{index}", daemon=True)
+            for index, work in enumerate(self.queues)]
+        self.dropped = 0
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def submit(self, topic, *item):
+        """Queue work for the topic's worker; False if its queue is full"""
+        try:
+            self.queues[hash(topic) % len(self.queues)].put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self, work):
+        while True:
+            item = work.get()
+            if item is None:
+                return
+            self.handle(*item)
+
+    def close(self):
+        """Handle everything still queued, then stop the workers"""
+        for work in self.queues:
+            work.put(None)
+        for thread in self.threads:
+            if thread.is_alive():
+                thread.join()
+
+
+class MultiSubscriber:
+    def __init__(self, routes, client_id=MQTT_CLIENT_ID, workers=0, qos=1,
+                 brokers=None, protocol=MQTT_PROTOCOL, log_sample_rate=LOG_SAMPLE_RATE,
+                 summary_interval=LOG_SUMMARY_INTERVAL):
+        self.dispatcher = Dispatcher(routes)
+        self.qos = qos
+        self.pool = WorkerPool(workers, self.dispatch) if workers else None
+
+        # One connection for every filter; resubscribes after reconnects
+        self.connection = ResilientMQTTClient(
+            client_id=client_id,
+            subscriptions={topic_filter: qos for topic_filter in routes},
+            on_message=self.on_message,
+            brokers=brokers or parse_brokers(),
+            clean_session=True,
+            protocol=protocol
+        )
+
+        self.error_log = SampledLogger(logger, log_sample_rate)
+        self.reporter = ThroughputReporter(
+            logger, ["received", "handled", "unrouted", "dropped", "errors"], summary_interval)
+
+    def add_route(self, topic_filter, handler):
+        """Route another filter to a handler while running"""
+        subscribed = topic_filter in self.dispatcher.routes
+        self.dispatcher.add(topic_filter, handler)
+        if not subscribed:
+            self.connection.subscribe(topic_filter, qos=self.qos)
+
+    def remove_route(self, topic_filter):
+        self.dispatcher.remove(topic_filter)
+        self.connection.unsubscribe(topic_filter)
+
+    def on_message(self, client, userdata, msg):
+        """Look up the handlers and run them here or on a worker"""
+        self.reporter.count("received")
+        handlers = self.dispatcher.match(msg.topic)
+        if not handlers:
+            self.reporter.count("unrouted")
+            return
+        if self.pool:
+            if not self.pool.submit(msg.topic, handlers, msg):
+                self.reporter.count("dropped")
+        else:
+            self.dispatch(handlers, msg)
+
+    def dispatch(self, handlers, msg):
+        for handler in handlers:
+            try:
+                handler.handle(msg)
+                self.reporter.count("handled")
+            except Exception as e:
+                self.reporter.count("errors")
+                self.error_log.error("❌ %s handler failed on %s: %s", handler.name, msg.topic, e)
+
+    def start(self):
+        """Connect and dispatch messages until interrupted"""
+        logger.info("🚀 Starting subscriber for %d topic filter(s)...", len(self.dispatcher.routes))
+        for topic_filter, handlers in self.dispatcher.routes.items():
+            logger.info("📡 %s -> %s", topic_filter, ", ".join(handler.name for handler in handlers))
+        if self.pool:
+            logger.info("🧵 Handling messages on %d worker threads", len(self.pool.threads))
+        logger.info("Press Ctrl+C to stop...")
+
+        try:
+            if self.pool:
+                self.pool.start()
+            self.reporter.start()
+            self.connection.run_forever()
+
+        except KeyboardInterrupt:
+            logger.info("⏹️  Stopping subscriber...")
+        except Exception as e:
+            logger.error("❌ Error: %s", e)
+        finally:
+            self.cleanup()
+
+    def cleanup(self):
+        """Disconnect, finish queued work and close the handlers"""
+        self.connection.stop()
+        if self.pool:
+            self.pool.close()
+        for handler in self.dispatcher.handlers:
+            try:
+                handler.close()
+            except Exception as e:
+                logger.error("❌ Error closing %s handler: %s", handler.name, e)
+        self.reporter.stop()
+        logger.info("✅ Subscriber disconnected")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Subscribe to several MQTT topic filters on one connection')
+    parser.add_argument('routes', nargs='+', metavar='FILTER[=HANDLER,...]',
+                        help=f'Topic filter and its handlers (default handler: {DEFAULT_HANDLER}; '
+                             f'built-in: {", ".join(HANDLERS)}; plugins: module:attr)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Handle messages on this many worker threads (default: 0, MQTT thread)')
+    parser.add_argument('--qos', type=int, choices=[0, 1, 2], default=1,
+                        help='Subscription QoS (default: 1)')
+    parser.add_argument('--client-id', default=MQTT_CLIENT_ID,
+                        help=f'MQTT client id (default: {MQTT_CLIENT_ID})')
+    parser.add_argument('--protocol', choices=list(PROTOCOLS), default=MQTT_PROTOCOL,
+                        help=f'MQTT protocol version (default: {MQTT_PROTOCOL})')
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+
+    setup_logging(args.log_level, args.log_format)
+    try:
+        routes = parse_routes(args.routes)
+    except (ValueError, ImportError, AttributeError) as e:
+        parser.error(str(e))
+
+    subscriber = MultiSubscriber(
+        routes,
+        client_id=args.client_id,
+        workers=args.workers,
+        qos=args.qos,
+        protocol=args.protocol,
+        log_sample_rate=args.log_sample_rate,
+        summary_interval=args.log_summary_interval
+    )
+    subscriber.start()
+
+
+if __name__ == "__main__":
+    main()
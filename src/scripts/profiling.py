@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Ingest Profiling
+Per-stage timing counters plus optional cProfile, sampling and tracemalloc
+dumps for the bridge and collectors, enabled with --profile
+
+Stage timings cost two perf_counter_ns() calls and a few integer updates
+per stage. Each stage keeps a count, total, max and a power-of-two latency
+histogram for percentiles. When profiling is off, NULL_PROFILER provides
+the same methods as no-ops.
+
+Each stage name should be recorded from a single thread (sinks use their
+own "write:<sink>" stage), so the counters need no locking.
+"""
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+perf_counter_ns = time.perf_counter_ns
+
+PROFILE_DIR = "profile"
+DUMP_INTERVAL = 60.0
+SAMPLE_INTERVAL = 0.01
+HISTOGRAM_BUCKETS = 64
+
+
+class StageStats:
+    __slots__ = ("count", "total_ns", "max_ns", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.histogram = [0] * HISTOGRAM_BUCKETS
+
+    def add(self, elapsed):
+        self.count += 1
+        self.total_ns += elapsed
+        if elapsed > self.max_ns:
+            self.max_ns = elapsed
+        self.histogram[min(elapsed.bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+
+    def percentile(self, fraction):
+        """Upper bound (ns) of the histogram bucket holding the percentile"""
+        target = self.count * fraction
+        seen = 0
+        for bucket, hits in enumerate(self.histogram):
+            seen += hits
+            if seen >= target and hits:
+                return (1 << bucket) - 1
+        return self.max_ns
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_us": self.total_ns / self.count / 1000 if self.count else 0.0,
+            "p50_us": self.percentile(0.5) / 1000,
+            "p99_us": self.percentile(0.99) / 1000,
+            "max_us": self.max_ns / 1000,
+            "total_s": self.total_ns / 1e9,
+        }
+
+
+class NullProfiler:
+    """Profiler stand-in used when --profile is off"""
+
+    enabled = False
+
+    def start(self):
+        return 0
+
+    def lap(self, stage, started):
+        return 0
+
+    def record(self, stage, elapsed_ns):
+        pass
+
+    def begin(self):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class StageProfiler:
+    enabled = True
+
+    def __init__(self, name, profile_dir=PROFILE_DIR, dump_interval=DUMP_INTERVAL,
+                 use_cprofile=False, sampling=False, trace_memory=False):
+        self.name = name
+        self.profile_dir = profile_dir
+        self.dump_interval = dump_interval
+        self.use_cprofile = use_cprofile
+        self.sampling = sampling
+        self.trace_memory = trace_memory
+
+        self.stages = {}
+        self.samples = Counter()
+        self.started_at = time.time()
+        self.stopped = threading.Event()
+        self.threads = []
+        self.cprofile = None
+
+    # Hot path ---------------------------------------------------------
+
+    def start(self):
+        """Timestamp marking the start of the first stage"""
+        return perf_counter_ns()
+
+    def lap(self, stage, started):
+        """Record the time since `started` under `stage`; returns now"""
+        now = perf_counter_ns()
+        stats = self.stages.get(stage)
+        if stats is None:
+            stats = self.stages[stage] = StageStats()
+        stats.add(now - started)
+        return now
+
+    def record(self, stage, elapsed_ns):
+        """Record an externally measured duration"""
+        stats = self.stages.get(stage)
+        if stats is None:
+            stats = self.stages[stage] = StageStats()
+        stats.add(elapsed_ns)
+
+    # Lifecycle --------------------------------------------------------
+
+    def begin(self):
+        """Start the optional profilers; call from the thread running the loop"""
+        os.makedirs(self.profile_dir, exist_ok=True)
+
+        if self.use_cprofile:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        if self.trace_memory:
+            tracemalloc.start(25)
+        if self.sampling:
+            self._spawn(self._sample_loop, "profiler-sampler")
+        if self.sampling or self.trace_memory:
+            self._spawn(self._dump_loop, "profiler-dumper")
+
+    def _spawn(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def _sample_loop(self):
+        """Statistical profiler: count the stack of every thread periodically"""
+        own_ids = {threading.get_ident()}
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id in own_ids:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def _dump_loop(self):
+        while not self.stopped.wait(self.dump_interval):
+            self.dump()
+
+    def _path(self, kind, suffix):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        return os.path.join(self.profile_dir, f"{self.name}-{kind}-{stamp}.{suffix}")
+
+    def dump(self):
+        """Write the current sampling stacks and a tracemalloc snapshot"""
+        if self.sampling and self.samples:
+            # Collapsed-stack format, readable by flamegraph.pl / speedscope
+            with open(self._path("samples", "txt"), 'w') as f:
+                for stack, hits in self.samples.most_common():
+                    f.write(f"{stack} {hits}\n")
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.take_snapshot().dump(self._path("memory", "snapshot"))
+
+    def summary(self):
+        return {
+            "name": self.name,
+            "duration_s": time.time() - self.started_at,
+            "stages": {stage: stats.summary() for stage, stats in self.stages.items()},
+        }
+
+    def finish(self):
+        """Stop the profilers, dump everything and print the stage summary"""
+        self.stopped.set()
+        for thread in self.threads:
+            thread.join(timeout=5)
+
+        if self.cprofile:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self._path("cprofile", "prof"))
+        self.dump()
+        if self.trace_memory:
+            tracemalloc.stop()
+
+        summary = self.summary()
+        with open(os.path.join(self.profile_dir, f"{self.name}-summary.json"), 'w') as f:
+            json.dump(summary, f, indent=2)
+
+        print(f"\n⏱️  Stage timings ({summary['duration_s']:.1f}s):")
+        width = max([18] + [len(stage) for stage in summary["stages"]])
+        print(f"   {'stage':<{width}} {'count':>9} {'mean':>10} {'p50':>10} {'p99':>10} {'max':>10}")
+        for stage, stats in summary["stages"].items():
+            print(
+                f"   {stage:<{width}} {stats['count']:>9} {stats['mean_us']:>8.1f}us "
+                f"{stats['p50_us']:>8.1f}us {stats['p99_us']:>8.1f}us {stats['max_us']:>8.1f}us")
+        print(f"📁 Profile written to {self.profile_dir}/")
+
+
+def add_profile_arguments(parser):
+    """Add the shared --profile options to an argparse parser"""
+    group = parser.add_argument_group('profiling')
+    group.add_argument('--profile', action='store_true',
+                       help='Record per-stage timings and write a summary on shutdown')
+    group.add_argument('--profile-dir', default=PROFILE_DIR,
+                       help=f'Directory for profile output (default: {PROFILE_DIR})')
+    group.add_argument('--profile-interval', type=float, default=DUMP_INTERVAL,
+                       help=f'Seconds between periodic dumps (default: {DUMP_INTERVAL:.0f})')
+    group.add_argument('--cprofile', action='store_true',
+                       help='With --profile: run cProfile on the MQTT loop thread')
+    group.add_argument('--sampling', action='store_true',
+                       help='With --profile: sample all thread stacks every 10ms')
+    group.add_argument('--tracemalloc', action='store_true',
+                       help='With --profile: take tracemalloc snapshots')
+
+
+def profiler_from_args(args, name):
+    """Build the profiler selected by add_profile_arguments() options"""
+    if not args.profile:
+        return NULL_PROFILER
+    return StageProfiler(
+        name,
+        profile_dir=args.profile_dir,
+        dump_interval=args.profile_interval,
+        use_cprofile=args.cprofile,
+        sampling=args.sampling,
+        trace_memory=args.tracemalloc
+    )
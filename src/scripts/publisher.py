@@ -2,14 +2,27 @@
 """
 MQTT Publisher Script
 Publishes temperature data to "data/temperature" topic and humidity data to "data/humidity" topic
+
+Per-message log lines are rate limited and a summary is logged periodically;
+set LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATE and LOG_SUMMARY_INTERVAL to
+adjust (see logging_setup.py).
+
+MQTT_PROTOCOL=5 publishes over MQTT v5: repeated topics are sent as topic
+aliases, every message carries ContentType application/json and the UTF-8
+payload format indicator, and MQTT_MAX_INFLIGHT is capped by the broker's
+ReceiveMaximum (see mqtt_v5.py).
 """
 
 import paho.mqtt.client as mqtt
 import json
+import logging
 import time
 import random
 from datetime import datetime
 
+from logging_setup import SampledLogger, ThroughputReporter, setup_logging
+from mqtt_v5 import MQTT_PROTOCOL, TopicAliasPublisher, connect_options, create_client
+
 # MQTT Configuration
 MQTT_BROKER = "localhost"
 MQTT_PORT = 1883
@@ -17,18 +30,24 @@ MQTT_TOPIC_TEMPERATURE = "data/temperature"
 MQTT_TOPIC_HUMIDITY = "data/humidity"
 MQTT_CLIENT_ID = "python_publisher"
 
+logger = logging.getLogger("publisher")
 
-def on_connect(client, userdata, flags, rc):
+
+def on_connect(client, userdata, flags, rc, properties=None):
     """Callback when connected to MQTT broker"""
     if rc == 0:
-        print(f"Connected to MQTT broker at {MQTT_BROKER}:{MQTT_PORT}")
+        logger.info("Connected to MQTT broker at %s:%s (MQTT %s)",
+                    MQTT_BROKER, MQTT_PORT, MQTT_PROTOCOL)
+        # userdata is the TopicAliasPublisher; aliases restart per connection
+        userdata.connected(properties)
     else:
-        print(f"Failed to connect to MQTT broker, return code: {rc}")
+        logger.error("Failed to connect to MQTT broker, return code: %s", rc)
 
 
 def on_publish(client, userdata, mid):
     """Callback when message is published"""
-    print(f"Message published with ID: {mid}")
+    logger.debug("Message published with ID: %s", mid)
+    userdata.published(mid)
 
 
 def create_temperature_data():
@@ -49,8 +68,14 @@ def create_humidity_data():
 
 def main():
     """Main function to publish messages"""
+    setup_logging()
+    message_log = SampledLogger(logger)
+    reporter = ThroughputReporter(logger, ["published", "errors"])
+
     # Create MQTT client
-    client = mqtt.Client(client_id=MQTT_CLIENT_ID)
+    client = create_client(MQTT_CLIENT_ID, MQTT_PROTOCOL)
+    sender = TopicAliasPublisher(client, MQTT_PROTOCOL)
+    client.user_data_set(sender)
 
     # Set callbacks
     client.on_connect = on_connect
@@ -58,8 +83,8 @@ def main():
 
     try:
         # Connect to broker
-        print(f"Connecting to MQTT broker at {MQTT_BROKER}:{MQTT_PORT}...")
-        client.connect(MQTT_BROKER, MQTT_PORT, 60)
+        logger.info("Connecting to MQTT broker at %s:%s...", MQTT_BROKER, MQTT_PORT)
+        client.connect(MQTT_BROKER, MQTT_PORT, 60, **connect_options(MQTT_PROTOCOL))
 
         # Start the loop
         client.loop_start()
@@ -67,10 +92,11 @@ def main():
         # Wait a moment for connection
         time.sleep(2)
 
-        print(f"Publishing messages to topics:")
-        print(f"   Temperature: {MQTT_TOPIC_TEMPERATURE}")
-        print(f"   Humidity: {MQTT_TOPIC_HUMIDITY}")
-        print("Press Ctrl+C to stop...")
+        logger.info("Publishing messages to topics:")
+        logger.info("   Temperature: %s", MQTT_TOPIC_TEMPERATURE)
+        logger.info("   Humidity: %s", MQTT_TOPIC_HUMIDITY)
+        logger.info("Press Ctrl+C to stop...")
+        reporter.start()
 
         # Publish messages every second for real-time visualization
         message_count = 0
@@ -85,33 +111,35 @@ def main():
             humidity_payload = json.dumps(humidity_data, indent=2)
 
             # Publish temperature message
-            temp_result = client.publish(
+            temp_result = sender.publish(
                 MQTT_TOPIC_TEMPERATURE, temp_payload, qos=1)
 
             # Publish humidity message
-            humidity_result = client.publish(
+            humidity_result = sender.publish(
                 MQTT_TOPIC_HUMIDITY, humidity_payload, qos=1)
 
-            print(f"\nMessage #{message_count} published:")
-            print(f"   Temperature Topic: {MQTT_TOPIC_TEMPERATURE}")
-            print(f"     Temperature: {temp_data['temperature']}°C")
-            print(f"     Timestamp: {temp_data['timestamp']}")
-            print(f"   Humidity Topic: {MQTT_TOPIC_HUMIDITY}")
-            print(f"     Humidity: {humidity_data['humidity']}%")
-            print(f"     Timestamp: {humidity_data['timestamp']}")
+            for result in (temp_result, humidity_result):
+                reporter.count(
+                    "published" if result.rc == mqtt.MQTT_ERR_SUCCESS else "errors")
+
+            message_log.info(
+                "Message #%d published | Temperature: %s°C | Humidity: %s%% | Timestamp: %s",
+                message_count, temp_data['temperature'], humidity_data['humidity'],
+                temp_data['timestamp'])
 
             # Wait 1 second before next message
             time.sleep(1)
 
     except KeyboardInterrupt:
-        print("\nStopping publisher...")
+        logger.info("Stopping publisher...")
     except Exception as e:
-        print(f"Error: {e}")
+        logger.error("Error: %s", e)
     finally:
         # Clean up
+        reporter.stop()
         client.loop_stop()
         client.disconnect()
-        print("Publisher disconnected")
+        logger.info("Publisher disconnected")
 
 
 if __name__ == "__main__":
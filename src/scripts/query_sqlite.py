@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+SQLite Data Query Tool
+Query readings stored by the unified collector's sqlite sink with the
+options of query_csv.py; filters run in SQLite on the (measurement, time)
+key and only the partitions in the time range are read
+
+pipenv run python src/scripts/query_sqlite.py --stats
+pipenv run python src/scripts/query_sqlite.py --measurement humidity --hours 6 --min-value 60
+pipenv run python src/scripts/query_sqlite.py --hours 24 --export last_day.csv
+"""
+
+import argparse
+import csv
+import os
+import time
+from datetime import datetime, timezone
+
+from readings import ns_to_datetime
+from sqlite_store import SQLiteStore
+from topic_registry import TOPIC_REGISTRY
+
+DB_FILENAME = "readings.db"
+
+UNITS = {entry["measurement"]: entry["unit"] for entry in TOPIC_REGISTRY.values()}
+
+
+def to_ns(value):
+    """Nanoseconds for a 'YYYY-MM-DD HH:MM:SS' time, read as UTC like the stored times"""
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp()) * 10**9 + dt.microsecond * 1_000
+
+
+def time_range(hours=None, start_time=None, end_time=None):
+    """(start_ns, end_ns) of the filters, None where open"""
+    start_ns = to_ns(start_time) if start_time else None
+    if hours is not None:
+        cutoff = time.time_ns() - int(hours * 3600 * 10**9)
+        start_ns = max(start_ns or cutoff, cutoff)
+    end_ns = to_ns(end_time) if end_time else None
+    return start_ns, end_ns
+
+
+def print_rows(rows, measurement):
+    label = measurement.title()
+    unit = UNITS.get(measurement, "")
+    for time_ns, _, tags, value in rows:
+        suffix = f" | {tags}" if tags else ""
+        print(f"Time: {ns_to_datetime(time_ns).strftime('%Y-%m-%d %H:%M:%S')} | "
+              f"{label}: {value}{unit}{suffix}")
+
+
+def show_recent_data(store, measurement, limit=10):
+    """Show the newest readings"""
+    rows = store.recent(measurement, limit)
+    if not rows:
+        print("No data available")
+        return
+    print(f"\n=== Recent {measurement.title()} Data (Last {limit} records) ===")
+    print_rows(rows, measurement)
+
+
+def show_statistics(store, measurement, **filters):
+    """Show count, mean, min and max computed in SQLite"""
+    stats = store.statistics(measurement, **filters)
+    if not stats["count"]:
+        print("No data available")
+        return
+    unit = UNITS.get(measurement, "")
+    label = measurement.title()
+    print(f"\n=== {label} Statistics ===")
+    print(f"Total records: {stats['count']}")
+    print(f"Average {measurement}: {stats['mean']:.2f}{unit}")
+    print(f"Minimum {measurement}: {stats['min']:.2f}{unit}")
+    print(f"Maximum {measurement}: {stats['max']:.2f}{unit}")
+    print(f"{label} range: {stats['max'] - stats['min']:.2f}{unit}")
+    print(f"From {ns_to_datetime(stats['first_ns'])} to {ns_to_datetime(stats['last_ns'])}")
+
+
+def show_filtered(store, measurement, **filters):
+    """Show the readings matching the value and time filters"""
+    rows = store.query(measurement, **filters)
+    if not rows:
+        print("No data matches the filter")
+        return
+    print(f"\n=== Filtered Data ({len(rows)} records) ===")
+    print_rows(rows, measurement)
+
+
+def export_to_csv(store, measurement, output_filename, **filters):
+    """Export matching readings in the CSV collectors' column layout"""
+    rows = store.query(measurement, **filters)
+    if not rows:
+        print("No data matches the filter criteria")
+        return
+    with open(output_filename, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", measurement, "datetime"])
+        for time_ns, _, _, value in rows:
+            dt = ns_to_datetime(time_ns)
+            writer.writerow([dt.isoformat(), value, dt.strftime('%Y-%m-%d %H:%M:%S')])
+    print(f"Exported {len(rows)} records to {output_filename}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Query readings from the SQLite store')
+    parser.add_argument('--db', default=DB_FILENAME,
+                        help=f'SQLite database file (default: {DB_FILENAME})')
+    parser.add_argument('--measurement', default='temperature',
+                        help='Measurement to query (default: temperature)')
+    parser.add_argument('--recent', type=int, default=10,
+                        help='Show recent N records (default: 10)')
+    parser.add_argument('--stats', action='store_true', help='Show statistics')
+    parser.add_argument('--min-value', type=float,
+                        help='Filter by minimum value')
+    parser.add_argument('--max-value', type=float,
+                        help='Filter by maximum value')
+    parser.add_argument('--hours', type=float, help='Filter by last N hours')
+    parser.add_argument(
+        '--start-time', help='Filter from start time (YYYY-MM-DD HH:MM:SS, UTC)')
+    parser.add_argument(
+        '--end-time', help='Filter until end time (YYYY-MM-DD HH:MM:SS, UTC)')
+    parser.add_argument('--export', help='Export filtered data to CSV file')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"Error: SQLite database '{args.db}' not found!")
+        return
+
+    store = SQLiteStore(args.db)
+    try:
+        start_ns, end_ns = time_range(args.hours, args.start_time, args.end_time)
+        filters = {"start_ns": start_ns, "end_ns": end_ns,
+                   "min_value": args.min_value, "max_value": args.max_value}
+        filtered = any(value is not None for value in filters.values())
+
+        print(f"Measurements in {args.db}: {', '.join(store.measurements()) or 'none'}")
+
+        if args.recent > 0:
+            show_recent_data(store, args.measurement, args.recent)
+
+        if args.stats:
+            show_statistics(store, args.measurement, **filters)
+
+        if filtered and not args.export:
+            show_filtered(store, args.measurement, **filters)
+
+        if args.export:
+            export_to_csv(store, args.measurement, args.export, **filters)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Compact Reading Records
+The in-memory representation of a reading between decode and serialization
+
+    Series        measurement, field and tags of a reading, interned so every
+                  reading of the same series shares one object and its
+                  pre-escaped line protocol prefix
+    Reading       one reading: series, float value, nanosecond time and the
+                  raw payload timestamp, in a __slots__ object
+    ReadingBatch  struct-of-arrays buffer used by the batching sinks: values
+                  and times live in array('d') / array('q'), so a buffered
+                  reading costs 16 bytes plus two list slots
+
+Readings are what ingest.parse_message() returns and what the collector
+sinks queue and batch.
+"""
+
+from array import array
+from datetime import timedelta
+
+from line_protocol import EPOCH, PRECISION_DIVISORS, escape_key, series_key
+
+# Interned series; beyond this many, new series are created uninterned so a
+# tag cardinality explosion cannot grow the cache without bound
+MAX_INTERNED_SERIES = 100_000
+
+_series_cache = {}
+
+
+class Series:
+    __slots__ = ("measurement", "field", "tags", "prefix")
+
+    def __init__(self, measurement, field, tags=()):
+        self.measurement = measurement
+        self.field = field
+        self.tags = tags
+        self.prefix = f"{series_key(measurement, dict(tags))} {escape_key(field)}="
+
+    @property
+    def tag_dict(self):
+        return dict(self.tags)
+
+    def __repr__(self):
+        return f"Series({self.prefix[:-1]!r})"
+
+
+def get_series(measurement, field, tags=()):
+    """Interned Series for a measurement, field and sorted tag tuple"""
+    key = (measurement, field, tags)
+    series = _series_cache.get(key)
+    if series is None:
+        series = Series(measurement, field, tags)
+        if len(_series_cache) < MAX_INTERNED_SERIES:
+            _series_cache[key] = series
+    return series
+
+
+def ns_to_datetime(time_ns):
+    """UTC datetime for a nanosecond timestamp (microsecond resolution)"""
+    return EPOCH + timedelta(microseconds=time_ns // 1_000)
+
+
+class Reading:
+    __slots__ = ("series", "value", "time_ns", "timestamp")
+
+    def __init__(self, series, value, time_ns, timestamp=None):
+        self.series = series
+        self.value = value
+        self.time_ns = time_ns
+        self.timestamp = timestamp
+
+    @property
+    def measurement(self):
+        return self.series.measurement
+
+    @property
+    def field(self):
+        return self.series.field
+
+    @property
+    def tags(self):
+        return self.series.tag_dict
+
+    @property
+    def datetime(self):
+        return ns_to_datetime(self.time_ns)
+
+    def to_line(self, precision="ns"):
+        """Line protocol for this reading"""
+        return f"{self.series.prefix}{self.value!r} {self.time_ns // PRECISION_DIVISORS[precision]}"
+
+    def __repr__(self):
+        return f"Reading({self.series.prefix}{self.value!r} {self.time_ns})"
+
+
+class ReadingBatch:
+    """Column-oriented buffer of readings"""
+
+    __slots__ = ("series", "values", "times", "timestamps")
+
+    def __init__(self):
+        self.series = []
+        self.values = array('d')
+        self.times = array('q')
+        self.timestamps = []
+
+    def append(self, reading):
+        self.series.append(reading.series)
+        self.values.append(reading.value)
+        self.times.append(reading.time_ns)
+        self.timestamps.append(reading.timestamp)
+
+    def extend(self, other):
+        """Append every reading of another batch"""
+        self.series += other.series
+        self.values += other.values
+        self.times += other.times
+        self.timestamps += other.timestamps
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        """Yield (series, value, time_ns, timestamp) rows"""
+        return zip(self.series, self.values, self.times, self.timestamps)
+
+    def to_lines(self, precision="ns"):
+        """Line protocol for every reading in the batch"""
+        divisor = PRECISION_DIVISORS[precision]
+        return [f"{series.prefix}{value!r} {time_ns // divisor}"
+                for series, value, time_ns in zip(self.series, self.values, self.times)]
+
+    def nbytes(self):
+        """Approximate buffer size, excluding shared series and timestamp strings"""
+        pointer = 8
+        return (self.values.itemsize + self.times.itemsize + 2 * pointer) * len(self)
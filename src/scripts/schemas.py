@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Payload Schemas
+Compiles the per-topic schemas in topic_registry.py into validator
+functions and routes payloads that fail them to a dead-letter queue
+
+A schema maps payload keys to rules:
+
+    "temperature": {"type": "number", "required": True, "min": -60, "max": 70}
+
+    type        number, integer, string or boolean (bool is not a number)
+    required    the key must be present (default: False)
+    min / max   inclusive range for numbers; NaN is out of range
+
+compile_schema() turns a schema into the source of one flat function
+(exact type() checks and comparisons, no loops or rule lookups) and
+exec()s it once, so validating a valid payload costs about as much as the
+hand-written checks it replaces. A validator returns None for a valid
+payload, or a reason code such as "out_of_range:temperature".
+
+DeadLetterQueue publishes rejected payloads to <DEAD_LETTER_TOPIC>/<topic>
+and/or appends them to a JSON lines file, one compact record each:
+
+    {"time":"...","topic":"data/temperature","reason":"wrong_type:temperature","payload":"..."}
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+
+from topic_registry import TOPIC_REGISTRY, registered_topic
+
+DEAD_LETTER_TOPIC = os.getenv("DEAD_LETTER_TOPIC", "deadletter")
+
+# Reason codes; the field-level ones are suffixed with ":<key>"
+INVALID_JSON = "invalid_json"
+NOT_OBJECT = "not_object"
+MISSING_FIELD = "missing_field"
+WRONG_TYPE = "wrong_type"
+OUT_OF_RANGE = "out_of_range"
+BAD_TIMESTAMP = "bad_timestamp"
+UNKNOWN_TOPIC = "unknown_topic"
+
+TYPES = {
+    "number": ("int", "float"),
+    "integer": ("int",),
+    "string": ("str",),
+    "boolean": ("bool",),
+}
+
+_MISSING = object()
+
+logger = logging.getLogger("schemas")
+
+
+def schema_source(schema):
+    """Python source of the validator function for a schema"""
+    lines = [
+        "def validate(data):",
+        "    if type(data) is not dict:",
+        f"        return {NOT_OBJECT!r}",
+    ]
+    for key, rule in schema.items():
+        if rule["type"] not in TYPES:
+            raise ValueError(f"Unknown type {rule['type']!r} for {key!r}")
+        lines.append(f"    value = data.get({key!r}, MISSING)")
+        if rule.get("required"):
+            lines += ["    if value is MISSING:",
+                      f"        return {f'{MISSING_FIELD}:{key}'!r}"]
+            indent = "    "
+        else:
+            lines.append("    if value is not MISSING:")
+            indent = "        "
+
+        checks = " and ".join(f"type(value) is not {name}" for name in TYPES[rule["type"]])
+        lines += [f"{indent}if {checks}:",
+                  f"{indent}    return {f'{WRONG_TYPE}:{key}'!r}"]
+
+        bounds = []
+        if "min" in rule:
+            bounds.append(f"value < {rule['min']!r}")
+        if "max" in rule:
+            bounds.append(f"value > {rule['max']!r}")
+        if bounds:
+            # value != value is only true for NaN
+            lines += [f"{indent}if {' or '.join(bounds)} or value != value:",
+                      f"{indent}    return {f'{OUT_OF_RANGE}:{key}'!r}"]
+    lines.append("    return None")
+    return "\n".join(lines) + "\n"
+
+
+def compile_schema(schema):
+    """Validator function for a schema: data -> None or a reason code"""
+    source = schema_source(schema)
+    namespace = {"MISSING": _MISSING}
+    exec(compile(source, "<schema>", "exec"), namespace)
+    validate = namespace["validate"]
+    validate.source = source
+    return validate
+
+
+def _accept(data):
+    return None
+
+
+VALIDATORS = {
+    topic: compile_schema(entry["schema"]) if entry.get("schema") else _accept
+    for topic, entry in TOPIC_REGISTRY.items()
+}
+
+
+def validator_for(topic):
+    """Compiled validator of the topic's registry entry; accepts anything otherwise"""
+    return VALIDATORS.get(registered_topic(topic), _accept)
+
+
+class InvalidPayload(ValueError):
+    """A payload that failed its topic's schema"""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class DeadLetterQueue:
+    """Routes rejected payloads to MQTT and/or a file, counted per reason"""
+
+    def __init__(self, client=None, path=None, topic_prefix=DEAD_LETTER_TOPIC, qos=1):
+        self.client = client
+        self.topic_prefix = topic_prefix
+        self.qos = qos
+        self.path = path
+        self.file = open(path, "a", buffering=1, encoding="utf-8") if path else None
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.failures = 0
+
+    def reject(self, topic, payload, reason):
+        """Count and route one rejected payload; never raises"""
+        self.counts[reason] += 1
+        try:
+            record = json.dumps({
+                "time": datetime.now(timezone.utc).isoformat(),
+                "topic": topic,
+                "reason": reason,
+                "payload": payload.decode("utf-8", "replace")
+                if isinstance(payload, bytes) else str(payload),
+            }, separators=(",", ":"), ensure_ascii=False)
+            if self.client:
+                self.client.publish(f"{self.topic_prefix}/{topic}", record, qos=self.qos)
+            if self.file:
+                with self.lock:
+                    self.file.write(record + "\n")
+        except Exception as e:
+            self.failures += 1
+            logger.error("❌ Could not dead-letter a %s payload from %s: %s", reason, topic, e)
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def summary(self):
+        """'reason N, reason N' sorted by count"""
+        return ", ".join(f"{reason} {count}" for reason, count in self.counts.most_common())
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
@@ -11,6 +11,8 @@ import os
 from influxdb_client import InfluxDBClient
 from dotenv import load_dotenv
 
+from grafana_live import live_channel
+
 # Load environment variables
 load_dotenv()
 
@@ -25,6 +27,19 @@ INFLUXDB_TOKEN = os.getenv("INFLUXDB_TOKEN", "my-super-secret-auth-token")
 INFLUXDB_ORG = os.getenv("INFLUXDB_ORG", "myorg")
 INFLUXDB_BUCKET = os.getenv("INFLUXDB_BUCKET", "weather_data")
 
+# Downsampled buckets, coarsest last, and the dashboard time span above which
+# each one is used, e.g. "weather_data_1m:2d,weather_data_1h:60d"
+DOWNSAMPLE_TIERS = [
+    tuple(tier.split(":"))
+    for tier in os.getenv(
+        "DOWNSAMPLE_TIERS", "weather_data_1m:2d,weather_data_1h:60d").split(",")
+    if tier
+]
+
+# Grafana Live Configuration
+LIVE_DATASOURCE = {"type": "datasource", "uid": "grafana"}
+LIVE_SERVICE_ACCOUNT = "mqtt2grafna-live"
+
 
 def cleanup_influxdb():
     """Clean up InfluxDB data for fresh start"""
@@ -117,81 +132,153 @@ def create_datasource():
         return None
 
 
+def build_panel_query(measurement, start="v.timeRangeStart",
+                      stop="v.timeRangeStop", every="v.windowPeriod",
+                      tiers=None):
+    """Build a multi-resolution Flux query for one measurement
+
+    The bucket is picked from the width of the requested range: raw data for
+    short ranges, then each downsampled tier once the range exceeds its
+    threshold. Points are aggregated to the panel's window period, so the
+    browser receives roughly one point per pixel at any zoom level.
+    start/stop/every default to the Grafana dashboard variables.
+    """
+    tiers = DOWNSAMPLE_TIERS if tiers is None else tiers
+
+    bucket_expr = f'"{INFLUXDB_BUCKET}"'
+    for bucket, after in tiers:
+        bucket_expr = f'if span > int(v: {after}) then "{bucket}" else {bucket_expr}'
+
+    return f'''span = int(v: {stop}) - int(v: {start})
+bucket = {bucket_expr}
+
+from(bucket: bucket)
+  |> range(start: {start}, stop: {stop})
+  |> filter(fn: (r) => r["_measurement"] == "{measurement}" and r["_field"] == "{measurement}")
+  |> aggregateWindow(every: {every}, fn: mean, createEmpty: false)
+  |> yield(name: "mean")'''
+
+
+def timeseries_panel(title, targets, unit, grid_pos, datasource=None):
+    """Build a time series panel with the project's default styling"""
+    panel = {
+        "title": title,
+        "type": "timeseries",
+        "targets": targets,
+        "fieldConfig": {
+            "defaults": {
+                "color": {
+                    "mode": "palette-classic"
+                },
+                "custom": {
+                    "axisLabel": "",
+                    "axisPlacement": "auto",
+                    "barAlignment": 0,
+                    "drawStyle": "line",
+                    "fillOpacity": 10,
+                    "gradientMode": "none",
+                    "hideFrom": {
+                        "legend": False,
+                        "tooltip": False,
+                        "vis": False
+                    },
+                    "lineInterpolation": "linear",
+                    "lineWidth": 1,
+                    "pointSize": 5,
+                    "scaleDistribution": {
+                        "type": "linear"
+                    },
+                    "showPoints": "never",
+                    "spanNulls": False,
+                    "stacking": {
+                        "group": "A",
+                        "mode": "none"
+                    },
+                    "thresholdsStyle": {
+                        "mode": "off"
+                    }
+                },
+                "mappings": [],
+                "thresholds": {
+                    "mode": "absolute",
+                    "steps": [
+                        {
+                            "color": "green",
+                            "value": None
+                        }
+                    ]
+                },
+                "unit": unit
+            }
+        },
+        "gridPos": grid_pos
+    }
+    if datasource:
+        panel["datasource"] = datasource
+    return panel
+
+
+def influxdb_target(query):
+    """Panel target running a Flux query against InfluxDB"""
+    return {
+        "refId": "A",
+        "query": query,
+        "datasource": {
+            "type": "influxdb",
+            "uid": "InfluxDB"
+        }
+    }
+
+
+def live_target(measurement):
+    """Panel target subscribed to a Grafana Live channel pushed by the bridge"""
+    return {
+        "refId": "A",
+        "datasource": LIVE_DATASOURCE,
+        "queryType": "measurements",
+        "channel": live_channel(measurement)
+    }
+
+
 def create_dashboard():
     """Create temperature dashboard"""
     print("Creating temperature dashboard...")
 
+    panels = [
+        timeseries_panel(
+            "Temperature Over Time",
+            [influxdb_target(build_panel_query("temperature"))],
+            "celsius",
+            {"h": 8, "w": 12, "x": 0, "y": 0}
+        ),
+        timeseries_panel(
+            "Humidity Over Time",
+            [influxdb_target(build_panel_query("humidity"))],
+            "humidity",
+            {"h": 8, "w": 12, "x": 0, "y": 8}
+        ),
+        # Streaming panels fed by the bridge's Grafana Live push; they
+        # update as readings arrive and never query InfluxDB
+        timeseries_panel(
+            "Temperature (Live)",
+            [live_target("temperature")],
+            "celsius",
+            {"h": 8, "w": 12, "x": 12, "y": 0},
+            datasource=LIVE_DATASOURCE
+        ),
+        timeseries_panel(
+            "Humidity (Live)",
+            [live_target("humidity")],
+            "humidity",
+            {"h": 8, "w": 12, "x": 12, "y": 8},
+            datasource=LIVE_DATASOURCE
+        ),
+    ]
+
     dashboard_config = {
         "dashboard": {
             "title": "Temperature Monitoring",
-            "panels": [
-                {
-                    "title": "Temperature Over Time",
-                    "type": "timeseries",
-                    "targets": [
-                        {
-                            "refId": "A",
-                            "query": f'from(bucket: "{INFLUXDB_BUCKET}") |> range(start: -1h) |> filter(fn: (r) => r["_measurement"] == "temperature") |> filter(fn: (r) => r["_field"] == "value")',
-                            "datasource": {
-                                "type": "influxdb",
-                                "uid": "InfluxDB"
-                            }
-                        }
-                    ],
-                    "fieldConfig": {
-                        "defaults": {
-                            "color": {
-                                "mode": "palette-classic"
-                            },
-                            "custom": {
-                                "axisLabel": "",
-                                "axisPlacement": "auto",
-                                "barAlignment": 0,
-                                "drawStyle": "line",
-                                "fillOpacity": 10,
-                                "gradientMode": "none",
-                                "hideFrom": {
-                                    "legend": False,
-                                    "tooltip": False,
-                                    "vis": False
-                                },
-                                "lineInterpolation": "linear",
-                                "lineWidth": 1,
-                                "pointSize": 5,
-                                "scaleDistribution": {
-                                    "type": "linear"
-                                },
-                                "showPoints": "never",
-                                "spanNulls": False,
-                                "stacking": {
-                                    "group": "A",
-                                    "mode": "none"
-                                },
-                                "thresholdsStyle": {
-                                    "mode": "off"
-                                }
-                            },
-                            "mappings": [],
-                            "thresholds": {
-                                "mode": "absolute",
-                                "steps": [
-                                    {
-                                        "color": "green",
-                                        "value": None
-                                    }
-                                ]
-                            },
-                            "unit": "celsius"
-                        }
-                    },
-                    "gridPos": {
-                        "h": 8,
-                        "w": 12,
-                        "x": 0,
-                        "y": 0
-                    }
-                }
-            ],
+            "panels": panels,
             "time": {
                 "from": "now-1h",
                 "to": "now"
@@ -223,6 +310,52 @@ def create_dashboard():
         return None
 
 
+def create_live_token():
+    """Create a service account token the bridge uses for Grafana Live push"""
+    print("Creating Grafana Live push token...")
+    auth = (GRAFANA_USER, GRAFANA_PASSWORD)
+
+    try:
+        # Reuse the service account if it already exists
+        response = requests.get(
+            f"{GRAFANA_URL}/api/serviceaccounts/search",
+            params={"query": LIVE_SERVICE_ACCOUNT},
+            auth=auth
+        )
+        accounts = [account for account in response.json().get("serviceAccounts", [])
+                    if account["name"] == LIVE_SERVICE_ACCOUNT] \
+            if response.status_code == 200 else []
+
+        if accounts:
+            account_id = accounts[0]["id"]
+        else:
+            response = requests.post(
+                f"{GRAFANA_URL}/api/serviceaccounts",
+                json={"name": LIVE_SERVICE_ACCOUNT, "role": "Editor"},
+                auth=auth
+            )
+            if response.status_code not in (200, 201):
+                print(f"Failed to create service account: {response.text}")
+                return None
+            account_id = response.json()["id"]
+
+        response = requests.post(
+            f"{GRAFANA_URL}/api/serviceaccounts/{account_id}/tokens",
+            json={"name": f"bridge-{int(time.time())}"},
+            auth=auth
+        )
+        if response.status_code not in (200, 201):
+            print(f"Failed to create service account token: {response.text}")
+            return None
+
+        print("Grafana Live push token created successfully!")
+        return response.json()["key"]
+
+    except Exception as e:
+        print(f"Error creating Grafana Live token: {e}")
+        return None
+
+
 def main():
     """Main setup function"""
     print("Setting up Grafana for temperature monitoring...")
@@ -245,11 +378,18 @@ def main():
         print("Failed to create dashboard. Exiting.")
         return
 
+    # Token for the bridge's Grafana Live push
+    live_token = create_live_token()
+
     print("\nSetup completed successfully!")
     print(f"Grafana URL: {GRAFANA_URL}")
     print(f"Username: {GRAFANA_USER}")
     print(f"Password: {GRAFANA_PASSWORD}")
     print(f"Dashboard URL: {dashboard_url}")
+    if live_token:
+        print("\nTo stream readings to the live panels, start the bridge with:")
+        print(f"   GRAFANA_LIVE_TOKEN={live_token} \\")
+        print("   pipenv run python src/scripts/mqtt_to_influxdb.py")
     print("\nNote: InfluxDB has been cleaned for fresh start.")
 
 
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+InfluxDB Tiered Storage Setup Script
+Creates the raw and rollup buckets with their retention periods and
+registers the Flux tasks that downsample raw data continuously
+
+    weather_data     raw readings         RAW_RETENTION        (default 7d)
+    weather_data_1m  1 minute means       ROLLUP_1M_RETENTION  (default 90d)
+    weather_data_1h  1 hour means         ROLLUP_1H_RETENTION  (default 730d)
+
+Running it again is safe: existing buckets and tasks are only updated when
+their retention or Flux differs from the configuration. Rollups keep the
+measurement and field names of the raw data, so the multi-resolution
+dashboard queries from setup_grafana.py work unchanged on every tier.
+
+pipenv run python src/scripts/setup_influxdb_tiers.py
+RAW_RETENTION=30d pipenv run python src/scripts/setup_influxdb_tiers.py
+"""
+
+import os
+import re
+import sys
+
+import requests
+
+from export_influxdb import parse_duration
+from setup_influxdb_token import (INFLUXDB_BUCKET, INFLUXDB_ORG, INFLUXDB_URL,
+                                  check_influxdb_running, get_org_id,
+                                  login_to_influxdb)
+
+# Tier Configuration: (bucket, retention, source bucket, rollup interval)
+TIERS = [
+    (INFLUXDB_BUCKET, os.getenv("RAW_RETENTION", "7d"), None, None),
+    (f"{INFLUXDB_BUCKET}_1m", os.getenv("ROLLUP_1M_RETENTION", "90d"),
+     INFLUXDB_BUCKET, "1m"),
+    (f"{INFLUXDB_BUCKET}_1h", os.getenv("ROLLUP_1H_RETENTION", "730d"),
+     f"{INFLUXDB_BUCKET}_1m", "1h"),
+]
+
+# Flux template for a downsampling task. Each run re-aggregates the last two
+# intervals so points that arrive late are folded into their window.
+TASK_TEMPLATE = '''import "types"
+
+option task = {{name: "{name}", every: {every}, offset: 10s}}
+
+from(bucket: "{source}")
+  |> range(start: -{lookback})
+  |> filter(fn: (r) => types.isNumeric(v: r._value))
+  |> aggregateWindow(every: {every}, fn: mean, createEmpty: false)
+  |> to(bucket: "{bucket}", org: "{org}")
+'''
+
+
+def retention_rules(retention):
+    """Bucket retention rules for a duration such as 7d; 0 keeps data forever"""
+    if retention in ("0", "inf", "infinite"):
+        return []
+    seconds = int(parse_duration(retention).total_seconds())
+    return [{"type": "expire", "everySeconds": seconds}]
+
+
+def ensure_bucket(cookies, org_id, name, retention):
+    """Create the bucket or update its retention; returns the bucket ID"""
+    rules = retention_rules(retention)
+
+    try:
+        response = requests.get(
+            f"{INFLUXDB_URL}/api/v2/buckets",
+            params={"orgID": org_id, "name": name},
+            cookies=cookies
+        )
+        buckets = response.json().get("buckets", []) \
+            if response.status_code == 200 else []
+
+        if not buckets:
+            response = requests.post(
+                f"{INFLUXDB_URL}/api/v2/buckets",
+                json={"orgID": org_id, "name": name, "retentionRules": rules},
+                cookies=cookies
+            )
+            if response.status_code != 201:
+                print(f"Failed to create bucket {name}: {response.text}")
+                return None
+            print(f"Created bucket {name} (retention: {retention})")
+            return response.json()["id"]
+
+        bucket = buckets[0]
+        current = [{"type": rule["type"], "everySeconds": rule["everySeconds"]}
+                   for rule in bucket.get("retentionRules", [])
+                   if rule.get("everySeconds")]
+        if current == rules:
+            print(f"Bucket {name} unchanged (retention: {retention})")
+            return bucket["id"]
+
+        response = requests.patch(
+            f"{INFLUXDB_URL}/api/v2/buckets/{bucket['id']}",
+            json={"retentionRules": rules},
+            cookies=cookies
+        )
+        if response.status_code != 200:
+            print(f"Failed to update bucket {name}: {response.text}")
+            return None
+        print(f"Updated bucket {name} (retention: {retention})")
+        return bucket["id"]
+
+    except requests.exceptions.RequestException as e:
+        print(f"Error provisioning bucket {name}: {e}")
+        return None
+
+
+def ensure_task(cookies, org_id, name, flux):
+    """Create the downsampling task or update its Flux; returns the task ID"""
+    try:
+        response = requests.get(
+            f"{INFLUXDB_URL}/api/v2/tasks",
+            params={"orgID": org_id, "name": name},
+            cookies=cookies
+        )
+        tasks = response.json().get("tasks", []) \
+            if response.status_code == 200 else []
+
+        if not tasks:
+            response = requests.post(
+                f"{INFLUXDB_URL}/api/v2/tasks",
+                json={"orgID": org_id, "flux": flux, "status": "active",
+                      "description": "mqtt2grafna downsampling"},
+                cookies=cookies
+            )
+            if response.status_code != 201:
+                print(f"Failed to create task {name}: {response.text}")
+                return None
+            print(f"Created task {name}")
+            return response.json()["id"]
+
+        task = tasks[0]
+        if task.get("flux", "").strip() == flux.strip() and task.get("status") == "active":
+            print(f"Task {name} unchanged")
+            return task["id"]
+
+        response = requests.patch(
+            f"{INFLUXDB_URL}/api/v2/tasks/{task['id']}",
+            json={"flux": flux, "status": "active"},
+            cookies=cookies
+        )
+        if response.status_code != 200:
+            print(f"Failed to update task {name}: {response.text}")
+            return None
+        print(f"Updated task {name}")
+        return task["id"]
+
+    except requests.exceptions.RequestException as e:
+        print(f"Error provisioning task {name}: {e}")
+        return None
+
+
+def get_bucket_metrics():
+    """Read per-bucket disk size and series count from /metrics"""
+    metrics = {}
+    try:
+        response = requests.get(f"{INFLUXDB_URL}/metrics", timeout=10)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"Could not read InfluxDB metrics: {e}")
+        return metrics
+
+    pattern = re.compile(
+        r'^(storage_shard_disk_size|storage_bucket_series_num)\{[^}]*bucket="([^"]+)"[^}]*\}\s+(\S+)')
+    for line in response.text.splitlines():
+        match = pattern.match(line)
+        if not match:
+            continue
+        name, bucket_id, value = match.groups()
+        stats = metrics.setdefault(bucket_id, {"bytes": 0.0, "series": 0.0})
+        if name == "storage_shard_disk_size":
+            stats["bytes"] += float(value)
+        else:
+            stats["series"] += float(value)
+    return metrics
+
+
+def main():
+    """Main function"""
+    print("InfluxDB Tiered Storage Setup")
+    print("=" * 40)
+
+    print("1. Checking if InfluxDB is running...")
+    if not check_influxdb_running():
+        print("InfluxDB is not running. Please start the services first:")
+        print("   docker-compose -p mqtt2grafna up -d")
+        sys.exit(1)
+
+    print("\n2. Logging into InfluxDB...")
+    cookies = login_to_influxdb()
+    if not cookies:
+        sys.exit(1)
+
+    org_id = get_org_id(cookies)
+    if not org_id:
+        sys.exit(1)
+
+    print("\n3. Provisioning buckets...")
+    bucket_ids = {}
+    for bucket, retention, _, _ in TIERS:
+        bucket_id = ensure_bucket(cookies, org_id, bucket, retention)
+        if not bucket_id:
+            sys.exit(1)
+        bucket_ids[bucket] = bucket_id
+
+    print("\n4. Provisioning downsampling tasks...")
+    for bucket, _, source, every in TIERS:
+        if not source:
+            continue
+        name = f"downsample_{bucket}"
+        lookback = f"{int(parse_duration(every).total_seconds()) * 2}s"
+        flux = TASK_TEMPLATE.format(
+            name=name, every=every, lookback=lookback, source=source,
+            bucket=bucket, org=INFLUXDB_ORG)
+        if not ensure_task(cookies, org_id, name, flux):
+            sys.exit(1)
+
+    print("\n5. Bucket sizes:")
+    metrics = get_bucket_metrics()
+    for bucket, retention, _, _ in TIERS:
+        stats = metrics.get(bucket_ids[bucket], {})
+        size_mb = stats.get("bytes", 0) / (1024 * 1024)
+        series = int(stats.get("series", 0))
+        print(
+            f"   {bucket:<20} {size_mb:>10.2f} MB {series:>8} series   retention {retention}")
+
+    print("\nTiered storage is configured.")
+    print("Dashboards created by setup_grafana.py switch to the rollup buckets for long ranges.")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,9 @@ import json
 import paho.mqtt.client as mqtt
 import time
 
+from schemas import validator_for
+from topic_registry import lookup
+
 # Configuration
 MQTT_BROKER = "localhost"
 MQTT_PORT = 1883
@@ -38,20 +41,16 @@ def on_message(client, userdata, msg):
         data = json.loads(msg.payload.decode())
         print(f"🔍 Parsed JSON: {json.dumps(data, indent=2)}")
 
-        # Check if it has the expected fields
-        if msg.topic == "data/temperature":
-            if "temperature" in data and "timestamp" in data:
-                print(
-                    f"✅ Valid temperature data: {data['temperature']}°C at {data['timestamp']}")
+        # Check it against the topic's schema in topic_registry.py
+        entry = lookup(msg.topic)
+        if entry:
+            reason = validator_for(msg.topic)(data)
+            if reason:
+                print(f"❌ Invalid {entry['measurement']} data: {reason}")
             else:
-                print(f"❌ Missing required fields in temperature data")
-
-        elif msg.topic == "data/humidity":
-            if "humidity" in data and "timestamp" in data:
                 print(
-                    f"✅ Valid humidity data: {data['humidity']}% at {data['timestamp']}")
-            else:
-                print(f"❌ Missing required fields in humidity data")
+                    f"✅ Valid {entry['measurement']} data: "
+                    f"{data.get(entry['payload_key'])}{entry['unit']} at {data.get('timestamp')}")
 
     except json.JSONDecodeError as e:
         print(f"❌ JSON decode error: {e}")
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+SQLite Reading Store
+An embedded time-series store for edge sites without InfluxDB, used by the
+unified collector's sqlite sink and by query_sqlite.py
+
+    WAL journal         readers never block the writer and a commit is an
+                        append to the -wal file (synchronous=NORMAL)
+    batched inserts     one transaction per ReadingBatch via executemany
+    partitions          one table per day (or hour/month), listed in the
+                        partitions table; queries only touch the tables
+                        overlapping their time range
+    clustered key       each partition is a WITHOUT ROWID table keyed on
+                        (measurement, time, field, tags), so range scans by
+                        measurement and time read consecutive pages, and a
+                        reading rewritten for the same series and time
+                        replaces the old one, as it does in InfluxDB
+    retention           purge() drops whole partitions older than the
+                        retention period instead of deleting rows
+
+Times are stored as nanoseconds since the epoch (UTC), tags as the series'
+line protocol tag string.
+"""
+
+import calendar
+import sqlite3
+import threading
+import time
+
+# Partition length in nanoseconds; months vary and are computed per table
+PARTITIONS = {
+    "hour": 3600 * 10**9,
+    "day": 86400 * 10**9,
+    "month": None,
+}
+
+PARTITION_FORMATS = {"hour": "%Y%m%d%H", "day": "%Y%m%d"}
+
+# SQLite's default limit of terms in one compound SELECT (SQLITE_MAX_COMPOUND_SELECT)
+MAX_COMPOUND_SELECT = 500
+
+CATALOG = """
+CREATE TABLE IF NOT EXISTS partitions (
+    name TEXT PRIMARY KEY,
+    start_ns INTEGER NOT NULL,
+    end_ns INTEGER NOT NULL
+)
+"""
+
+PARTITION_TABLE = """
+CREATE TABLE IF NOT EXISTS {name} (
+    measurement TEXT NOT NULL,
+    time INTEGER NOT NULL,
+    field TEXT NOT NULL,
+    tags TEXT NOT NULL DEFAULT '',
+    value REAL NOT NULL,
+    PRIMARY KEY (measurement, time, field, tags)
+) WITHOUT ROWID
+"""
+
+
+def tag_string(series):
+    """Tags of a series as 'key=value,key=value' ('' without tags)"""
+    return ",".join(f"{key}={value}" for key, value in series.tags)
+
+
+class SQLiteStore:
+    def __init__(self, path="readings.db", partition="day", retention_days=None):
+        self.path = path
+        self.partition = partition
+        self.partition_ns = PARTITIONS[partition]
+        self.retention_ns = int(retention_days * 86400 * 10**9) if retention_days else None
+
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA temp_store=MEMORY")
+        self.connection.execute(CATALOG)
+        self.lock = threading.Lock()
+        self.known = {name: (start, end) for name, start, end in
+                      self.connection.execute("SELECT name, start_ns, end_ns FROM partitions")}
+
+    # Writing ----------------------------------------------------------
+
+    def partition_for(self, time_ns):
+        """(table name, start_ns, end_ns) of the partition holding time_ns"""
+        if self.partition_ns is None:
+            year, month = time.gmtime(time_ns // 10**9)[:2]
+            following = (year + 1, 1) if month == 12 else (year, month + 1)
+            start_ns = calendar.timegm((year, month, 1, 0, 0, 0)) * 10**9
+            end_ns = calendar.timegm((*following, 1, 0, 0, 0)) * 10**9
+            return f"readings_{year:04d}{month:02d}", start_ns, end_ns
+        start_ns = time_ns - time_ns % self.partition_ns
+        name = time.strftime(PARTITION_FORMATS[self.partition], time.gmtime(start_ns // 10**9))
+        return f"readings_{name}", start_ns, start_ns + self.partition_ns
+
+    def _ensure(self, name, start_ns, end_ns):
+        if name not in self.known:
+            self.connection.execute(PARTITION_TABLE.format(name=name))
+            self.connection.execute(
+                "INSERT OR IGNORE INTO partitions VALUES (?, ?, ?)", (name, start_ns, end_ns))
+            self.known[name] = (start_ns, end_ns)
+
+    def write_batch(self, batch):
+        """Insert a ReadingBatch in one transaction"""
+        rows = {}
+        bounds = None
+        for series, value, time_ns, _ in batch:
+            if bounds is None or not bounds[1] <= time_ns < bounds[2]:
+                bounds = self.partition_for(time_ns)
+                rows.setdefault(bounds, [])
+            rows[bounds].append((series.measurement, time_ns, series.field,
+                                 tag_string(series), value))
+
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                for (name, start_ns, end_ns), values in rows.items():
+                    self._ensure(name, start_ns, end_ns)
+                    self.connection.executemany(
+                        f"INSERT OR REPLACE INTO {name} VALUES (?, ?, ?, ?, ?)", values)
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def purge(self, now_ns=None):
+        """Drop partitions that ended before the retention period; their names"""
+        if not self.retention_ns:
+            return []
+        cutoff = (now_ns or time.time_ns()) - self.retention_ns
+        with self.lock:
+            expired = [name for name, (_, end_ns) in self.known.items() if end_ns <= cutoff]
+            for name in expired:
+                self.connection.execute(f"DROP TABLE IF EXISTS {name}")
+                self.connection.execute("DELETE FROM partitions WHERE name = ?", (name,))
+                del self.known[name]
+        return expired
+
+    # Querying ---------------------------------------------------------
+
+    def partitions(self, start_ns=None, end_ns=None):
+        """Partition tables overlapping [start_ns, end_ns), oldest first"""
+        return [name for name, (first, last) in sorted(self.known.items(), key=lambda i: i[1])
+                if (start_ns is None or last > start_ns) and (end_ns is None or first < end_ns)]
+
+    def _where(self, measurement, field, start_ns, end_ns, min_value, max_value):
+        clauses, params = ["measurement = ?"], [measurement]
+        for clause, param in (("field = ?", field), ("time >= ?", start_ns),
+                              ("time < ?", end_ns), ("value >= ?", min_value),
+                              ("value <= ?", max_value)):
+            if param is not None:
+                clauses.append(clause)
+                params.append(param)
+        return " AND ".join(clauses), params
+
+    def _unions(self, columns, measurement, field, start_ns, end_ns, min_value, max_value):
+        """(sql, params) per group of at most MAX_COMPOUND_SELECT partitions in
+        the time range, oldest group first; groups never overlap in time"""
+        where, params = self._where(measurement, field, start_ns, end_ns, min_value, max_value)
+        tables = self.partitions(start_ns, end_ns)
+        for first in range(0, len(tables), MAX_COMPOUND_SELECT):
+            group = tables[first:first + MAX_COMPOUND_SELECT]
+            sql = " UNION ALL ".join(f"SELECT {columns} FROM {name} WHERE {where}"
+                                     for name in group)
+            yield sql, params * len(group)
+
+    def query(self, measurement, field=None, start_ns=None, end_ns=None,
+              min_value=None, max_value=None, limit=None, newest_first=False):
+        """(time_ns, field, tags, value) rows in time order"""
+        groups = list(self._unions("time, field, tags, value", measurement, field,
+                                   start_ns, end_ns, min_value, max_value))
+        if newest_first:
+            groups.reverse()
+        rows = []
+        with self.lock:
+            for sql, params in groups:
+                sql += f" ORDER BY time {'DESC' if newest_first else 'ASC'}"
+                if limit is not None:
+                    sql += " LIMIT ?"
+                    params.append(limit - len(rows))
+                rows += self.connection.execute(sql, params).fetchall()
+                if limit is not None and len(rows) >= limit:
+                    break
+        return rows
+
+    def recent(self, measurement, limit=10, field=None):
+        """The newest `limit` rows, oldest first; reads only the newest partitions"""
+        rows = []
+        with self.lock:
+            for name in reversed(self.partitions()):
+                where, params = self._where(measurement, field, None, None, None, None)
+                rows += self.connection.execute(
+                    f"SELECT time, field, tags, value FROM {name} WHERE {where} "
+                    f"ORDER BY time DESC LIMIT ?", params + [limit - len(rows)]).fetchall()
+                if len(rows) >= limit:
+                    break
+        return rows[::-1]
+
+    def statistics(self, measurement, field=None, start_ns=None, end_ns=None,
+                   min_value=None, max_value=None):
+        """{count, mean, min, max, first_ns, last_ns} computed in SQLite"""
+        stats = {"count": 0, "mean": None, "min": None, "max": None,
+                 "first_ns": None, "last_ns": None}
+        total = 0.0
+        with self.lock:
+            for sql, params in self._unions("time, value", measurement, field,
+                                            start_ns, end_ns, min_value, max_value):
+                count, subtotal, low, high, first_ns, last_ns = self.connection.execute(
+                    f"SELECT COUNT(*), TOTAL(value), MIN(value), MAX(value), MIN(time), "
+                    f"MAX(time) FROM ({sql})", params).fetchone()
+                if not count:
+                    continue
+                # Groups are in time order, so the first one holds first_ns
+                if not stats["count"]:
+                    stats.update(min=low, max=high, first_ns=first_ns)
+                stats.update(count=stats["count"] + count, last_ns=last_ns,
+                             min=min(stats["min"], low), max=max(stats["max"], high))
+                total += subtotal
+        if stats["count"]:
+            stats["mean"] = total / stats["count"]
+        return stats
+
+    def measurements(self):
+        with self.lock:
+            return sorted({row[0] for name in self.partitions() for row in
+                           self.connection.execute(f"SELECT DISTINCT measurement FROM {name}")})
+
+    def close(self):
+        with self.lock:
+            # Fold the WAL back into the database file
+            self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.connection.close()
@@ -3,15 +3,26 @@
 Test InfluxDB Data Script
 Check if data is being written to InfluxDB
 
+Each check window is verified with a single Flux query: count, sum, min,
+max and last are pushed down to the storage engine per measurement, empty
+slots are counted from pushed-down window counts, and the statistics are
+pivoted into one row per measurement that is streamed back.
+
 # WORKING CODE!
 
 sleep 10 && pipenv run python src/scripts/test_influxdb_data.py
+pipenv run python src/scripts/test_influxdb_data.py --windows 5m 1h 24h --max-age 30
+pipenv run python src/scripts/test_influxdb_data.py --sample 10 --engine flight
 """
 
+import argparse
 import os
+import sys
 from influxdb_client.client.influxdb_client import InfluxDBClient
-from influxdb_client.client.query_api import QueryApi
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
+
+from export_influxdb import parse_duration
+from influx_query_client import ENGINES, InfluxQueryClient
 
 # InfluxDB Configuration
 INFLUXDB_URL = os.getenv("INFLUXDB_URL", "http://localhost:8086")
@@ -22,6 +33,12 @@ INFLUXDB_TOKEN = os.getenv("INFLUXDB_TOKEN")
 if not INFLUXDB_TOKEN:
     raise ValueError("INFLUXDB_TOKEN environment variable is required")
 
+# Verification defaults
+MEASUREMENTS = {"temperature": "°C", "humidity": "%"}
+CHECK_WINDOWS = ["5m", "1h"]
+GAP_INTERVAL = "10s"
+MAX_AGE_SECONDS = 30
+
 
 def test_influxdb_connection():
     """Test connection to InfluxDB"""
@@ -42,115 +59,139 @@ def test_influxdb_connection():
         return None
 
 
-def query_recent_data(client):
-    """Query recent data from InfluxDB"""
-    try:
-        query_api = QueryApi(client)
-
-        # Query for recent temperature data
-        query = f'''
-        from(bucket: "{INFLUXDB_BUCKET}")
-          |> range(start: -1h)
-          |> filter(fn: (r) => r["_measurement"] == "temperature")
-          |> limit(n: 10)
-        '''
+def query_measurement_sample(query_client, measurement, unit, limit):
+    """Query the most recent points of one measurement as a columnar frame"""
+    sql = f'''
+    SELECT time AS _time, "{measurement}" AS _value
+    FROM "{measurement}"
+    WHERE time >= now() - INTERVAL '1 hour'
+    ORDER BY time DESC
+    LIMIT {limit}
+    '''
+    flux = f'''
+    from(bucket: "{INFLUXDB_BUCKET}")
+      |> range(start: -1h)
+      |> filter(fn: (r) => r["_measurement"] == "{measurement}")
+      |> filter(fn: (r) => r["_field"] == "{measurement}")
+      |> keep(columns: ["_time", "_value"])
+      |> group()
+      |> sort(columns: ["_time"], desc: true)
+      |> limit(n: {limit})
+    '''
 
-        print("\n🔍 Querying recent temperature data...")
-        result = query_api.query(query)
+    try:
+        print(f"\n🔍 Querying recent {measurement} data...")
+        df = query_client.query_frame(sql, flux)
 
-        if not result:
-            print("❌ No data found in InfluxDB")
+        if df.empty:
+            print(f"❌ No {measurement} data found in InfluxDB")
             return False
 
-        print(f"✅ Found {len(result)} data points:")
-        for table in result:
-            for record in table.records:
-                print(
-                    f"   Time: {record.get_time()} | Temperature: {record.get_value()}°C")
+        print(f"✅ Found {len(df)} {measurement} data points:")
+        for time_value, value in zip(df["_time"], df["_value"]):
+            print(
+                f"   Time: {time_value} | {measurement.capitalize()}: {value}{unit}")
 
         return True
 
     except Exception as e:
-        print(f"❌ Query Error: {e}")
+        print(f"❌ {measurement.capitalize()} Query Error: {e}")
         return False
 
 
-def query_humidity_data(client):
-    """Query recent humidity data from InfluxDB"""
+def build_verification_query(window, gap_interval, measurements):
+    """Build the single verification query for one check window
+
+    Returns one row per measurement with the columns count, sum, min, max,
+    last_ns (time of the newest point) and empty_slots (gap_interval buckets
+    without any point).
+    """
+    predicate = " or ".join(
+        f'(r["_measurement"] == "{name}" and r["_field"] == "{name}")'
+        for name in measurements)
+    return f'''
+    raw = from(bucket: "{INFLUXDB_BUCKET}")
+      |> range(start: -{window})
+      |> filter(fn: (r) => {predicate})
+    data = raw |> group(columns: ["_measurement"])
+
+    union(tables: [
+        data |> count() |> toFloat() |> set(key: "stat", value: "count"),
+        data |> sum() |> toFloat() |> set(key: "stat", value: "sum"),
+        data |> min() |> toFloat() |> set(key: "stat", value: "min"),
+        data |> max() |> toFloat() |> set(key: "stat", value: "max"),
+        data |> last()
+          |> map(fn: (r) => ({{r with _value: float(v: uint(v: r._time))}}))
+          |> set(key: "stat", value: "last_ns"),
+        raw |> aggregateWindow(every: {gap_interval}, fn: count, createEmpty: true)
+          |> group(columns: ["_measurement"])
+          |> aggregateWindow(every: {gap_interval}, fn: sum, createEmpty: true)
+          |> map(fn: (r) => ({{r with _value: if exists r._value and r._value > 0 then 0.0 else 1.0}}))
+          |> sum()
+          |> set(key: "stat", value: "empty_slots")
+    ])
+      |> group(columns: ["_measurement"])
+      |> pivot(rowKey: ["_measurement"], columnKey: ["stat"], valueColumn: "_value")
+    '''
+
+
+def verify_window(client, window, gap_interval, max_age):
+    """Verify freshness, rate and gaps of every measurement in one window"""
+    window_seconds = parse_duration(window).total_seconds()
+    gap_seconds = parse_duration(gap_interval).total_seconds()
+    query = build_verification_query(window, gap_interval, MEASUREMENTS)
+
+    print(f"\n📊 Data Checks (Last {window}):")
     try:
-        query_api = QueryApi(client)
-
-        # Query for recent humidity data
-        query = f'''
-        from(bucket: "{INFLUXDB_BUCKET}")
-          |> range(start: -1h)
-          |> filter(fn: (r) => r["_measurement"] == "humidity")
-          |> limit(n: 5)
-        '''
-
-        print("\n🔍 Querying recent humidity data...")
-        result = query_api.query(query)
-
-        if not result:
-            print("❌ No humidity data found in InfluxDB")
-            return False
-
-        print(f"✅ Found {len(result)} humidity data points:")
-        for table in result:
-            for record in table.records:
-                print(
-                    f"   Time: {record.get_time()} | Humidity: {record.get_value()}%")
-
-        return True
-
+        stats = {}
+        for record in client.query_api().query_stream(query):
+            stats[record.values["_measurement"]] = record.values
     except Exception as e:
-        print(f"❌ Humidity Query Error: {e}")
+        print(f"❌ Verification Query Error: {e}")
         return False
 
+    now_ns = int(datetime.now(timezone.utc).timestamp() * 1e9)
+    healthy = True
 
-def get_data_statistics(client):
-    """Get basic statistics about the data"""
-    try:
-        query_api = QueryApi(client)
-
-        # Count total records
-        count_query = f'''
-        from(bucket: "{INFLUXDB_BUCKET}")
-          |> range(start: -1h)
-          |> count()
-        '''
-
-        print("\n📊 Data Statistics (Last Hour):")
-        result = query_api.query(count_query)
-
-        if result:
-            for table in result:
-                for record in table.records:
-                    print(f"   Total records: {record.get_value()}")
-
-        # Temperature statistics
-        temp_stats_query = f'''
-        from(bucket: "{INFLUXDB_BUCKET}")
-          |> range(start: -1h)
-          |> filter(fn: (r) => r["_measurement"] == "temperature")
-          |> mean()
-        '''
-
-        result = query_api.query(temp_stats_query)
-        if result:
-            for table in result:
-                for record in table.records:
-                    print(
-                        f"   Average temperature: {record.get_value():.2f}°C")
+    for measurement, unit in MEASUREMENTS.items():
+        row = stats.get(measurement)
+        count = int(row.get("count") or 0) if row else 0
+        if not count:
+            print(f"   ❌ {measurement}: no data")
+            healthy = False
+            continue
 
-        return True
+        age = (now_ns - row["last_ns"]) / 1e9
+        rate = count / window_seconds
+        empty_slots = int(row.get("empty_slots") or 0)
+        coverage = max(0.0, 1 - empty_slots * gap_seconds / window_seconds)
+        fresh = age <= max_age
+        healthy = healthy and fresh
 
-    except Exception as e:
-        print(f"❌ Statistics Error: {e}")
-        return False
+        print(
+            f"   {'✅' if fresh else '⚠️ '} {measurement}: last point {age:.1f}s ago | "
+            f"{count} points ({rate:.2f}/s) | "
+            f"mean {row['sum'] / count:.2f}{unit} [{row['min']:.2f} … {row['max']:.2f}] | "
+            f"{empty_slots} empty {gap_interval} slots ({coverage:.0%} coverage)")
+
+    return healthy
 
 
 def main():
+    parser = argparse.ArgumentParser(
+        description='Check that data is being written to InfluxDB')
+    parser.add_argument('--windows', nargs='+', default=CHECK_WINDOWS,
+                        help='Check windows, one query each (default: 5m 1h)')
+    parser.add_argument('--gap-interval', default=GAP_INTERVAL,
+                        help=f'Slot size used to detect gaps (default: {GAP_INTERVAL})')
+    parser.add_argument('--max-age', type=float, default=MAX_AGE_SECONDS,
+                        help=f'Maximum age in seconds of the newest point (default: {MAX_AGE_SECONDS})')
+    parser.add_argument('--sample', type=int, default=0,
+                        help='Also print the N most recent points per measurement')
+    parser.add_argument('--engine', choices=ENGINES, default='auto',
+                        help='Sample query path: Flight SQL, Flux, or auto (default: auto)')
+    args = parser.parse_args()
+
     print("🚀 Testing InfluxDB Data Collection...")
     print("=" * 50)
 
@@ -159,16 +200,23 @@ def main():
     if not client:
         return
 
-    # Query recent data
-    temp_success = query_recent_data(client)
-    humidity_success = query_humidity_data(client)
+    # One consolidated query per check window
+    success = True
+    for window in args.windows:
+        success = verify_window(
+            client, window, args.gap_interval, args.max_age) and success
 
-    # Get statistics
-    get_data_statistics(client)
+    # Optional raw samples
+    if args.sample:
+        query_client = InfluxQueryClient(engine=args.engine)
+        for measurement, unit in MEASUREMENTS.items():
+            query_measurement_sample(
+                query_client, measurement, unit, args.sample)
+        query_client.close()
 
     # Summary
     print("\n" + "=" * 50)
-    if temp_success and humidity_success:
+    if success:
         print("🎉 SUCCESS: Data is being written to InfluxDB!")
         print("✅ You can now create line graphs in Grafana")
     else:
@@ -176,6 +224,8 @@ def main():
         print("🔧 Check Telegraf configuration and logs")
 
     client.close()
+    if not success:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,13 @@
+"""
+Test Support
+In-process stand-ins for the docker-compose services, so bridge tests and
+benchmarks run without Mosquitto or InfluxDB:
+
+    FakeInfluxDB   /api/v2/write, /health and /ping with latency/error injection
+    MQTTBroker     minimal MQTT 3.1.1 broker
+"""
+
+from testsupport.fake_influxdb import FakeInfluxDB
+from testsupport.mqtt_broker import MQTTBroker
+
+__all__ = ["FakeInfluxDB", "MQTTBroker"]
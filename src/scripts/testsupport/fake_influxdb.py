@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Fake InfluxDB
+An in-process InfluxDB v2 stand-in serving /api/v2/write, /health and /ping
+
+Accepted writes are kept as raw request bodies with their arrival time, so
+handling a request stays cheap. Parsing happens afterwards in lines() and
+latencies(). Latency and failures can be injected to exercise retry and
+backpressure paths:
+
+    with FakeInfluxDB(latency=0.005, error_rate=0.01) as influx:
+        client = InfluxDBClient(url=influx.url, token="test", org="myorg")
+        ...
+        influx.wait_for_points(1000)
+"""
+
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from line_protocol import PRECISION_DIVISORS
+
+
+class WriteRequest:
+    __slots__ = ("arrival_ns", "bucket", "org", "precision", "body", "points")
+
+    def __init__(self, arrival_ns, bucket, org, precision, body):
+        self.arrival_ns = arrival_ns
+        self.bucket = bucket
+        self.org = org
+        self.precision = precision
+        self.body = body
+        self.points = body.count(b"\n") + 1 if body else 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body=None, headers=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if data:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/health":
+            self._reply(200, {"name": "influxdb", "status": "pass",
+                              "message": "ready for queries and writes"})
+        elif path == "/ping":
+            self._reply(204)
+        else:
+            self._reply(404, {"code": "not found", "message": "path not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        if url.path != "/api/v2/write":
+            self._reply(404, {"code": "not found", "message": "path not found"})
+            return
+
+        server = self.server.influx
+        if server.token and self.headers.get("Authorization") != f"Token {server.token}":
+            self._reply(401, {"code": "unauthorized", "message": "unauthorized access"})
+            return
+
+        params = parse_qs(url.query)
+        bucket = params.get("bucket", [""])[0]
+        if not bucket:
+            self._reply(400, {"code": "invalid", "message": "bucket is required"})
+            return
+
+        server.inject_latency()
+        status = server.injected_status()
+        if status:
+            headers = {"Retry-After": "1"} if status in (429, 503) else None
+            self._reply(status, {"code": "internal error",
+                                 "message": "injected failure"}, headers)
+            return
+
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        server.record(WriteRequest(
+            time.time_ns(), bucket, params.get("org", [""])[0],
+            params.get("precision", ["ns"])[0], body.strip()))
+        self._reply(204)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeInfluxDB:
+    def __init__(self, host="127.0.0.1", port=0, token=None, latency=0.0,
+                 jitter=0.0, error_rate=0.0, error_status=503):
+        self.server = _Server((host, port), _Handler)
+        self.server.influx = self
+        self.host, self.port = self.server.server_address[:2]
+        self.url = f"http://{self.host}:{self.port}"
+        self.thread = None
+
+        self.token = token
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.fail_remaining = 0
+
+        self.condition = threading.Condition()
+        self.requests = []
+        self.points = 0
+        self.errors_injected = 0
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name="fake-influxdb", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # Fault injection --------------------------------------------------
+
+    def fail_next(self, count, status=None):
+        """Fail the next `count` writes (optionally with a specific status)"""
+        with self.condition:
+            self.fail_remaining = count
+            if status:
+                self.error_status = status
+
+    def inject_latency(self):
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def injected_status(self):
+        with self.condition:
+            if self.fail_remaining > 0:
+                self.fail_remaining -= 1
+            elif not (self.error_rate and random.random() < self.error_rate):
+                return None
+            self.errors_injected += 1
+            return self.error_status
+
+    # Recorded writes --------------------------------------------------
+
+    def record(self, request):
+        with self.condition:
+            self.requests.append(request)
+            self.points += request.points
+            self.condition.notify_all()
+
+    def wait_for_points(self, count, timeout=30.0):
+        """Block until at least `count` points were written; returns success"""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.points >= count, timeout)
+
+    def reset(self):
+        with self.condition:
+            self.requests = []
+            self.points = 0
+            self.errors_injected = 0
+
+    def lines(self, bucket=None):
+        """All accepted lines, optionally for one bucket"""
+        with self.condition:
+            requests = list(self.requests)
+        return [line.decode()
+                for request in requests
+                if bucket is None or request.bucket == bucket
+                for line in request.body.split(b"\n") if line]
+
+    def latencies(self):
+        """Seconds from each point's timestamp to its arrival at the server
+
+        Meaningful when the writer stamps points with the publish time.
+        """
+        with self.condition:
+            requests = list(self.requests)
+        result = []
+        for request in requests:
+            divisor = PRECISION_DIVISORS.get(request.precision, 1)
+            for line in request.body.split(b"\n"):
+                if line:
+                    timestamp_ns = int(line.rsplit(b" ", 1)[1]) * divisor
+                    result.append((request.arrival_ns - timestamp_ns) / 1e9)
+        return result
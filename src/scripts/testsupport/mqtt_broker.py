@@ -0,0 +1,609 @@
+#!/usr/bin/env python3
+"""
+Embedded MQTT Broker
+A small in-process MQTT 3.1.1 and 5 broker for tests and benchmarks
+
+Supports CONNECT (clean and persistent sessions), PUBLISH at QoS 0/1/2,
+SUBSCRIBE/UNSUBSCRIBE with + and # wildcards, retained messages,
+PINGREQ and DISCONNECT. QoS 1/2 messages for a persistent session are
+queued while the client is offline and delivered when it reconnects,
+together with deliveries the client had not acknowledged when its
+connection dropped.
+
+MQTT 5 clients get inbound topic aliases, PUBLISH properties forwarded to
+v5 subscribers, sessions kept when SessionExpiryInterval > 0 (the
+interval itself is not enforced) and at most ReceiveMaximum
+unacknowledged QoS 1/2 deliveries. Bytes sent and received are counted
+per client id (traffic()).
+
+    with MQTTBroker() as broker:
+        client.connect(broker.host, broker.port)
+"""
+
+import socket
+import socketserver
+import struct
+import threading
+import time
+from collections import defaultdict, deque
+
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+PUBREC = 5
+PUBREL = 6
+PUBCOMP = 7
+SUBSCRIBE = 8
+SUBACK = 9
+UNSUBSCRIBE = 10
+UNSUBACK = 11
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+# Queued messages kept per offline persistent session
+MAX_PENDING = 100_000
+
+# Limits announced to MQTT 5 clients in CONNACK
+TOPIC_ALIAS_MAXIMUM = 16
+RECEIVE_MAXIMUM = 1000
+
+# MQTT 5 property identifiers used by the broker
+SESSION_EXPIRY_INTERVAL = 0x11
+RECEIVE_MAXIMUM_PROPERTY = 0x21
+TOPIC_ALIAS_MAXIMUM_PROPERTY = 0x22
+TOPIC_ALIAS = 0x23
+
+# Encoded size of every MQTT 5 property: byte, two/four byte integer,
+# variable byte integer, string/binary data or a string pair
+_BYTE, _INT16, _INT32, _VARINT, _DATA, _PAIR = range(6)
+PROPERTY_TYPES = {
+    0x01: _BYTE, 0x02: _INT32, 0x03: _DATA, 0x08: _DATA, 0x09: _DATA,
+    0x0B: _VARINT, 0x11: _INT32, 0x12: _DATA, 0x13: _INT16, 0x15: _DATA,
+    0x16: _DATA, 0x17: _BYTE, 0x18: _INT32, 0x19: _BYTE, 0x1A: _DATA,
+    0x1C: _DATA, 0x1F: _DATA, 0x21: _INT16, 0x22: _INT16, 0x23: _INT16,
+    0x24: _BYTE, 0x25: _BYTE, 0x26: _PAIR, 0x27: _INT32, 0x28: _BYTE,
+    0x29: _BYTE, 0x2A: _BYTE,
+}
+
+
+def topic_matches(topic_filter, topic):
+    """MQTT topic filter matching with + and # wildcards"""
+    filter_parts = topic_filter.split("/")
+    topic_parts = topic.split("/")
+    for index, part in enumerate(filter_parts):
+        if part == "#":
+            return True
+        if index >= len(topic_parts):
+            return False
+        if part != "+" and part != topic_parts[index]:
+            return False
+    return len(filter_parts) == len(topic_parts)
+
+
+def encode_length(length):
+    """Encode the variable-length 'remaining length' field"""
+    encoded = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        if length:
+            byte |= 0x80
+        encoded.append(byte)
+        if not length:
+            return bytes(encoded)
+
+
+def decode_length(data, offset):
+    """Decode a variable byte integer; returns (value, next offset)"""
+    value = 0
+    multiplier = 1
+    while True:
+        byte = data[offset]
+        offset += 1
+        value += (byte & 0x7F) * multiplier
+        if not byte & 0x80:
+            return value, offset
+        multiplier *= 128
+
+
+def read_properties(data, offset):
+    """Parse an MQTT 5 property block
+
+    Returns ({identifier: integer value}, the raw block without any
+    TopicAlias, next offset). Only integer properties are decoded; the
+    raw block is what gets forwarded to subscribers.
+    """
+    length, offset = decode_length(data, offset)
+    end = offset + length
+    values = {}
+    forwarded = bytearray()
+    while offset < end:
+        start = offset
+        identifier = data[offset]
+        kind = PROPERTY_TYPES[identifier]
+        offset += 1
+        if kind == _BYTE:
+            values[identifier] = data[offset]
+            offset += 1
+        elif kind == _INT16:
+            values[identifier] = struct.unpack("!H", data[offset:offset + 2])[0]
+            offset += 2
+        elif kind == _INT32:
+            values[identifier] = struct.unpack("!I", data[offset:offset + 4])[0]
+            offset += 4
+        elif kind == _VARINT:
+            values[identifier], offset = decode_length(data, offset)
+        else:
+            for _ in range(2 if kind == _PAIR else 1):
+                offset += 2 + struct.unpack("!H", data[offset:offset + 2])[0]
+        if identifier != TOPIC_ALIAS:
+            forwarded += data[start:offset]
+    return values, bytes(forwarded), end
+
+
+def encode_properties(properties=b""):
+    return encode_length(len(properties)) + properties
+
+
+def encode_string(value):
+    data = value.encode() if isinstance(value, str) else value
+    return struct.pack("!H", len(data)) + data
+
+
+def packet(packet_type, body=b"", flags=0):
+    return bytes([(packet_type << 4) | flags]) + encode_length(len(body)) + body
+
+
+class Session:
+    """Subscriptions and offline queue of one client id"""
+
+    def __init__(self, client_id, clean):
+        self.client_id = client_id
+        self.clean = clean
+        self.subscriptions = {}
+        self.pending = []
+        self.connection = None
+        self.next_packet_id = 0
+
+    def packet_id(self):
+        self.next_packet_id = self.next_packet_id % 65535 + 1
+        return self.next_packet_id
+
+
+class Connection(socketserver.BaseRequestHandler):
+    """One client connection; the server's broker attribute does the routing"""
+
+    def setup(self):
+        self.broker = self.server.broker
+        self.session = None
+        self.client_id = None
+        self.protocol = 4
+        self.send_lock = threading.Lock()
+        self.inbound_qos2 = set()
+        # MQTT 5 topic aliases set by this client
+        self.aliases = {}
+        # Unacknowledged QoS 1/2 deliveries by packet id and, for MQTT 5
+        # flow control, the deliveries held back until one is acknowledged
+        self.receive_maximum = None
+        self.unacked = {}
+        self.backlog = deque()
+        self.flow_lock = threading.Lock()
+        self.closed = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.request.makefile("rb")
+
+    def send(self, data):
+        with self.send_lock:
+            self.request.sendall(data)
+            self.bytes_out += len(data)
+
+    def read_packet(self):
+        header = self.reader.read(1)
+        if not header:
+            return None, None, None
+        length = 0
+        multiplier = 1
+        header_size = 1
+        while True:
+            byte = self.reader.read(1)
+            if not byte:
+                return None, None, None
+            header_size += 1
+            length += (byte[0] & 0x7F) * multiplier
+            if not byte[0] & 0x80:
+                break
+            multiplier *= 128
+        body = self.reader.read(length) if length else b""
+        if len(body) != length:
+            return None, None, None
+        self.bytes_in += header_size + length
+        return header[0] >> 4, header[0] & 0x0F, body
+
+    def handle(self):
+        try:
+            while True:
+                packet_type, flags, body = self.read_packet()
+                if packet_type is None:
+                    break
+                if self.session is None and packet_type != CONNECT:
+                    break
+                if not self.dispatch(packet_type, flags, body):
+                    break
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.broker.detach(self)
+
+    def dispatch(self, packet_type, flags, body):
+        if packet_type == CONNECT:
+            return self.on_connect(body)
+        if packet_type == PUBLISH:
+            return self.on_publish(flags, body)
+        if packet_type in (PUBACK, PUBCOMP):
+            self.acknowledged(struct.unpack("!H", body[:2])[0])
+        elif packet_type == PUBREL:
+            packet_id = struct.unpack("!H", body[:2])[0]
+            self.inbound_qos2.discard(packet_id)
+            self.send(packet(PUBCOMP, body[:2]))
+        elif packet_type == PUBREC:
+            self.send(packet(PUBREL, body[:2], flags=0x02))
+        elif packet_type == SUBSCRIBE:
+            self.on_subscribe(body)
+        elif packet_type == UNSUBSCRIBE:
+            self.on_unsubscribe(body)
+        elif packet_type == PINGREQ:
+            self.send(packet(PINGRESP))
+        elif packet_type == DISCONNECT:
+            return False
+        return True
+
+    def on_connect(self, body):
+        offset = 2 + struct.unpack("!H", body[:2])[0]
+        level, connect_flags = body[offset], body[offset + 1]
+        offset += 4  # level, flags, keep alive
+        if level not in (4, 5):
+            # 0x01: unacceptable protocol version
+            self.send(packet(CONNACK, b"\x00\x01"))
+            return False
+
+        self.protocol = level
+        clean = bool(connect_flags & 0x02)
+        discard = clean
+        if level == 5:
+            properties, _, offset = read_properties(body, offset)
+            # v5 clean start only discards the old session; keeping the new
+            # one after the connection closes needs a session expiry
+            discard = not properties.get(SESSION_EXPIRY_INTERVAL)
+            self.receive_maximum = properties.get(RECEIVE_MAXIMUM_PROPERTY, 65535)
+
+        client_id_length = struct.unpack("!H", body[offset:offset + 2])[0]
+        self.client_id = body[offset + 2:offset + 2 + client_id_length].decode()
+
+        session_present = self.broker.attach(self, self.client_id, clean, discard)
+        acknowledge = bytes([1 if session_present else 0, 0])
+        if level == 5:
+            acknowledge += encode_properties(
+                bytes([RECEIVE_MAXIMUM_PROPERTY]) + struct.pack("!H", RECEIVE_MAXIMUM)
+                + bytes([TOPIC_ALIAS_MAXIMUM_PROPERTY]) + struct.pack("!H", TOPIC_ALIAS_MAXIMUM))
+        self.send(packet(CONNACK, acknowledge))
+        self.broker.flush_pending(self.session)
+        return True
+
+    def on_publish(self, flags, body):
+        qos = (flags >> 1) & 0x03
+        retain = bool(flags & 0x01)
+        topic_length = struct.unpack("!H", body[:2])[0]
+        topic = body[2:2 + topic_length].decode()
+        offset = 2 + topic_length
+        packet_id = None
+        if qos:
+            packet_id = struct.unpack("!H", body[offset:offset + 2])[0]
+            offset += 2
+        properties = b""
+        if self.protocol == 5:
+            values, properties, offset = read_properties(body, offset)
+            alias = values.get(TOPIC_ALIAS)
+            if alias is not None:
+                if topic:
+                    self.aliases[alias] = topic
+                elif alias in self.aliases:
+                    topic = self.aliases[alias]
+                else:
+                    # Unknown topic alias is a protocol error
+                    return False
+        payload = body[offset:]
+
+        if qos == 2:
+            self.send(packet(PUBREC, struct.pack("!H", packet_id)))
+            if packet_id in self.inbound_qos2:
+                return True
+            self.inbound_qos2.add(packet_id)
+        elif qos == 1:
+            self.send(packet(PUBACK, struct.pack("!H", packet_id)))
+
+        self.broker.route(topic, payload, qos, retain, properties)
+        return True
+
+    def on_subscribe(self, body):
+        packet_id = body[:2]
+        offset = 2
+        if self.protocol == 5:
+            _, _, offset = read_properties(body, offset)
+        granted = bytearray()
+        filters = []
+        while offset < len(body):
+            length = struct.unpack("!H", body[offset:offset + 2])[0]
+            topic_filter = body[offset + 2:offset + 2 + length].decode()
+            qos = min(body[offset + 2 + length] & 0x03, 2)
+            offset += 3 + length
+            with self.broker.lock:
+                self.session.subscriptions[topic_filter] = qos
+            filters.append((topic_filter, qos))
+            granted.append(qos)
+        if self.protocol == 5:
+            packet_id += encode_properties()
+        self.send(packet(SUBACK, packet_id + bytes(granted)))
+        for topic_filter, qos in filters:
+            self.broker.send_retained(self.session, topic_filter, qos)
+
+    def on_unsubscribe(self, body):
+        offset = 2
+        if self.protocol == 5:
+            _, _, offset = read_properties(body, offset)
+        removed = 0
+        while offset < len(body):
+            length = struct.unpack("!H", body[offset:offset + 2])[0]
+            with self.broker.lock:
+                self.session.subscriptions.pop(
+                    body[offset + 2:offset + 2 + length].decode(), None)
+            offset += 2 + length
+            removed += 1
+        if self.protocol == 5:
+            self.send(packet(UNSUBACK, body[:2] + encode_properties() + bytes(removed)))
+        else:
+            self.send(packet(UNSUBACK, body[:2]))
+
+    def deliver(self, topic, payload, qos, retain=False, properties=b""):
+        """Send a PUBLISH to this client, or hold it while ReceiveMaximum
+        QoS 1/2 deliveries are unacknowledged"""
+        if not qos:
+            self._send_publish(topic, payload, qos, retain, properties, None)
+            return
+
+        message = (topic, payload, qos, retain, properties)
+        with self.flow_lock:
+            closed = self.closed
+            if not closed:
+                if self.receive_maximum and len(self.unacked) >= self.receive_maximum:
+                    self.backlog.append(message)
+                    return
+                packet_id = self.session.packet_id()
+                self.unacked[packet_id] = message
+        if closed:
+            # The connection went away after the message was routed to it
+            self.broker.requeue(self.session, [message])
+        else:
+            self._send_publish(*message, packet_id)
+
+    def _send_publish(self, topic, payload, qos, retain, properties, packet_id):
+        body = encode_string(topic)
+        if qos:
+            body += struct.pack("!H", packet_id)
+        if self.protocol == 5:
+            body += encode_properties(properties)
+        flags = (qos << 1) | (1 if retain else 0)
+        self.send(packet(PUBLISH, body + payload, flags=flags))
+
+    def acknowledged(self, packet_id):
+        """A QoS 1/2 delivery completed: send the next held one, if any"""
+        with self.flow_lock:
+            self.unacked.pop(packet_id, None)
+            if not self.backlog or len(self.unacked) >= self.receive_maximum:
+                return
+            message = self.backlog.popleft()
+            packet_id = self.session.packet_id()
+            self.unacked[packet_id] = message
+        self._send_publish(*message, packet_id)
+
+    def close_flow(self):
+        """Stop sending; returns the unacknowledged and held deliveries"""
+        with self.flow_lock:
+            self.closed = True
+            messages = list(self.unacked.values()) + list(self.backlog)
+            self.unacked.clear()
+            self.backlog.clear()
+        return messages
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class MQTTBroker:
+    def __init__(self, host="127.0.0.1", port=0):
+        self.server = _Server((host, port), Connection)
+        self.server.broker = self
+        self.host, self.port = self.server.server_address[:2]
+        self.thread = None
+
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.retained = {}
+        # client id -> [bytes received, bytes sent] of closed connections
+        self.closed_traffic = defaultdict(lambda: [0, 0])
+        self.live = set()
+
+        # Statistics
+        self.published = 0
+        self.delivered = 0
+        self.queued = 0
+        self.connections = 0
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name="mqtt-broker", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.disconnect_clients()
+
+    def restart(self, downtime=0.0, keep_sessions=True):
+        """Stop listening, drop every client and listen again on the same port
+
+        keep_sessions=True behaves like a broker with persistence enabled:
+        persistent sessions, their subscriptions and queued messages survive.
+        """
+        self.stop()
+        if not keep_sessions:
+            with self.lock:
+                self.sessions.clear()
+                self.retained.clear()
+        time.sleep(downtime)
+        self.server = _Server((self.host, self.port), Connection)
+        self.server.broker = self
+        return self.start()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # Session handling -------------------------------------------------
+
+    def attach(self, connection, client_id, clean, discard=None):
+        """Bind a connection to its session; returns True if one was resumed
+
+        `clean` discards a previous session; `discard` (default: clean) drops
+        the new one when the connection closes.
+        """
+        with self.lock:
+            self.connections += 1
+            self.live.add(connection)
+            session = self.sessions.get(client_id)
+            if session and session.connection:
+                # Same client id connected twice: the old connection is dropped
+                self._close(session.connection)
+            present = bool(session) and not clean and not session.clean
+            if not present:
+                session = Session(client_id, clean)
+                self.sessions[client_id] = session
+            session.clean = clean if discard is None else discard
+            session.connection = connection
+            connection.session = session
+            return present
+
+    def detach(self, connection):
+        with self.lock:
+            if connection in self.live:
+                self.live.discard(connection)
+                traffic = self.closed_traffic[connection.client_id]
+                traffic[0] += connection.bytes_in
+                traffic[1] += connection.bytes_out
+            # Unacknowledged and held back deliveries of a persistent session
+            # are queued again, or resent if the client already reconnected
+            undelivered = connection.close_flow()
+            session = connection.session
+            if session and session.connection is connection:
+                session.connection = None
+                if session.clean:
+                    self.sessions.pop(session.client_id, None)
+                    return
+                session.pending[:0] = [
+                    (topic, payload, qos, properties)
+                    for topic, payload, qos, _, properties in undelivered]
+                return
+        if session and undelivered and not session.clean:
+            self.requeue(session, undelivered)
+
+    def requeue(self, session, messages):
+        """Deliver again to the session's current connection, or queue"""
+        with self.lock:
+            connection = session.connection
+            if connection is None:
+                if not session.clean:
+                    session.pending.extend(
+                        (topic, payload, qos, properties)
+                        for topic, payload, qos, _, properties in messages)
+                return
+        for topic, payload, qos, retain, properties in messages:
+            connection.deliver(topic, payload, qos, retain, properties)
+
+    def traffic(self, client_id):
+        """(bytes received from, bytes sent to) a client id, all connections"""
+        with self.lock:
+            received, sent = self.closed_traffic.get(client_id, (0, 0))
+            for connection in self.live:
+                if connection.client_id == client_id:
+                    received += connection.bytes_in
+                    sent += connection.bytes_out
+        return received, sent
+
+    def disconnect_clients(self):
+        """Drop every client connection, e.g. to exercise reconnect logic"""
+        with self.lock:
+            connections = [s.connection for s in self.sessions.values() if s.connection]
+        for connection in connections:
+            self._close(connection)
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.request.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    # Routing ----------------------------------------------------------
+
+    def route(self, topic, payload, qos, retain, properties=b""):
+        with self.lock:
+            self.published += 1
+            if retain:
+                if payload:
+                    self.retained[topic] = (payload, qos, properties)
+                else:
+                    self.retained.pop(topic, None)
+            targets = []
+            for session in self.sessions.values():
+                granted = max(
+                    (sub_qos for topic_filter, sub_qos in session.subscriptions.items()
+                     if topic_matches(topic_filter, topic)), default=None)
+                if granted is None:
+                    continue
+                delivery_qos = min(qos, granted)
+                if session.connection:
+                    targets.append((session.connection, delivery_qos))
+                elif delivery_qos and len(session.pending) < MAX_PENDING:
+                    session.pending.append((topic, payload, delivery_qos, properties))
+                    self.queued += 1
+            self.delivered += len(targets)
+
+        for connection, delivery_qos in targets:
+            try:
+                connection.deliver(topic, payload, delivery_qos, properties=properties)
+            except OSError:
+                pass
+
+    def flush_pending(self, session):
+        with self.lock:
+            pending, session.pending = session.pending, []
+            self.delivered += len(pending)
+        for topic, payload, qos, properties in pending:
+            session.connection.deliver(topic, payload, qos, properties=properties)
+
+    def send_retained(self, session, topic_filter, qos):
+        with self.lock:
+            matches = [(topic, payload, min(qos, retained_qos), properties)
+                       for topic, (payload, retained_qos, properties) in self.retained.items()
+                       if topic_matches(topic_filter, topic)]
+        for topic, payload, delivery_qos, properties in matches:
+            session.connection.deliver(topic, payload, delivery_qos, retain=True,
+                                       properties=properties)
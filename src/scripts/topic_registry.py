@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+MQTT Topic Registry
+Single source of truth mapping MQTT topics to InfluxDB measurements
+
+Each entry names the measurement and field a topic's payload value is
+stored under, the payload key holding that value, the payload keys copied
+as tags, the display unit, and the schema its payloads are validated
+against (see schemas.py).
+
+A topic that is not registered itself resolves to the entry with the same
+last level (its measurement segment), so data/site-a/temperature is read
+like data/temperature and can be routed to its own bucket.
+"""
+
+TOPIC_REGISTRY = {
+    "data/temperature": {
+        "measurement": "temperature",
+        "field": "temperature",
+        "payload_key": "temperature",
+        "tag_keys": ["location"],
+        "unit": "°C",
+        "schema": {
+            "temperature": {"type": "number", "required": True, "min": -60, "max": 70},
+            "timestamp": {"type": "string"},
+            "location": {"type": "string"},
+        },
+    },
+    "data/humidity": {
+        "measurement": "humidity",
+        "field": "humidity",
+        "payload_key": "humidity",
+        "tag_keys": ["location"],
+        "unit": "%",
+        "schema": {
+            "humidity": {"type": "number", "required": True, "min": 0, "max": 100},
+            "timestamp": {"type": "string"},
+            "location": {"type": "string"},
+        },
+    },
+}
+
+
+# Registered topic per measurement segment
+_BY_SEGMENT = {topic.rsplit("/", 1)[-1]: topic for topic in TOPIC_REGISTRY}
+
+# Resolved topics; bounded so arbitrary topics cannot grow it without limit
+_resolved = {}
+MAX_RESOLVED_TOPICS = 10_000
+
+
+def registered_topic(topic):
+    """The registry key a topic resolves to, or None"""
+    key = _resolved.get(topic)
+    if key is None:
+        key = topic if topic in TOPIC_REGISTRY else _BY_SEGMENT.get(topic.rsplit("/", 1)[-1])
+        if key is not None and len(_resolved) < MAX_RESOLVED_TOPICS:
+            _resolved[topic] = key
+    return key
+
+
+def lookup(topic):
+    """Registry entry for a topic, or None if it resolves to no entry"""
+    return TOPIC_REGISTRY.get(registered_topic(topic))
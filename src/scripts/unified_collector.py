@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+Unified MQTT Collector
+One subscriber that parses each message once and fans the reading out to
+any combination of sinks: InfluxDB, CSV, Parquet, SQLite and stdout
+
+Every sink has its own queue, worker thread and batch settings. A slow or
+failing sink fills only its own queue and drops readings once it is full;
+it never blocks the MQTT loop or the other sinks. Queued readings are
+compact Reading objects, and batches are ReadingBatch column buffers
+(see readings.py).
+
+The sqlite sink is an embedded store for sites without InfluxDB: batched
+transactions into a WAL-mode database with day partitions and an optional
+retention period (see sqlite_store.py); query it with query_sqlite.py.
+
+data_collector.py (influxdb) and temperature_data_collector.py (csv and
+influxdb) are thin wrappers that run this collector on data/temperature.
+
+Invalid payloads and sink errors are counted and logged at most
+LOG_SAMPLE_RATE lines per second; the totals appear in the periodic
+summary line (see logging_setup.py).
+
+pipenv run python src/scripts/unified_collector.py --sink influxdb --sink csv
+pipenv run python src/scripts/unified_collector.py --sink parquet --parquet-file readings.parquet --sink stdout
+pipenv run python src/scripts/unified_collector.py --sink sqlite --sqlite-file readings.db --sqlite-retention-days 30
+pipenv run python src/scripts/unified_collector.py --sink influxdb --profile --cprofile
+"""
+
+import argparse
+import csv
+import logging
+import os
+import queue
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+from influxdb_client.client.influxdb_client import InfluxDBClient
+from influxdb_client.client.write_api import SYNCHRONOUS
+
+from ingest import parse_message
+from logging_setup import (LOG_SAMPLE_RATE, LOG_SUMMARY_INTERVAL, SampledLogger,
+                           ThroughputReporter, add_logging_arguments,
+                           setup_logging)
+from profiling import NULL_PROFILER, add_profile_arguments, profiler_from_args
+from readings import ReadingBatch, ns_to_datetime
+from sqlite_store import PARTITIONS, SQLiteStore
+from topic_registry import TOPIC_REGISTRY
+
+# MQTT Configuration
+MQTT_BROKER = os.getenv("MQTT_BROKER", "localhost")
+MQTT_PORT = int(os.getenv("MQTT_PORT", "1883"))
+MQTT_CLIENT_ID = "python_unified_collector"
+
+# InfluxDB Configuration
+INFLUXDB_URL = os.getenv("INFLUXDB_URL", "http://localhost:8086")
+INFLUXDB_ORG = os.getenv("INFLUXDB_ORG", "myorg")
+INFLUXDB_BUCKET = os.getenv("INFLUXDB_BUCKET", "weather_data")
+INFLUXDB_TOKEN = os.getenv("INFLUXDB_TOKEN")
+
+SINKS = ["influxdb", "csv", "parquet", "sqlite", "stdout"]
+
+logger = logging.getLogger("unified_collector")
+
+
+class Sink:
+    """Base class for a batching sink running on its own thread
+
+    Subclasses implement write_batch() and optionally open()/close_sink().
+    """
+
+    name = "sink"
+
+    def __init__(self, batch_size=500, flush_interval=1.0, max_queue=10_000):
+        self.profiler = NULL_PROFILER
+        self.error_log = SampledLogger(logger)
+        self.reporter = None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self._run, name=f"sink-{self.name}", daemon=True)
+
+        # Statistics
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def open(self):
+        """Acquire resources before the worker starts"""
+
+    def write_batch(self, batch):
+        """Write a ReadingBatch"""
+        raise NotImplementedError
+
+    def close_sink(self):
+        """Release resources after the last batch was written"""
+
+    def start(self):
+        self.open()
+        self.thread.start()
+
+    def submit(self, reading):
+        """Queue a reading without blocking; drop it if the sink is backed up"""
+        try:
+            self.queue.put_nowait(reading)
+        except queue.Full:
+            self.dropped += 1
+
+    def _flush(self, batch):
+        started = self.profiler.start()
+        try:
+            self.write_batch(batch)
+            self.profiler.lap(f"write:{self.name}", started)
+            self.written += len(batch)
+        except Exception as e:
+            self.errors += 1
+            if self.reporter:
+                self.reporter.count("sink_errors")
+            self.error_log.error("❌ %s sink error (%d total): %s", self.name, self.errors, e)
+
+    def _run(self):
+        while not self.stopped.is_set():
+            batch = ReadingBatch()
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and not self.stopped.is_set():
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            if batch:
+                self._flush(batch)
+
+        # Write whatever is still queued on shutdown
+        batch = ReadingBatch()
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = ReadingBatch()
+        if batch:
+            self._flush(batch)
+
+    def close(self):
+        """Stop the worker, flush remaining readings and close the sink"""
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout=30)
+        self.close_sink()
+
+
+class InfluxDBSink(Sink):
+    """Writes batches of line protocol to InfluxDB"""
+
+    name = "influxdb"
+
+    def __init__(self, bucket=INFLUXDB_BUCKET, **kwargs):
+        super().__init__(**kwargs)
+        self.bucket = bucket
+        self.client = None
+
+    def open(self):
+        if not INFLUXDB_TOKEN:
+            raise ValueError("INFLUXDB_TOKEN environment variable is required")
+        self.client = InfluxDBClient(
+            url=INFLUXDB_URL,
+            token=INFLUXDB_TOKEN,  # type: ignore
+            org=INFLUXDB_ORG
+        )
+        self.write_api = self.client.write_api(write_options=SYNCHRONOUS)
+
+    def write_batch(self, batch):
+        started = self.profiler.start()
+        lines = batch.to_lines()
+        self.profiler.lap("serialize:influxdb", started)
+        self.write_api.write(bucket=self.bucket, record=lines)
+
+    def close_sink(self):
+        if self.client:
+            self.client.close()
+
+
+class CSVSink(Sink):
+    """Appends readings to <measurement>_data.csv files
+
+    The columns match temperature_data_collector.py (timestamp, <field>,
+    datetime), so query_csv.py works on the output.
+    """
+
+    name = "csv"
+
+    def __init__(self, directory=".", **kwargs):
+        super().__init__(**kwargs)
+        self.directory = directory
+        self.files = {}
+
+    def _writer(self, measurement, field):
+        if measurement not in self.files:
+            filename = os.path.join(self.directory, f"{measurement}_data.csv")
+            csv_exists = os.path.exists(filename)
+            csvfile = open(filename, 'a', newline='')
+            writer = csv.writer(csvfile)
+            if not csv_exists:
+                writer.writerow(['timestamp', field, 'datetime'])
+            self.files[measurement] = (csvfile, writer)
+        return self.files[measurement]
+
+    def write_batch(self, batch):
+        touched = set()
+        for series, value, time_ns, timestamp in batch:
+            csvfile, writer = self._writer(series.measurement, series.field)
+            writer.writerow([
+                timestamp,
+                value,
+                ns_to_datetime(time_ns).strftime('%Y-%m-%d %H:%M:%S')
+            ])
+            touched.add(csvfile)
+        for csvfile in touched:
+            csvfile.flush()
+
+    def close_sink(self):
+        for csvfile, _ in self.files.values():
+            csvfile.close()
+
+
+class ParquetSink(Sink):
+    """Writes readings to a Parquet file, one row group per batch"""
+
+    name = "parquet"
+
+    def __init__(self, filename="readings.parquet", **kwargs):
+        kwargs.setdefault("batch_size", 10_000)
+        kwargs.setdefault("flush_interval", 10.0)
+        super().__init__(**kwargs)
+        self.filename = filename
+        self.writer = None
+
+    def open(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit(
+                "❌ The parquet sink requires pyarrow: pipenv install pyarrow")
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ("time", pa.timestamp("ns", tz="UTC")),
+            ("measurement", pa.string()),
+            ("field", pa.string()),
+            ("value", pa.float64()),
+        ])
+        self.writer = pq.ParquetWriter(self.filename, self.schema)
+
+    def write_batch(self, batch):
+        pa = self.pa
+        count = len(batch)
+        # Values and times are handed to Arrow straight from the array buffers
+        table = pa.table({
+            "time": pa.Array.from_buffers(
+                self.schema.field("time").type, count, [None, pa.py_buffer(batch.times)]),
+            "measurement": [series.measurement for series in batch.series],
+            "field": [series.field for series in batch.series],
+            "value": pa.Array.from_buffers(
+                pa.float64(), count, [None, pa.py_buffer(batch.values)]),
+        }, schema=self.schema)
+        self.writer.write_table(table)
+
+    def close_sink(self):
+        if self.writer:
+            self.writer.close()
+
+
+class SQLiteSink(Sink):
+    """Inserts each batch into a local SQLite store in one transaction"""
+
+    name = "sqlite"
+
+    # Seconds between retention purges
+    PURGE_INTERVAL = 3600
+
+    def __init__(self, filename="readings.db", partition="day", retention_days=None, **kwargs):
+        super().__init__(**kwargs)
+        self.filename = filename
+        self.partition = partition
+        self.retention_days = retention_days
+        self.store = None
+        self.next_purge = 0.0
+
+    def open(self):
+        self.store = SQLiteStore(self.filename, self.partition, self.retention_days)
+
+    def write_batch(self, batch):
+        self.store.write_batch(batch)
+        if self.retention_days and time.monotonic() >= self.next_purge:
+            self.next_purge = time.monotonic() + self.PURGE_INTERVAL
+            for name in self.store.purge():
+                logger.info("🧹 sqlite: dropped expired partition %s", name)
+
+    def close_sink(self):
+        if self.store:
+            self.store.close()
+
+
+class StdoutSink(Sink):
+    """Prints readings, one line per batch entry"""
+
+    name = "stdout"
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("batch_size", 100)
+        kwargs.setdefault("flush_interval", 0.5)
+        super().__init__(**kwargs)
+
+    def write_batch(self, batch):
+        print("\n".join(
+            f"{series.measurement}: {value} | Time: {ns_to_datetime(time_ns).strftime('%H:%M:%S')}"
+            for series, value, time_ns, _ in batch), flush=True)
+
+
+class UnifiedCollector:
+    def __init__(self, sinks, topics, profiler=NULL_PROFILER, client_id=MQTT_CLIENT_ID,
+                 log_sample_rate=LOG_SAMPLE_RATE, summary_interval=LOG_SUMMARY_INTERVAL):
+        self.sinks = sinks
+        self.topics = topics
+        self.profiler = profiler
+
+        # Statistics and rate-limited logging
+        self.error_log = SampledLogger(logger, log_sample_rate)
+        self.reporter = ThroughputReporter(
+            logger, ["received", "skipped", "invalid", "sink_errors"], summary_interval)
+        for sink in sinks:
+            sink.profiler = profiler
+            # One sampler per sink, so a failing sink cannot hide another's errors
+            sink.error_log = SampledLogger(logger, log_sample_rate)
+            sink.reporter = self.reporter
+
+        self.mqtt_client = mqtt.Client(client_id=client_id)
+        self.mqtt_client.on_connect = self.on_connect
+        self.mqtt_client.on_message = self.on_message
+
+    def on_connect(self, client, userdata, flags, rc):
+        """Callback when connected to MQTT broker"""
+        if rc == 0:
+            logger.info("✅ Connected to MQTT broker at %s:%s", MQTT_BROKER, MQTT_PORT)
+            for topic in self.topics:
+                client.subscribe(topic, qos=1)
+                logger.info("📡 Subscribed to: %s", topic)
+        else:
+            logger.error("❌ Failed to connect to MQTT broker, return code: %s", rc)
+
+    def on_message(self, client, userdata, msg):
+        """Parse the message once and hand the reading to every sink"""
+        self.reporter.count("received")
+        try:
+            reading = parse_message(msg.topic, msg.payload, self.profiler)
+        except ValueError as e:
+            # json.JSONDecodeError is a ValueError
+            self.reporter.count("invalid")
+            self.error_log.warning("❌ Invalid payload on %s: %s", msg.topic, e)
+            return
+
+        if reading is None:
+            self.reporter.count("skipped")
+            return
+
+        started = self.profiler.start()
+        for sink in self.sinks:
+            sink.submit(reading)
+        self.profiler.lap("enqueue", started)
+
+    def start(self):
+        """Start the sinks and the MQTT loop"""
+        logger.info("🚀 Starting Unified Collector...")
+        logger.info("🧩 Sinks: %s", ", ".join(sink.name for sink in self.sinks))
+        if self.profiler.enabled:
+            logger.info("⏱️  Profiling enabled: %s/", self.profiler.profile_dir)
+        logger.info("Press Ctrl+C to stop...")
+
+        try:
+            self.profiler.begin()
+            self.reporter.start()
+            for sink in self.sinks:
+                sink.start()
+            self.mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
+            self.mqtt_client.loop_forever()
+
+        except KeyboardInterrupt:
+            logger.info("⏹️  Stopping Unified Collector...")
+        except Exception as e:
+            logger.error("❌ Error: %s", e)
+        finally:
+            self.cleanup()
+
+    def cleanup(self):
+        """Disconnect, then drain and close every sink"""
+        self.mqtt_client.disconnect()
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                logger.error("❌ Error closing %s sink: %s", sink.name, e)
+        self.reporter.stop()
+        for sink in self.sinks:
+            logger.info("💾 %s: written %d | dropped %d | errors %d",
+                        sink.name, sink.written, sink.dropped, sink.errors)
+        self.profiler.finish()
+
+
+def build_sinks(args):
+    """Create the sinks selected on the command line"""
+    sinks = []
+    for name in dict.fromkeys(args.sink):
+        if name == "influxdb":
+            sinks.append(InfluxDBSink(bucket=args.bucket))
+        elif name == "csv":
+            sinks.append(CSVSink(directory=args.csv_dir))
+        elif name == "parquet":
+            sinks.append(ParquetSink(filename=args.parquet_file))
+        elif name == "sqlite":
+            sinks.append(SQLiteSink(filename=args.sqlite_file, partition=args.sqlite_partition,
+                                    retention_days=args.sqlite_retention_days))
+        elif name == "stdout":
+            sinks.append(StdoutSink())
+    return sinks
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Collect MQTT readings into several sinks at once')
+    parser.add_argument('--sink', action='append', choices=SINKS,
+                        help='Sink to enable (repeatable, default: influxdb)')
+    parser.add_argument('--topics', nargs='+', default=list(TOPIC_REGISTRY),
+                        help='Registered topics to subscribe to (default: all)')
+    parser.add_argument('--bucket', default=INFLUXDB_BUCKET,
+                        help=f'InfluxDB bucket (default: {INFLUXDB_BUCKET})')
+    parser.add_argument('--csv-dir', default='.',
+                        help='Directory for <measurement>_data.csv files (default: .)')
+    parser.add_argument('--parquet-file', default='readings.parquet',
+                        help='Parquet output file (default: readings.parquet)')
+    parser.add_argument('--sqlite-file', default='readings.db',
+                        help='SQLite database file (default: readings.db)')
+    parser.add_argument('--sqlite-partition', choices=list(PARTITIONS), default='day',
+                        help='Time span of one SQLite partition table (default: day)')
+    parser.add_argument('--sqlite-retention-days', type=float,
+                        help='Drop SQLite partitions older than this many days (default: keep all)')
+    add_profile_arguments(parser)
+    add_logging_arguments(parser)
+
+    args = parser.parse_args()
+    args.sink = args.sink or ["influxdb"]
+
+    setup_logging(args.log_level, args.log_format)
+    collector = UnifiedCollector(
+        build_sinks(args), args.topics, profiler=profiler_from_args(args, "collector"),
+        log_sample_rate=args.log_sample_rate, summary_interval=args.log_summary_interval)
+    collector.start()
+
+
+if __name__ == "__main__":
+    main()